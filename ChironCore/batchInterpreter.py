@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lockstep interpreter that runs one Chiron program over a batch of inputs.
+
+Every program variable and the turtle state (x, y, orientation, pen) are
+NumPy arrays with one lane per input. Each lane has its own program
+counter; at every step the smallest program counter among the running
+lanes is executed for all lanes that are at it, so lanes that took
+different branches wait for each other at the join point and run the rest
+of the program together again.
+
+Like irCompiler, the IR is lowered once into closures, here operating on
+the index array of the lanes that execute the instruction. A lane stops
+when it runs past the end of the program (COMPLETED), when it hits an
+error such as a read of an undefined variable or a division by zero
+(ERROR), when the deadline is hit (TIMEOUT) or when it has executed its
+budget of instructions (STEP_LIMIT).
+
+Coverage comes out as a boolean bitmap of shape (lanes, len(ir)). The
+turtle arithmetic is the same as in headlessTurtle, so final positions
+match the ones of the scalar interpreter. Drawn segments are not recorded.
+"""
+
+import math
+import time
+
+import numpy as np
+
+from ChironAST import ChironAST
+from irCompiler import varName, arithOps, condOps
+
+
+RUNNING = 0
+COMPLETED = 1
+TIMEOUT = 2
+ERROR = 3
+STEP_LIMIT = 4
+
+CLOCK_PERIOD = 256
+
+
+def truth(values):
+    if isinstance(values, np.ndarray) and values.dtype == bool:
+        return values
+    return np.asarray(values) != 0
+
+
+def compileBatchExpr(expr):
+    """
+    Compile an expression into f(it, idx, err) -> array (or scalar).
+    'idx' are the lanes being evaluated; lanes where the evaluation fails
+    are set in the boolean array 'err' (same length as idx).
+    """
+    if isinstance(expr, ChironAST.Num):
+        val = expr.val
+        return lambda it, idx, err: val
+
+    if isinstance(expr, ChironAST.Var):
+        name = varName(expr)
+
+        def load(it, idx, err):
+            if name not in it.vars:
+                err[:] = True
+                return 0.0
+            err |= ~it.defined[name][idx]
+            return it.vars[name][idx]
+
+        return load
+
+    if isinstance(expr, ChironAST.BoolTrue):
+        return lambda it, idx, err: True
+
+    if isinstance(expr, ChironAST.BoolFalse):
+        return lambda it, idx, err: False
+
+    if isinstance(expr, ChironAST.PenStatus):
+        return lambda it, idx, err: it.pen[idx]
+
+    if isinstance(expr, ChironAST.UMinus):
+        sub = compileBatchExpr(expr.expr)
+        return lambda it, idx, err: -sub(it, idx, err)
+
+    if isinstance(expr, ChironAST.NOT):
+        sub = compileBatchExpr(expr.expr)
+        return lambda it, idx, err: ~truth(sub(it, idx, err))
+
+    if isinstance(expr, ChironAST.AND):
+        lhs, rhs = compileBatchExpr(expr.lexpr), compileBatchExpr(expr.rexpr)
+        return lambda it, idx, err: truth(lhs(it, idx, err)) & truth(rhs(it, idx, err))
+
+    if isinstance(expr, ChironAST.OR):
+        lhs, rhs = compileBatchExpr(expr.lexpr), compileBatchExpr(expr.rexpr)
+        return lambda it, idx, err: truth(lhs(it, idx, err)) | truth(rhs(it, idx, err))
+
+    lhs, rhs = compileBatchExpr(expr.lexpr), compileBatchExpr(expr.rexpr)
+    if isinstance(expr, (ChironAST.Div, ChironAST.Mod)):
+        op = np.divide if isinstance(expr, ChironAST.Div) else np.mod
+
+        def divide(it, idx, err):
+            left, right = lhs(it, idx, err), rhs(it, idx, err)
+            err |= np.asarray(right) == 0
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return op(left, right)
+
+        return divide
+
+    if isinstance(expr, ChironAST.BinArithOp):
+        op = arithOps[expr.symbol]
+    elif isinstance(expr, ChironAST.BinCondOp):
+        op = condOps[expr.symbol]
+    else:
+        raise NotImplementedError("Unknown expression: %s, %s." % (type(expr), expr))
+    return lambda it, idx, err: op(lhs(it, idx, err), rhs(it, idx, err))
+
+
+def lanes(values, idx):
+    # broadcast a (possibly scalar) result to one value per lane
+    return np.broadcast_to(np.asarray(values, dtype=float), idx.shape)
+
+
+def compileBatchInstruction(stmt, tgt):
+    """
+    Compile one IR instruction into f(it, idx) which executes it for the
+    lanes 'idx' and advances their program counters.
+    """
+    if isinstance(stmt, ChironAST.AssignmentCommand):
+        name = varName(stmt.lvar)
+        rhs = compileBatchExpr(stmt.rexpr)
+
+        def run(it, idx):
+            err = np.zeros(idx.shape, dtype=bool)
+            values = lanes(rhs(it, idx, err), idx)
+            ok = it.fail(idx, err)
+            it.assign(name, idx[ok], values[ok])
+            it.pcs[idx] += 1
+
+    elif isinstance(stmt, ChironAST.ConditionCommand):
+        cond = compileBatchExpr(stmt.cond)
+
+        def run(it, idx):
+            err = np.zeros(idx.shape, dtype=bool)
+            taken = np.broadcast_to(truth(cond(it, idx, err)), idx.shape)
+            it.fail(idx, err)
+            it.pcs[idx] += np.where(taken, 1, tgt)
+
+    elif isinstance(stmt, ChironAST.MoveCommand):
+        amount = compileBatchExpr(stmt.expr)
+        if stmt.direction in ("forward", "backward"):
+            sign = 1.0 if stmt.direction == "forward" else -1.0
+
+            def move(it, idx, values):
+                if sign < 0:
+                    values = -values
+                it.x[idx] = it.x[idx] + it.ox[idx] * values
+                it.y[idx] = it.y[idx] + it.oy[idx] * values
+        elif stmt.direction in ("left", "right"):
+            sign = 1.0 if stmt.direction == "left" else -1.0
+
+            def move(it, idx, values):
+                if sign < 0:
+                    values = -values
+                it.rotate(idx, values)
+        else:
+            raise NotImplementedError("Unknown move: %s." % stmt)
+
+        def run(it, idx):
+            err = np.zeros(idx.shape, dtype=bool)
+            values = lanes(amount(it, idx, err), idx)
+            ok = it.fail(idx, err)
+            move(it, idx[ok], values[ok])
+            it.pcs[idx] += 1
+
+    elif isinstance(stmt, ChironAST.PenCommand):
+        down = stmt.status == "pendown"
+
+        def run(it, idx):
+            it.pen[idx] = down
+            it.pcs[idx] += 1
+
+    elif isinstance(stmt, ChironAST.GotoCommand):
+        xcor, ycor = compileBatchExpr(stmt.xcor), compileBatchExpr(stmt.ycor)
+
+        def run(it, idx):
+            err = np.zeros(idx.shape, dtype=bool)
+            xs, ys = lanes(xcor(it, idx, err), idx), lanes(ycor(it, idx, err), idx)
+            ok = it.fail(idx, err)
+            it.x[idx[ok]] = xs[ok]
+            it.y[idx[ok]] = ys[ok]
+            it.pcs[idx] += 1
+
+    elif isinstance(stmt, (ChironAST.AssertCommand, ChironAST.AssumeCommand)):
+        cond = compileBatchExpr(stmt.cond)
+
+        def run(it, idx):
+            # As in the scalar interpreter a violation (or an error while
+            # checking) is counted and the lane carries on.
+            err = np.zeros(idx.shape, dtype=bool)
+            holds = np.broadcast_to(truth(cond(it, idx, err)), idx.shape)
+            it.violations[idx] += err | ~holds
+            it.pcs[idx] += 1
+
+    elif isinstance(stmt, (ChironAST.NoOpCommand, ChironAST.PauseCommand)):
+
+        def run(it, idx):
+            it.pcs[idx] += 1
+
+    else:
+        raise NotImplementedError("Unknown instruction: %s, %s." % (type(stmt), stmt))
+    return run
+
+
+def compileBatchIR(ir):
+    return [compileBatchInstruction(stmt, tgt) for stmt, tgt in ir]
+
+
+class BatchInterpreter:
+    def __init__(self, irHandler, inputs):
+        """
+        Args:
+            irHandler (IRHandler): program to run.
+            inputs (List[dict]): one input dict ({":x": value}) per lane.
+        """
+        self.ir = irHandler.ir
+        self.compiled = irHandler.getCompiledBatchIR()
+        self.size = len(inputs)
+        self.pcs = np.zeros(self.size, dtype=np.int64)
+        self.status = np.full(self.size, RUNNING, dtype=np.int8)
+        self.steps = 0
+        self.laneSteps = np.zeros(self.size, dtype=np.int64)
+        self.coverage = np.zeros((self.size, len(self.ir)), dtype=bool)
+        self.violations = np.zeros(self.size, dtype=np.int64)
+        # turtle state, same representation as HeadlessTurtle
+        self.x = np.zeros(self.size)
+        self.y = np.zeros(self.size)
+        self.ox = np.ones(self.size)
+        self.oy = np.zeros(self.size)
+        self.pen = np.ones(self.size, dtype=bool)
+        # program variables: values and per-lane "is defined" masks
+        self.vars = {}
+        self.defined = {}
+        for lane, params in enumerate(inputs):
+            for key, val in params.items():
+                name = key.replace(":", "").strip()
+                if name not in self.vars:
+                    self.vars[name] = np.zeros(self.size)
+                    self.defined[name] = np.zeros(self.size, dtype=bool)
+                self.vars[name][lane] = val
+                self.defined[name][lane] = True
+
+    def assign(self, name, idx, values):
+        if name not in self.vars:
+            self.vars[name] = np.zeros(self.size)
+            self.defined[name] = np.zeros(self.size, dtype=bool)
+        self.vars[name][idx] = values
+        self.defined[name][idx] = True
+
+    def fail(self, idx, err):
+        """Stop the lanes of 'idx' flagged in 'err'; return the mask of the others."""
+        if err.any():
+            self.status[idx[err]] = ERROR
+        return ~err
+
+    def rotate(self, idx, angles):
+        # Same computation as HeadlessTurtle.rotate, with math.cos/math.sin
+        # evaluated once per distinct angle.
+        uniq, inverse = np.unique(angles, return_inverse=True)
+        rads = [math.radians(a) for a in uniq]
+        c = np.array([math.cos(r) for r in rads])[inverse]
+        s = np.array([math.sin(r) for r in rads])[inverse]
+        ox, oy = self.ox[idx], self.oy[idx]
+        self.ox[idx] = ox * c - oy * s
+        self.oy[idx] = oy * c + ox * s
+
+    def run(self, deadline=None, maxSteps=None):
+        """
+        Run all lanes until they stop.
+
+        Args:
+            deadline (float): time.monotonic() value after which the
+                remaining lanes are stopped with TIMEOUT.
+            maxSteps (int): maximum number of instructions executed by
+                one lane (None or 0: no limit).
+
+        Returns:
+            BatchInterpreter: self, for chaining.
+        """
+        end = len(self.ir)
+        self.status[(self.pcs >= end) & (self.status == RUNNING)] = COMPLETED
+        ticks = CLOCK_PERIOD
+        while True:
+            active = np.flatnonzero(self.status == RUNNING)
+            if not active.size:
+                break
+            activePcs = self.pcs[active]
+            pc = activePcs.min()
+            idx = active[activePcs == pc]
+            self.coverage[idx, pc] = True
+            self.compiled[pc](self, idx)
+            self.status[idx[(self.pcs[idx] >= end) & (self.status[idx] == RUNNING)]] = COMPLETED
+            self.laneSteps[idx] += 1
+            if maxSteps:
+                self.status[idx[(self.laneSteps[idx] >= maxSteps) & (self.status[idx] == RUNNING)]] = STEP_LIMIT
+
+            self.steps += 1
+            ticks -= 1
+            if not ticks:
+                ticks = CLOCK_PERIOD
+                if deadline is not None and time.monotonic() > deadline:
+                    break
+        self.status[self.status == RUNNING] = TIMEOUT
+        return self
+
+    def laneCoverage(self, lane):
+        return np.flatnonzero(self.coverage[lane]).tolist()
+
+    def positions(self):
+        return list(zip(self.x.tolist(), self.y.tolist()))
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Branch distance feedback for numeric conditions.
+
+For every executed condition and assume, the branch distance (Korel,
+Tracey) measures how far its operands are from taking each direction:
+
+    a < b     true: a - b + K if a >= b      false: b - a if a < b
+    a <= b    true: a - b if a > b           false: b - a + K if a <= b
+    a == b    true: |a - b|                  false: K if a == b
+    a != b    true: K if a == b              false: |a - b|
+    and       true: the sum of both          false: the smaller one
+    or        true: the smaller one          false: the sum of both
+    not       swaps the directions
+
+(> and >= mirror < and <=; the direction taken has distance 0) and other
+conditions are 0 or K. Distances are normalized to d / (d + 1), below 1.
+
+A run keeps the smallest distance of every (branch, direction) pair in a
+compact array of doubles, two entries per branch (true, false), 1.0 for
+those never evaluated. An input is interesting if its run brings some
+direction closer than all earlier runs did; a direction at 0 is covered
+and can only stay so. This gives the search a gradient toward conditions
+such as ':x > :y' that coverage alone does not.
+
+The 'block' engine does not record distances, nor do the repeat loops
+run in closed form (see loopAccel.py).
+"""
+
+from array import array
+
+from ChironAST import ChironAST
+from irCompiler import compileExpr
+
+
+K = 1.0
+
+
+def compare(symbol, a, b):
+    # (distance to true, distance to false) of 'a symbol b'
+    if symbol == "<":
+        return (0.0, b - a) if a < b else (a - b + K, 0.0)
+    if symbol == ">":
+        return (0.0, a - b) if a > b else (b - a + K, 0.0)
+    if symbol == "<=":
+        return (0.0, b - a + K) if a <= b else (a - b, 0.0)
+    if symbol == ">=":
+        return (0.0, a - b + K) if a >= b else (b - a, 0.0)
+    if symbol == "==":
+        return (0.0, K) if a == b else (abs(a - b), 0.0)
+    if symbol == "!=":
+        return (0.0, abs(a - b)) if a != b else (K, 0.0)
+    raise NotImplementedError("Unknown comparison: %s." % symbol)
+
+
+def compileDistance(cond):
+    """
+    Compile a condition into a closure f(store, trtl) returning its
+    (distance to true, distance to false).
+    """
+    if isinstance(cond, ChironAST.NOT):
+        sub = compileDistance(cond.expr)
+
+        def run(store, trtl):
+            dTrue, dFalse = sub(store, trtl)
+            return dFalse, dTrue
+
+        return run
+    if isinstance(cond, (ChironAST.AND, ChironAST.OR)):
+        lhs, rhs = compileDistance(cond.lexpr), compileDistance(cond.rexpr)
+        isAnd = isinstance(cond, ChironAST.AND)
+
+        def run(store, trtl):
+            lTrue, lFalse = lhs(store, trtl)
+            rTrue, rFalse = rhs(store, trtl)
+            if isAnd:
+                return lTrue + rTrue, min(lFalse, rFalse)
+            return min(lTrue, rTrue), lFalse + rFalse
+
+        return run
+    if isinstance(cond, ChironAST.BinCondOp):
+        lhs, rhs = compileExpr(cond.lexpr), compileExpr(cond.rexpr)
+        symbol = cond.symbol
+        return lambda store, trtl: compare(symbol, lhs(store, trtl), rhs(store, trtl))
+    val = compileExpr(cond)
+    return lambda store, trtl: (0.0, K) if val(store, trtl) else (K, 0.0)
+
+
+class BranchDistance:
+    def __init__(self, ir):
+        self.sites = [] # pc of every condition and assume with a distance
+        # pc -> record(it, distances), called after the instruction ran
+        self.record = [None] * len(ir)
+        for pc, (stmt, _) in enumerate(ir):
+            if not isinstance(stmt, (ChironAST.ConditionCommand, ChironAST.AssumeCommand)):
+                continue
+            if isinstance(stmt.cond, (ChironAST.BoolTrue, ChironAST.BoolFalse)):
+                # jumps, a direction that can never be taken
+                continue
+            self.record[pc] = self.compileRecord(compileDistance(stmt.cond), 2 * len(self.sites))
+            self.sites.append(pc)
+        self.size = 2 * len(self.sites)
+        self.template = array("d", [1.0]) * self.size
+
+    def compileRecord(self, distance, base):
+        def record(it, distances):
+            try:
+                dTrue, dFalse = distance(it.store, it.trtl)
+            except Exception:
+                return
+            dTrue, dFalse = dTrue / (dTrue + 1.0), dFalse / (dFalse + 1.0)
+            if dTrue < distances[base]:
+                distances[base] = dTrue
+            if dFalse < distances[base + 1]:
+                distances[base + 1] = dFalse
+
+        return record
+
+    def newDistances(self):
+        return array("d", self.template)
+
+    def covered(self, distances):
+        return sum(1 for dist in distances if dist == 0.0)
+
+
+def closer(best, distances):
+    """
+    True if the run with 'distances' is closer than 'best' to some branch
+    direction; 'best' is lowered to it.
+    """
+    improved = False
+    for idx, dist in enumerate(distances):
+        if dist < best[idx]:
+            best[idx] = dist
+            improved = True
+    return improved
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CFG edge and bounded path coverage for the fuzzer.
+
+The edges of the CFG built by cfgBuilder.buildCFG (labelled Cond_True,
+Cond_False or flow_edge) are numbered once per IR. The interpreter only
+has to look at the last instruction of every basic block: edgeTo[pc] maps
+the leader of the block executed next to the id of the edge taken, and
+recordEdge bumps a saturating 8-bit counter in a preallocated bytearray.
+Unlike statement coverage this tells apart inputs that reach the same
+blocks through different branch directions.
+
+The path hash folds in the ids of the edges in the order they are taken,
+but every edge only for its first PATH_BOUND traversals, so that loops
+running a different number of times do not all count as new paths.
+"""
+
+import numpy as np
+
+import cfg.cfgBuilder as cfgB
+from coverageMap import EdgeCoverageMetric, classify
+
+
+PATH_BOUND = 4
+PATH_MAP_SIZE = 1 << 12
+HASH_MASK = (1 << 64) - 1
+
+
+class CFGEdges:
+    def __init__(self, ir):
+        cfg, _ = cfgB.buildCFG(ir)
+        edges = []
+        for u, v, data in cfg.nxgraph.edges(data=True):
+            if not len(u.instrlist):
+                continue
+            last = u.instrlist[-1][1]
+            target = v.instrlist[0][1] if len(v.instrlist) else len(ir)
+            edges.append((u.instrlist[0][1], last, target, data.get("label")))
+        edges.sort()
+        # (leader, target leader, label) of every edge, indexed by id
+        self.labels = [(leader, target, label) for leader, _, target, label in edges]
+        # last pc of a block -> {target leader: edge id}
+        self.edgeTo = [None] * len(ir)
+        for eid, (_, last, target, _) in enumerate(edges):
+            if self.edgeTo[last] is None:
+                self.edgeTo[last] = {}
+            self.edgeTo[last][target] = eid
+        self.size = len(edges)
+
+    def newHits(self):
+        return bytearray(self.size)
+
+
+def recordEdge(hits, path, eid):
+    # take edge 'eid', returns the new path hash
+    seen = hits[eid]
+    if seen < 0xFF:
+        hits[eid] = seen + 1
+    if seen < PATH_BOUND:
+        path = (path * 1000003 + eid + 1) & HASH_MASK
+    return path
+
+
+def recordCycle(hits, path, eids, times):
+    # take the edges 'eids' in order, 'times' times over
+    for _ in range(min(times, PATH_BOUND)):
+        for eid in eids:
+            path = recordEdge(hits, path, eid)
+    # every edge was taken PATH_BOUND times already, only count the rest
+    for eid in eids:
+        hits[eid] = min(hits[eid] + max(times - PATH_BOUND, 0), 0xFF)
+    return path
+
+
+def pathMetric(hits, path):
+    # bucketed edge counts followed by a one-hot map of the path hash
+    metric = np.zeros(len(hits) + PATH_MAP_SIZE, dtype=np.uint8)
+    metric[: len(hits)] = classify(hits)
+    metric[len(hits) + path % PATH_MAP_SIZE] = 1
+    return metric
+
+
+class PathCoverageMetric(EdgeCoverageMetric):
+    """
+    EdgeCoverageMetric over pathMetric() maps: a run is new if it takes a
+    CFG edge a new number of times or follows a new bounded path.
+    """
+
+    def __init__(self, edges):
+        super().__init__()
+        self.edges = edges # number of CFG edges, the size of the edge part
+
+    def summary(self):
+        if self.total_metric is None:
+            return "no edges"
+        seen = self.total_metric != 0xFF
+        return "%d of %d CFG edges, %d paths" % (
+            int(seen[: self.edges].sum()), self.edges, int(seen[self.edges :].sum())
+        )
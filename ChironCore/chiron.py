@@ -21,6 +21,11 @@ import argparse
 from interpreter import *
 from irhandler import *
 from fuzzer import *
+from parallelFuzzer import fuzzParallel
+from corpusDir import CorpusDir
+from directed import parseTarget
+from inputMinimizer import InputMinimizer
+from resultCache import ResultCache
 import sExecution as se
 import cfg.cfgBuilder as cfgB
 import bmc as bmc
@@ -41,6 +46,15 @@ def stopTurtle():
     turtle.bye()
 
 
+def reportTrace(tracer, ir, args):
+    if not tracer.enabled:
+        return
+    print(tracer.summary(ir))
+    if args.trace_out:
+        tracer.exportNDJSON(args.trace_out, ir)
+        print(f"Trace written to {args.trace_out}")
+
+
 if __name__ == "__main__":
     print(Release)
     print(
@@ -73,6 +87,13 @@ if __name__ == "__main__":
         help="execute Chiron program, the figure/shapes the turle draws is shown in a UI.",
     )
 
+    cmdparser.add_argument(
+        "-hl",
+        "--headless",
+        action="store_true",
+        help="execute Chiron program (with '-r') without opening the turtle UI, the final turtle state is printed instead.",
+    )
+
     cmdparser.add_argument(
         "-gr",
         "--fuzzer_gen_rand",
@@ -88,6 +109,209 @@ if __name__ == "__main__":
         "-k", "--hooks", action="store_true", help="Run hooks for Kachua."
     )
 
+    cmdparser.add_argument(
+        "-eng",
+        "--engine",
+        choices=["closure", "block", "program", "exec"],
+        default="closure",
+        help="Execution engine of the interpreter: 'closure' runs the IR compiled once into Python closures, 'block' runs these closures a whole basic block at a time and records coverage per block, 'program' compiles the whole program into one Python function, 'exec' runs every statement through exec(). Default is closure.",
+    )
+
+    cmdparser.add_argument(
+        "-acc",
+        "--accelerate",
+        action="store_true",
+        help="Run repeat loops whose body only moves the turtle in closed form instead of iteration by iteration (headless runs with the closure engine).",
+    )
+
+    cmdparser.add_argument(
+        "-cov",
+        "--coverage",
+        choices=["submission", "edges", "cfg-edges", "paths"],
+        default="submission",
+        help="Coverage metric of the fuzzer: 'submission' uses CustomCoverageMetric, 'edges' the built-in AFL-style edge hit-count map, 'cfg-edges' hit counts of the labelled edges of the CFG and 'paths' these plus a hash of the path taken (every edge counted for its first few traversals). Default is submission.",
+    )
+
+    cmdparser.add_argument(
+        "-cs",
+        "--cache-size",
+        default=4096,
+        type=int,
+        help="Number of execution results the fuzzer and SBFL keep in memory to skip re-running the same inputs (0 to disable). Default is 4096.",
+    )
+
+    cmdparser.add_argument(
+        "-cdir",
+        "--cache-dir",
+        default=None,
+        type=str,
+        help="Directory in which execution results are also cached across runs.",
+    )
+
+    cmdparser.add_argument(
+        "-tr",
+        "--trace",
+        choices=["off", "events", "values", "print"],
+        default="off",
+        help="Trace level of the interpreter: 'events' records (pc, opcode) of executed instructions, 'values' also records their values, 'print' also prints them. Default is off.",
+    )
+
+    cmdparser.add_argument(
+        "-trsz",
+        "--trace-size",
+        default=65536,
+        type=int,
+        help="Number of trace events kept in the trace ring buffer. Default is 65536.",
+    )
+
+    cmdparser.add_argument(
+        "-trout",
+        "--trace-out",
+        default="",
+        type=str,
+        help="Export the trace events to this file as NDJSON.",
+    )
+
+    cmdparser.add_argument(
+        "-vec",
+        "--vectorized",
+        action="store_true",
+        help="Fuzzer and SBFL execute inputs in batches with the NumPy lockstep interpreter.",
+    )
+
+    cmdparser.add_argument(
+        "-bs",
+        "--batch-size",
+        default=64,
+        type=int,
+        help="Number of mutated inputs the fuzzer executes per batch with '--vectorized'. Default is 64.",
+    )
+
+    cmdparser.add_argument(
+        "-j",
+        "--jobs",
+        default=1,
+        type=int,
+        help="Number of fuzzer worker processes. Workers share the inputs they find through the sync directory. Default is 1.",
+    )
+
+    cmdparser.add_argument(
+        "-sdir",
+        "--sync-dir",
+        default=None,
+        help="Sync directory of the fuzzer workers with '--jobs', one queue per worker (default: a new temporary directory).",
+    )
+
+    cmdparser.add_argument(
+        "-si",
+        "--sync-interval",
+        default=2.0,
+        type=float,
+        help="Seconds between two syncs of a fuzzer worker with the queues of the others. Default is 2.",
+    )
+
+    cmdparser.add_argument(
+        "-corp",
+        "--corpus-dir",
+        default=None,
+        help="Corpus directory of the fuzzer, one JSON file per input. Its inputs are run before fuzzing starts, so a campaign resumes where the earlier ones stopped, and new inputs are added to it.",
+    )
+
+    cmdparser.add_argument(
+        "-cmin",
+        "--cmin",
+        default=None,
+        metavar="OUTDIR",
+        help="Minimize the corpus of '--corpus-dir' into OUTDIR: the smallest subset found by a greedy set cover that has the same coverage (of the '--coverage' kind).",
+    )
+
+    cmdparser.add_argument(
+        "-tmin",
+        "--tmin",
+        action="store_true",
+        help="Minimize the input of '-d': shrink its values toward zero while the run keeps the same outcome, failed checks and path hash. With '--jobs', candidates run in that many worker processes; '--timeout' is the time limit of one run.",
+    )
+
+    cmdparser.add_argument(
+        "-cmp",
+        "--cmplog",
+        action="store_true",
+        help="Fuzzer runs every corpus entry once logging the operands of its comparisons and tries the inputs that substitute them into the variables they match (input-to-state stage).",
+    )
+
+    cmdparser.add_argument(
+        "-sch",
+        "--schedule",
+        choices=["fast", "uniform"],
+        default="fast",
+        help="Seed schedule of the fuzzer: 'fast' selects seeds by the rarity of the coverage they hit and mutates each a number of times that grows for rarely run paths (AFLFast/Entropic style), 'uniform' mutates a uniformly chosen seed once. Default is fast.",
+    )
+
+    cmdparser.add_argument(
+        "-stdir",
+        "--stats-dir",
+        default=None,
+        help="Print live fuzzer statistics and write them to this directory: fuzzer_stats, rewritten at every update, and the CSV time series plot_data (one subdirectory per worker with '-j').",
+    )
+    cmdparser.add_argument(
+        "-stint",
+        "--stats-interval",
+        type=float,
+        default=5.0,
+        help="Seconds between two updates of the fuzzer statistics (default 5).",
+    )
+    cmdparser.add_argument(
+        "-fdir",
+        "--findings-dir",
+        default=None,
+        help="Save the failed asserts/assumes and hangs found while fuzzing to this directory, one input per (failing pc, path hash) bucket and per path hash of the hangs, with summary.json (one subdirectory per worker with '-j').",
+    )
+
+    cmdparser.add_argument(
+        "-hy",
+        "--hybrid",
+        action="store_true",
+        help="Hybrid concolic fuzzing: when coverage plateaus, a solver process negates the uncovered branch directions of the corpus inputs' paths with z3 and the fuzzer runs the inputs it solves.",
+    )
+    cmdparser.add_argument(
+        "-hyp",
+        "--hybrid-plateau",
+        type=float,
+        default=1.0,
+        help="Seconds without a new corpus input after which the corpus is handed to the solver (default 1).",
+    )
+
+    cmdparser.add_argument(
+        "-mut",
+        "--mutator",
+        choices=["auto", "submission", "havoc"],
+        default="auto",
+        help="Mutator of the fuzzer: 'submission' uses CustomMutator, 'havoc' the built-in engine stacking arithmetic, bit flip, sign flip, interesting value and splice operators with adaptive (MOpt-style) operator probabilities, 'auto' the submission mutator unless it returns inputs unchanged. Default is auto.",
+    )
+
+    cmdparser.add_argument(
+        "-bd",
+        "--branch-distance",
+        action="store_true",
+        help="Branch distance feedback: the fuzzer also keeps inputs, and the SBFL test generator mutates from tests, whose runs get closer to taking some branch direction (|lhs - rhs| of its condition) than any earlier run.",
+    )
+
+    cmdparser.add_argument(
+        "-dict",
+        "--dictionary",
+        action="store_true",
+        help="Dictionary stage: try every corpus input with each variable set to each interesting value extracted from the IR (literals and their neighbours, turn angle multiples, loop bounds).",
+    )
+
+    cmdparser.add_argument(
+        "-tgt",
+        "--target",
+        action="append",
+        type=parseTarget,
+        default=None,
+        help="Directed fuzzing toward the IR statement L<idx> (repeatable, see '--ir' for the indices): seeds whose runs get closer to the targets in the CFG get more energy, and fuzzing stops once all targets are reached. Needs the 'fast' schedule.",
+    )
+
     cmdparser.add_argument(
         "-z",
         "--fuzz",
@@ -101,6 +325,13 @@ if __name__ == "__main__":
         type=float,
         help="Timeout Parameter for Analysis (in secs). This is the total timeout.",
     )
+    cmdparser.add_argument(
+        "-ms",
+        "--max-steps",
+        default=1000000,
+        type=int,
+        help="Maximum number of instructions one execution may run in fuzzing, SBFL and symbolic execution before it is classified as a hang (0 for no limit). Default is 1000000.",
+    )
     cmdparser.add_argument("progfl")
 
     # passing variable values via command line. E.g.
@@ -285,7 +516,11 @@ if __name__ == "__main__":
         # ./chiron.py -t 100 --symbolicExecution example/example2.tl -d '{":dir": 10, ":move": -90}'
         """
         se.symbolicExecutionMain(
-            irHandler, args.params, args.constparams, timeLimit=args.timeout
+            irHandler,
+            args.params,
+            args.constparams,
+            timeLimit=args.timeout,
+            maxSteps=args.max_steps,
         )
 
     if args.fuzz:
@@ -298,13 +533,63 @@ if __name__ == "__main__":
         # ./chiron.py -t 100 --fuzz example/example1.tl -d '{":x": 5, ":y": 100}'
         # ./chiron.py -t 100 --fuzz example/example2.tl -d '{":dir": 3, ":move": 5}'
         """
-        fuzzer = Fuzzer(irHandler, args)
-        cov, corpus = fuzzer.fuzz(
-            timeLimit=args.timeout, generateRandom=args.fuzzer_gen_rand
-        )
-        print(f"Coverage : {cov.total_metric},\nCorpus:")
+        if args.target:
+            # the uniform schedule has no energy to direct
+            if args.schedule != "fast":
+                cmdparser.error("'--target' needs the 'fast' schedule, not '--schedule %s'." % args.schedule)
+            for target in args.target:
+                if not 0 <= target < len(irHandler.ir):
+                    cmdparser.error(
+                        "target L%d is not in the IR (L0 to L%d, see '--ir')." % (target, len(irHandler.ir) - 1)
+                    )
+        if args.jobs > 1:
+            cov, corpus = fuzzParallel(irHandler, args)
+            fuzzer = None
+        else:
+            fuzzer = Fuzzer(irHandler, args)
+            cov, corpus = fuzzer.fuzz(
+                timeLimit=args.timeout, generateRandom=args.fuzzer_gen_rand
+            )
+        if cov.hitMap:
+            print(f"Coverage : {cov.summary()},\nCorpus:")
+        else:
+            print(f"Coverage : {cov.total_metric},\nCorpus:")
         for index, x in enumerate(corpus):
             print(f"\tInput {index} : {x.data}")
+        if fuzzer is not None:
+            reportTrace(fuzzer.tracer, irHandler.ir, args)
+
+    if args.cmin:
+        if args.corpus_dir is None:
+            raise RuntimeError("Corpus minimization needs a corpus. Specify it using '--corpus-dir'.")
+        """
+        How to minimize a corpus?
+        # ./chiron.py --cmin corpus.min --corpus-dir corpus -cov edges example/example1.tl
+        """
+        fuzzer = Fuzzer(irHandler, args)
+        entries = fuzzer.corpusDir.load()
+        kept = fuzzer.minimizeCorpus(entries)
+        out = CorpusDir(args.cmin)
+        for data, coverage in kept:
+            out.save(data, fuzzer.feedback, coverage)
+        print(f"[cmin] Kept {len(kept)} of {len(entries)} inputs in {args.cmin}")
+
+    if args.tmin:
+        if not args.params:
+            raise RuntimeError("Test-case minimization needs an input. Specify it using '-d' or '--params' flag.")
+        """
+        How to minimize an input?
+        # ./chiron.py --tmin -d '{":x": 5000, ":y": -33}' -j 4 example/example1.tl
+        """
+        minimizer = InputMinimizer(irHandler, args)
+        try:
+            data, signature = minimizer.minimize(args.params)
+        finally:
+            minimizer.close()
+        print(f"[tmin] {args.params} -> {data} in {minimizer.runs} runs")
+        print(f"[tmin] Outcome : {signature[0]}" + (
+            f", failed checks : {list(signature[1])}, path hash : {signature[2]:#x}" if len(signature) > 1 else ""
+        ))
 
     if args.run:
         # for stmt,pc in ir:
@@ -313,16 +598,20 @@ if __name__ == "__main__":
         inptr = ConcreteInterpreter(irHandler, args)
         terminated = False
         inptr.initProgramContext(args.params)
-        while True:
-            terminated = inptr.interpret()
-            if terminated:
-                break
+        inptr.run()
         print("Program Ended.")
+        for pc in inptr.violations:
+            print(f"Check failed : [L{pc}] {irHandler.ir[pc][0]}")
         print()
-        print("Press ESCAPE to exit")
-        turtle.listen()
-        turtle.onkeypress(stopTurtle, "Escape")
-        turtle.mainloop()
+        reportTrace(inptr.tracer, irHandler.ir, args)
+        if args.headless:
+            print(f"Turtle position : {inptr.trtl.pos()}, heading : {inptr.trtl.heading()}")
+            print(f"Segments drawn : {len(inptr.trtl.segments)}")
+        else:
+            print("Press ESCAPE to exit")
+            turtle.listen()
+            turtle.onkeypress(stopTurtle, "Escape")
+            turtle.mainloop()
 
     if args.SBFL:
         if not args.buggy:
@@ -384,6 +673,11 @@ if __name__ == "__main__":
             mutpb=args.mutpb,
             ngen=args.ngen,
             verbose=args.verbose,
+            vectorized=args.vectorized,
+            maxSteps=args.max_steps,
+            engine=args.engine,
+            cache=ResultCache.fromArgs(args),
+            branchDistance=args.branch_distance,
         )
         # compute ranks of components and write to file
         computeRanks(
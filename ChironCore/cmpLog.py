@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Comparison operand logging (cmplog) and the input-to-state stage.
+
+The IR is compiled a second time with every comparison (<, >, <=, >=, ==,
+!=) of its conditions, asserts and assumes instrumented to record its
+operand values in a per-run table, one small list per comparison site
+holding the first CMP_LOG_DEPTH evaluations. The fuzzer runs a seed once
+with these closures, as AFL++ runs its cmplog binary, and its regular runs
+stay uninstrumented.
+
+Input-to-state substitution (RedQueen) then assumes an operand equal to
+the value of an input variable comes straight from that input: the
+variable is replaced with the other operand of the comparison, and that
+value plus or minus one for the bounds of inequalities. Branches on magic
+values such as ':s1 == 1234' are solved without a constraint solver.
+"""
+
+from numbers import Number
+
+from irCompiler import compileInstruction
+
+
+CMP_LOG_DEPTH = 32
+MAX_CANDIDATES = 64
+
+
+class CmpLog:
+    def __init__(self, ir):
+        self.sites = [] # (pc, comparison) of every instrumented comparison
+        self.table = [] # for every site, (lhs, rhs) of its evaluations in this run
+        self.compiled = [
+            compileInstruction(stmt, tgt, pc, lambda expr, pc=pc: self.addSite(pc, expr))
+            for pc, (stmt, tgt) in enumerate(ir)
+        ]
+
+    def addSite(self, pc, expr):
+        entries = []
+        self.sites.append((pc, expr))
+        self.table.append(entries)
+
+        def record(lhs, rhs):
+            if len(entries) < CMP_LOG_DEPTH:
+                entries.append((lhs, rhs))
+
+        return record
+
+    def reset(self):
+        # the closures hold the lists, clear them in place
+        for entries in self.table:
+            entries.clear()
+
+
+def isNumber(val):
+    return isinstance(val, Number) and not isinstance(val, bool)
+
+
+def inputToState(data, cmpLog, limit=MAX_CANDIDATES):
+    """
+    Inputs derived from 'data' (dict) by substituting the operands logged
+    by 'cmpLog' in the run of 'data' into the variables they match.
+
+    Returns:
+        List: new input dicts, at most 'limit', without duplicates.
+    """
+    candidates, seen = [], set()
+    for entries in cmpLog.table:
+        for lhs, rhs in entries:
+            for this, other in ((lhs, rhs), (rhs, lhs)):
+                if not (isNumber(this) and isNumber(other)):
+                    continue
+                if isinstance(other, float) and other.is_integer():
+                    other = int(other)
+                for name, val in data.items():
+                    if not isNumber(val) or val != this:
+                        continue
+                    for repl in (other, other + 1, other - 1):
+                        if repl == val or (name, repl) in seen:
+                            continue
+                        seen.add((name, repl))
+                        mutated = dict(data)
+                        mutated[name] = repl
+                        candidates.append(mutated)
+                        if len(candidates) >= limit:
+                            return candidates
+    return candidates
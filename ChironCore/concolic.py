@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hybrid concolic fuzzing.
+
+When the fuzzer has added no input to its corpus for a while (a plateau),
+it sends the corpus entries the solver has not seen yet to a solver
+process and goes on fuzzing. The solver process runs each input once more,
+recording its trace and the outcome of every condition, and adds the
+branch directions taken to the set of covered directions. For every
+branch of the trace whose other direction is not covered yet, it encodes
+the path up to that branch with the z3Solver of the symbolic execution
+mode (see interfaces/sExecutionInterface.py), negates the branch and asks
+z3 for a model. The inputs of the models are sent back and the fuzzer runs
+them as any other input, keeping those that improve coverage.
+
+Each direction is tried once, from the first input reaching its branch,
+and a query gives up after SOLVER_TIMEOUT milliseconds. Conditions the
+solver cannot encode (turtle state, unsupported operators) are skipped.
+"""
+
+import contextlib
+import io
+import multiprocessing
+import queue
+
+from z3 import sat
+
+from ChironAST import ChironAST
+from interpreter import ConcreteInterpreter
+from interfaces.sExecutionInterface import z3Solver
+
+
+SOLVER_TIMEOUT = 1000 # ms
+POLL_INTERVAL = 0.25 # seconds between two checks of the fuzzer
+
+
+def encodeFlip(solver, ir, trace, branches, index):
+    """
+    Add to 'solver' the path condition of 'trace' (executed IR indices in
+    order) up to its index-th condition, with that condition negated.
+    'branches' holds the (pc, outcome) of the conditions of the trace.
+    """
+    count = 0
+    for pc in trace:
+        stmt, _ = ir[pc]
+        if isinstance(stmt, ChironAST.ConditionCommand):
+            _, outcome = branches[count]
+            flip = count == index
+            solver.handleCondition(stmt, outcome == flip)
+            if flip:
+                return
+            count += 1
+        elif isinstance(stmt, (ChironAST.AssertCommand, ChironAST.AssumeCommand)):
+            # a failing check does not change the state
+            continue
+        else:
+            solver.eval(stmt)
+
+
+def solveFlip(solver, ir, data, trace, branches, index):
+    """
+    Inputs that take the index-th condition of the run of 'data' the other
+    way, None if there are none or the path cannot be encoded.
+    """
+    solver.initProgramContext(data)
+    solver.resetSolver()
+    solver.s.set("timeout", SOLVER_TIMEOUT)
+    try:
+        # z3Solver prints and exits on conditions it cannot encode
+        with contextlib.redirect_stdout(io.StringIO()):
+            encodeFlip(solver, ir, trace, branches, index)
+    except (Exception, SystemExit):
+        return None
+    if solver.s.check() != sat:
+        return None
+    model = solver.s.model()
+    flipped = dict(data)
+    for decl in model:
+        key = ":" + str(decl)
+        if key in flipped:
+            flipped[key] = model[decl].as_long()
+    return flipped
+
+
+def solverWorker(irHandler, maxSteps, tasks, results):
+    # Body of the solver process: batches of inputs in, models out.
+    solver = z3Solver(irHandler.ir)
+    # the plain closure engine, its trace lists every executed instruction
+    it = ConcreteInterpreter(irHandler, None, headless=True)
+    covered = set() # (pc, outcome) of the branches taken by any input
+    tried = set()
+    while True:
+        batch = tasks.get()
+        if batch is None:
+            break
+        runs = []
+        for data in batch:
+            entry = it.runPrefix(data)
+            it.resume(entry, data)
+            trace, branches = list(range(entry.pc)), []
+            it.run(maxSteps=maxSteps, coverage=trace, branches=branches)
+            covered.update(branches)
+            runs.append((data, trace, branches))
+        for data, trace, branches in runs:
+            for index, (pc, outcome) in enumerate(branches):
+                direction = (pc, not outcome)
+                if direction in covered or direction in tried:
+                    continue
+                tried.add(direction)
+                if str(irHandler.ir[pc][0]) == "False":
+                    # unconditional jump
+                    continue
+                flipped = solveFlip(solver, irHandler.ir, data, trace, branches, index)
+                if flipped is not None:
+                    results.put(flipped)
+
+
+class ConcolicHelper:
+    def __init__(self, irHandler, maxSteps=None, plateau=1.0, ctx=None):
+        """
+        Args:
+            irHandler (IRHandler): the program, shared with the forked solver process.
+            maxSteps (int): instruction budget of the solver's runs.
+            plateau (float): seconds without a new corpus input before the
+                corpus is sent to the solver.
+            ctx: multiprocessing context, 'fork' so the compiled IR is shared.
+        """
+        ctx = ctx or multiprocessing.get_context("fork")
+        self.plateau = plateau
+        self.tasks = ctx.Queue()
+        self.results = ctx.Queue()
+        self.process = ctx.Process(
+            target=solverWorker, args=(irHandler, maxSteps, self.tasks, self.results), daemon=True
+        )
+        self.sent = 0 # corpus entries sent to the solver
+        self.solved = 0
+
+    @classmethod
+    def fromArgs(cls, irHandler, args):
+        if not getattr(args, "hybrid", False):
+            return None
+        return cls(irHandler, getattr(args, "max_steps", None), getattr(args, "hybrid_plateau", 1.0))
+
+    def start(self):
+        self.process.start()
+
+    def stop(self):
+        self.tasks.put(None)
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+    def submit(self, corpus):
+        # send the corpus entries added since the last call
+        if self.sent < len(corpus):
+            self.tasks.put([inputObject.data for inputObject in corpus[self.sent:]])
+            self.sent = len(corpus)
+
+    def poll(self):
+        # inputs solved since the last call, never blocks
+        inputs = []
+        while True:
+            try:
+                inputs.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+        self.solved += len(inputs)
+        return inputs
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+On-disk fuzzing corpus.
+
+A corpus directory holds one JSON file per input:
+
+    {"data": {"x": 5, "y": 100}, "kind": "paths", "coverage": [...]}
+
+named after the SHA-1 of the canonical form of the inputs, so the same
+input is stored once however many runs or workers find it, and files are
+written to a temporary name and renamed. 'coverage' lists the coverage
+features of the run that added the input (see features) and 'kind' the
+kind of coverage feedback they come from.
+
+A fuzzer given a corpus directory runs its inputs before mutating, which
+restores the coverage of the earlier campaigns, and adds every input that
+improves coverage to it. Corpus minimization keeps a subset of the inputs
+with the same features, chosen greedily as a set cover.
+"""
+
+import hashlib
+import heapq
+import json
+import os
+
+import numpy as np
+
+from resultCache import canonicalInputs
+
+
+def features(metric):
+    """
+    Coverage features of the curr_metric of a run: the covered IR indices
+    for a list, (index, bucket bit) pairs for a hit map.
+    """
+    if isinstance(metric, np.ndarray):
+        return {(int(idx), 1 << bit) for bit in range(8) for idx in np.flatnonzero(metric & (1 << bit))}
+    return set(metric)
+
+
+def fromFeatures(featureSet, size=None):
+    """
+    The curr_metric of a run from its features: a hit map of 'size'
+    entries, or the list of covered IR indices if 'size' is None.
+    """
+    if size is None:
+        return sorted(featureSet)
+    metric = np.zeros(size, dtype=np.uint8)
+    for idx, bit in featureSet:
+        metric[idx] |= bit
+    return metric
+
+
+def greedyCover(featureSets):
+    """
+    Greedy set cover: indices of a subset of 'featureSets' that has the
+    same union, picking the set with the most uncovered features first
+    (the first of equal sets).
+    """
+    covered = set()
+    chosen = []
+    # lazy greedy: a set only gains fewer new features as 'covered' grows
+    heap = [(-len(fs), idx) for idx, fs in enumerate(featureSets) if fs]
+    heapq.heapify(heap)
+    while heap:
+        negGain, idx = heapq.heappop(heap)
+        gain = len(featureSets[idx] - covered)
+        if not gain:
+            continue
+        if heap and gain < -heap[0][0]:
+            heapq.heappush(heap, (-gain, idx))
+            continue
+        chosen.append(idx)
+        covered |= featureSets[idx]
+    return sorted(chosen)
+
+
+def toJSON(feature):
+    return list(feature) if isinstance(feature, tuple) else feature
+
+
+def fromJSON(feature):
+    return tuple(feature) if isinstance(feature, list) else feature
+
+
+class CorpusDir:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def fromArgs(cls, args):
+        directory = getattr(args, "corpus_dir", None)
+        return cls(directory) if directory is not None else None
+
+    def path(self, data):
+        name = hashlib.sha1(canonicalInputs(data).encode()).hexdigest()
+        return os.path.join(self.directory, name + ".json")
+
+    def save(self, data, kind=None, coverage=None):
+        # 'coverage': the features of the run of 'data' with feedback 'kind'
+        path = self.path(data)
+        if os.path.exists(path):
+            return
+        entry = {"data": data}
+        if coverage is not None:
+            entry["kind"] = kind
+            entry["coverage"] = sorted(toJSON(f) for f in coverage)
+        # write and rename, readers never see a partial file
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def load(self):
+        """
+        Returns:
+            List: the entries of the corpus, dicts with 'data' and, if
+            recorded, 'kind' and 'coverage' (a set of features).
+        """
+        entries = []
+        for fl in sorted(os.listdir(self.directory)):
+            if not fl.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, fl)) as f:
+                    entry = json.load(f)
+                entry["data"]
+            except (OSError, ValueError, KeyError, TypeError):
+                print(f"[corpus] Skipping unreadable entry {fl}")
+                continue
+            if "coverage" in entry:
+                entry["coverage"] = {fromJSON(f) for f in entry["coverage"]}
+            entries.append(entry)
+        return entries
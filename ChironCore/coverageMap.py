@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AFL-style edge coverage for the fuzzer.
+
+Every IR index (and the exit, index len(ir)) gets a random location id.
+While a program runs, the interpreter counts the transition from the
+previous to the current instruction in a bytearray 'hits':
+
+    hits[id[cur] ^ (id[prev] >> 1)] += 1      (8-bit, saturating at 255)
+
+so the map records how often every edge was taken at the cost of one
+index per step, whatever the length of the run. The map is sized from the
+number of instructions, so collisions stay rare and the map small.
+
+After a run the counts are bucketed (1, 2, 3, 4-7, 8-15, 16-31, 32-127,
+128+) into one bit each, and compared in one vectorized operation against
+a global "virgin" map holding the bits never seen so far.
+"""
+
+import random
+
+import numpy as np
+
+from interfaces.fuzzerInterface import CoverageMetricBase
+
+
+MIN_MAP_SIZE = 256
+MAX_MAP_SIZE = 1 << 16
+
+# hit count -> bucket bit
+BUCKETS = np.zeros(256, dtype=np.uint8)
+for _count, _bit in [(1, 1), (2, 2), (3, 4)]:
+    BUCKETS[_count] = _bit
+BUCKETS[4:8] = 8
+BUCKETS[8:16] = 16
+BUCKETS[16:32] = 32
+BUCKETS[32:128] = 64
+BUCKETS[128:] = 128
+
+
+class EdgeMap:
+    # Geometry of the hit map of one IR.
+    def __init__(self, ir):
+        size = MIN_MAP_SIZE
+        while size < 8 * (len(ir) + 1) and size < MAX_MAP_SIZE:
+            size <<= 1
+        self.size = size
+        # fixed seed: the same IR gets the same ids in every run
+        rng = random.Random(len(ir))
+        self.ids = [rng.randrange(size) for _ in range(len(ir) + 1)]
+
+    def newHits(self):
+        return bytearray(self.size)
+
+
+def recordHit(hits, ids, prevLoc, pc, count=1):
+    # count the edge from the location prevLoc to 'pc' 'count' times,
+    # returns the prevLoc of the next edge
+    loc = ids[pc]
+    edge = loc ^ prevLoc
+    # saturate, a wrapped count of 256 would read as an edge never taken
+    count += hits[edge]
+    hits[edge] = count if count < 0xFF else 0xFF
+    return loc >> 1
+
+
+def classify(hits):
+    """Bucket the raw counts of 'hits' (bytearray) into a uint8 array."""
+    return BUCKETS[np.frombuffer(hits, dtype=np.uint8)]
+
+
+def sparse(hits):
+    # [[index, count], ...] of the non-zero counts, to store a map
+    counts = np.frombuffer(hits, dtype=np.uint8)
+    nz = np.flatnonzero(counts)
+    return [[int(i), int(counts[i])] for i in nz]
+
+
+def dense(pairs, size):
+    hits = bytearray(size)
+    for idx, count in pairs:
+        hits[idx] = count
+    return hits
+
+
+class EdgeCoverageMetric(CoverageMetricBase):
+    """
+    curr_metric is the bucketed map of one run (see classify) and
+    total_metric the virgin map: the bits of every byte not yet seen in
+    any run (None before the first run). Submissions can subclass it to
+    add their own policy on top of the map comparison.
+    """
+
+    hitMap = True
+
+    def __init__(self):
+        super().__init__()
+        self.curr_metric = None
+        self.total_metric = None
+
+    def compareCoverage(self, curr_metric, total_metric):
+        if total_metric is None:
+            return True
+        return bool((curr_metric & total_metric).any())
+
+    def hasNewEdges(self, curr_metric, total_metric):
+        # as AFL: a new edge rather than only a new hit count bucket
+        if total_metric is None:
+            return bool(curr_metric.any())
+        return bool(((curr_metric != 0) & (total_metric == 0xFF)).any())
+
+    def updateTotalCoverage(self, curr_metric, total_metric):
+        if total_metric is None:
+            total_metric = np.full(curr_metric.shape, 0xFF, dtype=np.uint8)
+        return total_metric & ~curr_metric
+
+    def summary(self):
+        if self.total_metric is None:
+            return "no edges"
+        edges = int((self.total_metric != 0xFF).sum())
+        return "%d edges of %d map entries" % (edges, self.total_metric.size)
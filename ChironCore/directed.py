@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Directed fuzzing toward target IR statements, as AFLGo.
+
+The distance of a basic block of the CFG to a target is the number of
+edges of the shortest path from the block to the block of the target
+(breadth-first search backwards from the target). The distance of a block
+to a set of targets is the harmonic mean of its distances to the targets
+it reaches, 0 for the blocks holding a target; blocks that reach no
+target have none.
+
+The distance of a seed is the mean distance of the blocks its run
+entered. The power schedule (see powerSchedule.py) multiplies the energy
+and the selection weight of a seed by
+
+    2 ^ (10 * (p - 1/2)),  p = (1 - d) (1 - T) + T / 2,  T = 20 ^ (-t / tx)
+
+with d the distance of the seed normalized over the corpus (0: closest)
+and t the time fuzzed so far: the temperature T anneals from exploration
+(every seed alike) at the start to exploitation (the closest seeds get up
+to MAX_FACTOR times more) once t passes tx, half the time budget.
+
+The campaign stops once every target has been reached.
+"""
+
+import math
+import time
+
+import networkx as nx
+
+import cfg.cfgBuilder as cfgB
+
+
+MAX_FACTOR = 32
+
+
+def parseTarget(spec):
+    # 'L12' or '12' -> 12
+    spec = spec.strip()
+    return int(spec[1:] if spec[:1] in ("L", "l") else spec)
+
+
+class DirectedDistance:
+    def __init__(self, ir, targets):
+        """
+        Args:
+            ir (List): the IR of the program.
+            targets (List): IR indices of the target statements.
+        """
+        self.targets = sorted(set(targets))
+        for target in self.targets:
+            if not 0 <= target < len(ir):
+                raise ValueError("target L%d is not in the IR (L0 to L%d)" % (target, len(ir) - 1))
+        cfg, _ = cfgB.buildCFG(ir)
+        graph = cfg.nxgraph
+        blocks = [node for node in graph.nodes() if len(node.instrlist)]
+        blockOf = {pc: node for node in blocks for _, pc in node.instrlist}
+        # edge distances of every block to each target
+        inverse = {node: 0.0 for node in blocks}
+        reaching = {node: 0 for node in blocks}
+        onTarget = set()
+        for target in self.targets:
+            onTarget.add(blockOf[target])
+            lengths = nx.single_source_shortest_path_length(graph.reverse(copy=False), blockOf[target])
+            for node, length in lengths.items():
+                if node in inverse and length:
+                    inverse[node] += 1.0 / length
+                    reaching[node] += 1
+        # distance of the block led by each pc, None elsewhere
+        self.blockDistance = [None] * len(ir)
+        for node in blocks:
+            leader = node.instrlist[0][1]
+            if node in onTarget:
+                self.blockDistance[leader] = 0.0
+            elif reaching[node]:
+                self.blockDistance[leader] = reaching[node] / inverse[node]
+        self.reached = set()
+        self.minDistance = self.maxDistance = None
+        self.start = time.monotonic()
+        self.tx = 0.0
+
+    @classmethod
+    def fromArgs(cls, ir, args):
+        targets = getattr(args, "target", None)
+        if not targets:
+            return None
+        return cls(ir, targets)
+
+    def begin(self, timeLimit):
+        self.start = time.monotonic()
+        self.tx = timeLimit / 2.0
+
+    def seedDistance(self, coverage):
+        # mean distance of the blocks entered by a run, None if none reach a target
+        distances = [self.blockDistance[pc] for pc in set(coverage)
+                     if pc < len(self.blockDistance) and self.blockDistance[pc] is not None]
+        if not distances:
+            return None
+        distance = sum(distances) / len(distances)
+        if self.minDistance is None or distance < self.minDistance:
+            self.minDistance = distance
+        if self.maxDistance is None or distance > self.maxDistance:
+            self.maxDistance = distance
+        return distance
+
+    def factor(self, distance):
+        # multiplier of the energy and weight of a seed at 'distance'
+        if distance is None or self.maxDistance is None:
+            return 1.0
+        spread = self.maxDistance - self.minDistance
+        normalized = (distance - self.minDistance) / spread if spread else 0.0
+        elapsed = time.monotonic() - self.start
+        temperature = math.pow(20.0, -elapsed / self.tx) if self.tx else 0.0
+        p = (1.0 - normalized) * (1.0 - temperature) + 0.5 * temperature
+        return math.pow(2.0, math.log2(MAX_FACTOR) * 2.0 * (p - 0.5))
+
+    def reach(self, coverage):
+        """Targets first reached by a run with 'coverage'."""
+        covered = set(coverage)
+        new = [target for target in self.targets if target not in self.reached and target in covered]
+        self.reached.update(new)
+        return new
+
+    def done(self):
+        return len(self.reached) == len(self.targets)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Findings of a fuzzing campaign: failed asserts and assumes, and hangs.
+
+While fuzzing with '--findings-dir', the interpreter reports every failed
+assert or assume as a Violation event (IR index, kind, condition, error
+and a copy of the variables, see ConcreteInterpreter.reportViolation())
+instead of printing it. Failures are bucketed by (kind, failing pc, path
+hash), the path hash being that of the CFG edges the run took up to its
+end (see cfgCoverage.py): the runs failing the same check along the same
+path are one finding, whatever their inputs. Runs stopped by the step
+budget are hangs, bucketed by path hash alone: where the budget runs out
+inside a loop is arbitrary, but the path hash only folds in the first
+traversals of every edge, so it is the same for the runs stuck in the
+same loop after the same way in.
+
+The first input of every bucket is saved to
+
+    <findings dir>/<kind>_L<pc>_<path hash>.json    (failed checks)
+    <findings dir>/hang_<path hash>.json            (hangs)
+
+with the event that made it ('data', 'kind', 'pc', 'pathHash',
+'outcome', for failed checks 'condition', 'error', 'store' and for hangs
+'stoppedAt', the pc the run was stopped at). A run is
+checked against the buckets with one set lookup per event, duplicates
+only increment a count. At the end of the campaign summary.json lists
+every bucket with its count and file.
+"""
+
+import json
+import os
+
+from interpreter import ExecutionResult
+
+
+class Findings:
+    def __init__(self, directory):
+        """
+        Args:
+            directory (str): where the findings are saved.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.buckets = {} # (kind, pc, pathHash) -> number of runs, pc None for hangs
+        self.files = {} # (kind, pc, pathHash) -> file name of its input
+        self.failures = 0
+
+    @classmethod
+    def fromArgs(cls, args):
+        directory = getattr(args, "findings_dir", None)
+        if directory is None:
+            return None
+        return cls(directory)
+
+    def add(self, data, events, pathHash, result=None, pc=None):
+        """
+        Record the run of input 'data' that ended with 'pathHash'.
+
+        Args:
+            events (List): the Violation events of the run.
+            result (ExecutionResult): the outcome of the run, a hang if it
+                was stopped by the step budget.
+            pc (int): where the run was stopped.
+
+        Returns:
+            int: the number of new buckets.
+        """
+        # runs stopped at the end of the campaign are not hangs
+        hung = result is not None and result.outcome == ExecutionResult.STEP_LIMIT
+        found = [("hang", None, None)] if hung else []
+        found.extend((event.kind, event.pc, event) for event in events)
+        new = 0
+        seen = set()
+        for kind, at, event in found:
+            key = (kind, at, pathHash)
+            if key in seen:
+                # the same check failing again in a loop of the run
+                continue
+            seen.add(key)
+            self.failures += 1
+            if key in self.buckets:
+                self.buckets[key] += 1
+                continue
+            self.buckets[key] = 1
+            self.files[key] = self.save(key, data, event, result, pc)
+            new += 1
+            where = "" if at is None else f" at L{at}"
+            print(f"[fuzzer] New finding : {kind}{where} (path {pathHash:016x}), {len(self.buckets)} buckets")
+        return new
+
+    def save(self, key, data, event, result, stoppedAt=None):
+        kind, pc, pathHash = key
+        if pc is None:
+            name = "%s_%016x.json" % (kind, pathHash)
+        else:
+            name = "%s_L%d_%016x.json" % (kind, pc, pathHash)
+        entry = {"data": data, "kind": kind, "pc": pc, "pathHash": pathHash}
+        if result is not None:
+            entry["outcome"] = result.outcome
+        if event is not None:
+            entry.update(event.toDict())
+        else:
+            entry["stoppedAt"] = stoppedAt
+        # write and rename, readers never see a partial file
+        path = os.path.join(self.directory, name)
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(entry, f, indent=1, default=str)
+        os.replace(tmp, path)
+        return name
+
+    def finish(self):
+        summary = [
+            {"kind": kind, "pc": pc, "pathHash": pathHash, "count": count, "file": self.files[(kind, pc, pathHash)]}
+            for (kind, pc, pathHash), count in sorted(self.buckets.items(), key=lambda item: -item[1])
+        ]
+        path = os.path.join(self.directory, "summary.json")
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(summary, f, indent=1)
+        os.replace(tmp, path)
+        print(f"[fuzzer] Findings : {self.failures} failures in {len(self.buckets)} buckets, saved to {self.directory}")
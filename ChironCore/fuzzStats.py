@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Live statistics of a fuzzing campaign.
+
+Every interval the fuzzer prints a status line and, like AFL, rewrites
+<stats dir>/fuzzer_stats ('key : value' lines) and appends one row to the
+CSV time series <stats dir>/plot_data:
+
+    execs_done, execs_per_sec    executions so far, and per second
+    corpus_count                 inputs in the corpus
+    line_coverage, edge_coverage IR lines and CFG edges covered, in %
+    since_last_find              seconds since an input was last added
+    stability                    % of calibrated inputs that ran the same
+    hangs                        runs stopped by the step or time budget
+
+The coverage is that of the inputs added to the corpus, the CFG edges
+being those their own runs recorded. The interpreter is deterministic, so
+only a sample of them is calibrated: the first input and every
+CALIBRATION_PERIOD-th after it are run once more without the result
+cache, and are stable if the second run executes the same IR lines along
+the same path. Inputs whose run recorded no CFG edges (result cache hits,
+'--vectorized' batches) are always run once more for their edges.
+"""
+
+import os
+import time
+
+from resultCache import canonicalInputs
+
+
+# one calibration run per CALIBRATION_PERIOD new inputs
+CALIBRATION_PERIOD = 16
+
+PLOT_FIELDS = [
+    "relative_time", "execs_done", "execs_per_sec", "corpus_count",
+    "line_coverage", "edge_coverage", "since_last_find", "stability", "hangs",
+]
+
+
+class FuzzStats:
+    def __init__(self, fuzzer, directory=None, interval=5.0):
+        """
+        Args:
+            fuzzer (Fuzzer): the fuzzer to report on.
+            directory (str): where fuzzer_stats and plot_data are written
+                (None: only print the status line).
+            interval (float): seconds between two updates.
+        """
+        self.fuzzer = fuzzer
+        self.directory = directory
+        self.interval = interval
+        self.cfgEdges = fuzzer.irHandler.getCFGEdges()
+        self.lines = bytearray(len(fuzzer.ir))
+        self.edges = bytearray(self.cfgEdges.size)
+        self.calibrated = set() # canonical inputs
+        self.stable = 0
+        self.found = 0 # new inputs, sampled for calibration
+        self.start = self.lastFind = self.nextUpdate = None
+        self.end = None # end of the campaign, bounds the calibration runs
+
+    @classmethod
+    def fromArgs(cls, fuzzer, args):
+        directory = getattr(args, "stats_dir", None)
+        if directory is None:
+            return None
+        return cls(fuzzer, directory, getattr(args, "stats_interval", 5.0))
+
+    def begin(self, end=None):
+        self.end = end
+        self.start = time.monotonic()
+        self.nextUpdate = self.start + self.interval
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, "plot_data"), "w") as f:
+                f.write("# " + ", ".join(PLOT_FIELDS) + "\n")
+
+    def newInput(self, data, coverage, cfgHits=None, pathHash=None):
+        # an input was added to the corpus, 'coverage': IR indices of its
+        # run, 'cfgHits' and 'pathHash': its CFG edges if it recorded them
+        self.lastFind = time.monotonic()
+        for pc in coverage:
+            if pc < len(self.lines):
+                self.lines[pc] = 1
+        if self.end is not None and self.lastFind >= self.end:
+            # cut by the end of the campaign, a second run would be too
+            return
+        sampled = self.found % CALIBRATION_PERIOD == 0
+        self.found += 1
+        key = canonicalInputs(data)
+        if (cfgHits is None or sampled) and key not in self.calibrated:
+            lines, hits, calibratedHash = self.fuzzer.calibrate(data, self.end)
+            if sampled:
+                self.calibrated.add(key)
+                if lines == set(coverage) and (cfgHits is None or pathHash == calibratedHash):
+                    self.stable += 1
+            if cfgHits is None:
+                cfgHits = hits
+        if cfgHits is None:
+            return
+        for eid, count in enumerate(cfgHits):
+            if count:
+                self.edges[eid] = 1
+
+    def tick(self):
+        if time.monotonic() >= self.nextUpdate:
+            self.update()
+
+    def snapshot(self):
+        now = time.monotonic()
+        elapsed = max(now - self.start, 1e-9)
+        execs = self.fuzzer.execs
+        return {
+            "relative_time": round(elapsed, 3),
+            "execs_done": execs,
+            "execs_per_sec": round(execs / elapsed, 2),
+            "corpus_count": len(self.fuzzer.corpus),
+            "line_coverage": round(100.0 * sum(self.lines) / max(len(self.lines), 1), 2),
+            "edge_coverage": round(100.0 * sum(self.edges) / max(len(self.edges), 1), 2),
+            "since_last_find": round(now - (self.lastFind or self.start), 3),
+            "stability": round(100.0 * self.stable / len(self.calibrated), 2) if self.calibrated else 100.0,
+            "hangs": self.fuzzer.hangs,
+        }
+
+    def update(self):
+        self.nextUpdate = time.monotonic() + self.interval
+        stats = self.snapshot()
+        print(
+            "[fuzzer] {relative_time:.0f}s : {execs_done} execs ({execs_per_sec:.0f}/s), "
+            "corpus {corpus_count}, lines {line_coverage}%, edges {edge_coverage}%, "
+            "last find {since_last_find:.1f}s ago, stability {stability}%".format(**stats)
+        )
+        if self.directory is None:
+            return
+        with open(os.path.join(self.directory, "plot_data"), "a") as f:
+            f.write(", ".join(str(stats[field]) for field in PLOT_FIELDS) + "\n")
+        # write and rename, readers never see a partial file
+        path = os.path.join(self.directory, "fuzzer_stats")
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "w") as f:
+            f.write("start_time        : %d\n" % (time.time() - stats["relative_time"]))
+            f.write("last_update       : %d\n" % time.time())
+            f.write("pid               : %d\n" % os.getpid())
+            for field in PLOT_FIELDS:
+                f.write("%-18s: %s\n" % (field, stats[field]))
+            f.write("lines_covered     : %d of %d\n" % (sum(self.lines), len(self.lines)))
+            f.write("edges_covered     : %d of %d\n" % (sum(self.edges), len(self.edges)))
+            f.write("feedback          : %s\n" % self.fuzzer.feedback)
+        os.replace(tmp, path)
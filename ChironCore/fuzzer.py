@@ -15,15 +15,31 @@ fuzzer loop.
 import sys
 import time
 import random
-import copy
 import uuid
 from interpreter import *
+from batchInterpreter import BatchInterpreter, COMPLETED, TIMEOUT
+from resultCache import ResultCache, ExecutionRecord
+from coverageMap import EdgeCoverageMetric, classify, sparse, dense, recordHit
+from cfgCoverage import PathCoverageMetric, pathMetric, recordEdge, PATH_MAP_SIZE
+from corpusDir import CorpusDir, features, fromFeatures, greedyCover
+from cmpLog import inputToState
+from powerSchedule import PowerSchedule
+from fuzzStats import FuzzStats
+from concolic import ConcolicHelper, POLL_INTERVAL
+from irDictionary import dictionaryInputs
+from directed import DirectedDistance
+from havoc import Havoc
+from branchDistance import closer
+from findings import Findings
 
 sys.path.insert(0, "../Submission/")
 from fuzzSubmission import *
 
 
 class InputObject:
+    # mask of the havoc operators that made the input (see havoc.py)
+    ops = None
+
     def __init__(self, data):
         self.id = str(uuid.uuid4())
         self.data = data
@@ -31,6 +47,15 @@ class InputObject:
         # for mutation or not.
         self.pickedOnce = False
 
+    def copy(self):
+        # Copy for the mutator: the values are numbers, so a new dict is
+        # a full copy and much cheaper than copy.deepcopy.
+        clone = InputObject.__new__(InputObject)
+        clone.id = self.id
+        clone.data = dict(self.data)
+        clone.pickedOnce = False
+        return clone
+
 
 class Fuzzer(ConcreteInterpreter):
     # Execute the program using the input from mutator
@@ -39,35 +64,389 @@ class Fuzzer(ConcreteInterpreter):
         ir (List): List of program IR statments
         params (dict): Mapped variables with initial assignments.
         """
-        super().__init__(irHandler, args)
+        # Kind of coverage feedback: 'submission', 'edges' (AFL-style map),
+        # 'cfg-edges' or 'paths' (CFG edges and bounded paths, see cfgCoverage.py).
+        self.feedback = getattr(args, "coverage", "submission")
+        engine = None
+        if getattr(args, "branch_distance", False) and getattr(args, "engine", None) == "block":
+            print("[fuzzer] The 'block' engine does not record branch distances, using 'closure'.")
+            engine = "closure"
+        super().__init__(irHandler, args, headless=True, engine=engine)
         self.ir = irHandler.ir
         self.params = args.params
         self.args = args
         self.corpus = []
         self.timeout = 0
         self.customMutator = CustomMutator()  # From submission
+        self.customMutator.dictionary = irHandler.getDictionary()
         self.coverage = CustomCoverageMetric()  # From submission
+        self.cfgEdges = None
+        if self.feedback in ("edges", "cfg-edges"):
+            self.coverage = EdgeCoverageMetric()
+        elif self.feedback == "paths":
+            self.coverage = PathCoverageMetric(irHandler.getCFGEdges().size)
+        # The metric compares hit maps (see coverageMap.py) instead of
+        # lists of covered IR indices.
+        self.hitMap = self.coverage.hitMap
+        if self.feedback == "submission" and self.hitMap:
+            self.feedback = "edges"
+        # Built-in havoc engine, used instead of the submission mutator
+        # with '--mutator havoc' or when that one is a stub.
+        self.havoc = None
+        mutator = getattr(args, "mutator", "auto")
+        if mutator == "havoc" or (mutator == "auto" and self.params and self.stubMutator()):
+            if mutator == "auto":
+                print("[fuzzer] The submission mutator leaves inputs unchanged, using the havoc engine.")
+            self.havoc = Havoc(irHandler.getDictionary())
+        self.edgeMap = irHandler.getEdgeMap() if self.feedback == "edges" else None
+        if self.feedback in ("cfg-edges", "paths"):
+            self.cfgEdges = irHandler.getCFGEdges()
+        self.mapSize = (self.edgeMap or self.cfgEdges).size if self.hitMap else 0
+        # Execute batches of mutated inputs with the lockstep interpreter.
+        self.vectorized = getattr(args, "vectorized", False)
+        self.batchSize = getattr(args, "batch_size", 64)
+        if self.vectorized and self.hitMap:
+            print("[fuzzer] Edge hit maps need the scalar interpreter, '--vectorized' is ignored.")
+            self.vectorized = False
+        # Branch distance feedback: inputs whose runs get closer to some
+        # branch direction than any earlier run are kept too (see
+        # branchDistance.py).
+        self.branchDistance = None
+        self.lastDistances = None
+        if getattr(args, "branch_distance", False):
+            self.branchDistance = irHandler.getBranchDistance()
+            self.bestDistances = self.branchDistance.newDistances()
+            if self.vectorized:
+                print("[fuzzer] Branch distances need the scalar interpreter, '--vectorized' is ignored.")
+                self.vectorized = False
+        # Instruction budget of one execution (None or 0: no limit).
+        self.maxSteps = getattr(args, "max_steps", None)
+        self.lastResult = None
+        # Snapshot after the part of the program that does not depend on
+        # the inputs, every execution starts from it (see runPrefix).
+        self.entry = None
+        self.entryInputs = set()
+        self.entryHits = None
+        self.entryCfgHits = None
+        # results of inputs that were already executed
+        self.cache = ResultCache.fromArgs(args)
+        # Queue directory shared with the other workers of a parallel
+        # run (see parallelFuzzer.py), None when fuzzing alone.
+        self.sync = None
+        self.execs = 0
+        # inputs of earlier campaigns, new inputs are added to it
+        self.corpusDir = CorpusDir.fromArgs(args)
+        # Input-to-state stage: every corpus entry is run once more by an
+        # interpreter logging comparison operands (see cmpLog.py).
+        self.cmpLog = None
+        if getattr(args, "cmplog", False):
+            self.cmpLog = irHandler.getCmpLog()
+            self.cmpLogger = ConcreteInterpreter(irHandler, args, headless=True, engine="closure")
+            self.cmpLogger.compiled = self.cmpLog.compiled
+            self.cmpLogger.loops = None
+            # corpus entries the stage already ran on
+            self.cmpLogged = 0
+        # picks the seed to mutate and how many times (see powerSchedule.py)
+        features = len(self.ir) + 1
+        if self.hitMap:
+            features = self.mapSize + (PATH_MAP_SIZE if self.feedback == "paths" else 0)
+        self.scheduler = PowerSchedule(features, getattr(args, "schedule", "fast"))
+        # Directed fuzzing: seeds closer to the target statements get more
+        # energy as the campaign goes on (see directed.py).
+        self.directed = DirectedDistance.fromArgs(self.ir, args)
+        self.scheduler.directed = self.directed
+        # Dictionary stage: every corpus entry is tried with each variable
+        # set to each value of the IR dictionary (see irDictionary.py).
+        self.dictionary = irHandler.getDictionary() if getattr(args, "dictionary", False) else None
+        self.dictStaged = 0
+        # live statistics, plot_data and fuzzer_stats (see fuzzStats.py)
+        self.hangs = 0
+        self.lastCoverage = []
+        self.stats = FuzzStats.fromArgs(self, args)
+        # Hybrid mode: on a coverage plateau the corpus goes to a solver
+        # process, whose models come back as inputs (see concolic.py).
+        self.concolic = ConcolicHelper.fromArgs(irHandler, args)
+        self.lastFind = time.monotonic()
+        # Failed checks and hangs, bucketed by pc and path hash (see
+        # findings.py). Without CFG feedback the edges are recorded in a
+        # scratch map, for the path hash and the edge coverage of the stats.
+        self.findings = Findings.fromArgs(args)
+        self.pathEdges = self.cfgEdges
+        if self.pathEdges is None and (self.findings is not None or self.stats is not None):
+            self.pathEdges = irHandler.getCFGEdges()
+        self.lastCfgHits = None
+        if self.findings is not None:
+            if self.vectorized:
+                print("[fuzzer] Findings need the scalar interpreter, '--vectorized' is ignored.")
+                self.vectorized = False
 
     def handleExecution(self, ir, inputList={}, end=0):
-        coverage = []
-        terminated = False
-        self.pc = 0
-        self.initProgramContext(inputList)
+        key = None
+        if self.cache is not None:
+            # the 'block' engine counts block to block edges in its hit map
+            variant = "%s+%s%s" % (self.feedback, self.engine, "+accelerate" if self.loops is not None else "")
+            key = self.cache.key(self.irHandler, inputList, self.maxSteps, variant)
+            record = self.cache.get(key)
+            if record is not None and (record.hits is not None or not self.hitMap):
+                self.lastResult = ExecutionResult(record.outcome, record.steps)
+                self.lastCoverage = record.coverage
+                self.lastCfgHits = None
+                # the same input, it cannot be closer to any branch
+                self.lastDistances = None
+                if self.hitMap:
+                    return self.hitMetric(dense(record.hits, self.mapSize), record.pathHash)
+                return list(record.coverage)
+        self.enterPrefix(inputList)
+        self.resume(self.entry, inputList)
+        # the prefix is straight-line code, executed up to entry.pc
+        coverage = list(range(self.entry.pc))
+        hits = bytearray(self.entryHits) if self.hitMap else None
+        distances = self.branchDistance.newDistances() if self.branchDistance is not None else None
+        cfgHits = hits if self.cfgEdges is not None else None
+        if cfgHits is None and self.pathEdges is not None:
+            cfgHits = bytearray(self.entryCfgHits)
+        if self.findings is not None:
+            self.violationEvents = []
+        # List of PC values -> Execution Trace -> Stmts Hit!
+        # One execution is bounded by the step budget and
+        # must end before the end time of the fuzzer.
+        self.lastResult = self.run(
+            maxSteps=self.maxSteps, deadline=end, coverage=coverage,
+            hits=hits if self.edgeMap is not None else None,
+            cfgHits=cfgHits,
+            distances=distances,
+        )
         coverage.append(self.pc)
-        # The maximum time for one execution of the
-        # fuzzed program must be less than end time.
-        while time.monotonic() <= end:
-            terminated = self.interpret()
-            # List of PC values -> Execution Trace -> Stmts Hit!
-            coverage.append(self.pc)
-            if terminated:
-                break
-        if time.monotonic() >= end:
-            print("[fuzzer] Program took too long to execute. Terminated")
-        else:
-            print("[fuzzer] Program Ended.")
+        self.lastCoverage = coverage
+        self.lastCfgHits = cfgHits
+        self.lastDistances = distances
+        if self.lastResult.hung:
+            self.hangs += 1
+        if self.tracer.verbose:
+            if self.lastResult.hung:
+                print(f"[fuzzer] Program stopped : {self.lastResult}. Terminated")
+            else:
+                print("[fuzzer] Program Ended.")
+        if self.findings is not None and (self.violationEvents or self.lastResult.hung):
+            self.findings.add(inputList, self.violationEvents, self.pathHash, self.lastResult, self.pc)
+        if key is not None and self.lastResult.outcome != ExecutionResult.TIME_LIMIT:
+            self.cache.put(
+                key,
+                ExecutionRecord.fromInterpreter(
+                    self, self.lastResult, coverage, sparse(hits) if self.hitMap else None,
+                    self.pathHash if self.feedback == "paths" else None,
+                ),
+            )
+        if self.hitMap:
+            return self.hitMetric(hits, self.pathHash)
         return list(set(coverage))
 
+    def enterPrefix(self, inputList):
+        # Snapshot the prefix again unless it assigns none of the inputs.
+        if self.entry is not None and self.entryInputs.issuperset(inputList):
+            return
+        self.entryInputs = set(inputList)
+        self.entry = self.runPrefix(self.entryInputs)
+        if self.edgeMap is not None:
+            # edges of the prefix, the run continues from location 0
+            self.entryHits = self.edgeMap.newHits()
+            prevLoc = 0
+            for pc in range(self.entry.pc):
+                prevLoc = recordHit(self.entryHits, self.edgeMap.ids, prevLoc, pc)
+        if self.pathEdges is not None:
+            # CFG edges of the prefix, the run continues with their path hash
+            self.entryCfgHits = self.pathEdges.newHits()
+            for pc in range(self.entry.pc):
+                if self.pathEdges.edgeTo[pc] is not None:
+                    self.entry.pathHash = recordEdge(
+                        self.entryCfgHits, self.entry.pathHash, self.pathEdges.edgeTo[pc][pc + 1]
+                    )
+            if self.cfgEdges is not None:
+                self.entryHits = self.entryCfgHits
+
+    def calibrate(self, inputList, end=None):
+        """
+        Run 'inputList' once more, bypassing the result cache.
+
+        Returns:
+            tuple (lines, cfgHits, pathHash) : the set of executed IR
+            indices, the hit counts of the CFG edges of the run and their
+            path hash.
+        """
+        self.enterPrefix(inputList)
+        self.resume(self.entry, inputList)
+        cfgHits = bytearray(self.entryCfgHits)
+        coverage = list(range(self.entry.pc))
+        self.run(maxSteps=self.maxSteps, deadline=end, coverage=coverage, cfgHits=cfgHits)
+        coverage.append(self.pc)
+        self.execs += 1
+        return set(coverage), cfgHits, self.pathHash
+
+    def hitMetric(self, hits, pathHash=None):
+        # curr_metric of a run from its hit map
+        if self.feedback == "paths":
+            return pathMetric(hits, pathHash)
+        return classify(hits)
+
+    def metricOf(self, featureSet):
+        # curr_metric of a run recorded as features (see corpusDir.features)
+        if not self.hitMap:
+            return fromFeatures(featureSet)
+        return fromFeatures(featureSet, self.mapSize + (PATH_MAP_SIZE if self.feedback == "paths" else 0))
+
+    def handleBatchExecution(self, ir, inputLists, end=0):
+        # Execute all inputs at once with the lockstep interpreter,
+        # returns one coverage list per input as handleExecution does.
+        batch = BatchInterpreter(self.irHandler, inputLists).run(
+            deadline=end, maxSteps=self.maxSteps
+        )
+        self.lastCfgHits = None
+        coverages = []
+        for lane in range(batch.size):
+            coverage = [0] + batch.laneCoverage(lane)
+            if batch.status[lane] == COMPLETED:
+                coverage.append(len(ir))
+            coverages.append(list(set(coverage)))
+        if (batch.status == TIMEOUT).any():
+            print("[fuzzer] Batch took too long to execute. Terminated")
+        elif self.tracer.verbose:
+            print(f"[fuzzer] Batch of {batch.size} inputs Ended.")
+        return coverages
+
+    def addIfInteresting(self, inputObject, curr_metric, execTime=None):
+        # Add the input to the corpus if its run improved coverage.
+        self.coverage.curr_metric = curr_metric
+        # Print the coverage : Representational
+        if self.tracer.verbose:
+            print(f"[fuzzer] Coverge for execution : {self.coverage.curr_metric}")
+
+        # Check if coverage improved, or the run got closer to a branch.
+        improved = self.coverage.compareCoverage(
+            self.coverage.curr_metric, self.coverage.total_metric
+        )
+        if self.lastDistances is not None:
+            improved = closer(self.bestDistances, self.lastDistances) or improved
+            self.lastDistances = None
+        if not improved:
+            return False
+        inputObject.id = str(uuid.uuid4())
+        inputObject.pickedOnce = False
+        self.coverage.total_metric = self.coverage.updateTotalCoverage(
+            self.coverage.curr_metric, self.coverage.total_metric
+        )
+        # Add mutated input if coverage improved.
+        self.corpus.append(inputObject)
+        self.lastFind = time.monotonic()
+        # IR indices of the run, in batches the metric is that list
+        coverage = self.lastCoverage if self.hitMap else curr_metric
+        distance = None
+        if self.directed is not None:
+            distance = self.directed.seedDistance(coverage)
+            for target in self.directed.reach(coverage):
+                print(f"[fuzzer] Target L{target} reached by input {inputObject.data}")
+        self.scheduler.add(inputObject, curr_metric, execTime, distance)
+        if self.corpusDir is not None:
+            self.corpusDir.save(inputObject.data, self.feedback, features(curr_metric))
+        if self.stats is not None:
+            self.stats.newInput(inputObject.data, coverage, self.lastCfgHits, self.pathHash)
+        return True
+
+    def resumeCorpus(self, end=0):
+        # Run the inputs of the corpus directory, which restores the
+        # coverage reached by the campaigns that stored them.
+        entries = self.corpusDir.load()
+        before = len(self.corpus)
+        for entry in entries:
+            curr_metric = self.handleExecution(self.ir, entry["data"], end=end)
+            self.execs += 1
+            self.addIfInteresting(InputObject(data=entry["data"]), curr_metric)
+        print(
+            f"[fuzzer] Resumed {len(self.corpus) - before} of {len(entries)} inputs "
+            f"from {self.corpusDir.directory}"
+        )
+
+    def minimizeCorpus(self, entries):
+        """
+        The smallest subset of corpus directory entries (see
+        CorpusDir.load) found by a greedy set cover that keeps the coverage
+        features of all of them. Entries without features of the current
+        kind of feedback are run to get them.
+
+        Returns:
+            List: (inputs, features) of the entries kept.
+        """
+        featureSets = []
+        for entry in entries:
+            if entry.get("kind") == self.feedback and "coverage" in entry:
+                featureSets.append(entry["coverage"])
+            else:
+                featureSets.append(features(self.handleExecution(self.ir, entry["data"], end=float("inf"))))
+                self.execs += 1
+        return [(entries[idx]["data"], featureSets[idx]) for idx in greedyCover(featureSets)]
+
+    def syncInputs(self, end=0):
+        # Run the inputs the other workers queued since the last sync and
+        # keep those that are new here, as AFL's -M/-S sync does.
+        for data in self.sync.pull():
+            curr_metric = self.handleExecution(self.ir, data, end=end)
+            self.execs += 1
+            self.addIfInteresting(InputObject(data=data), curr_metric)
+        self.sync.writeStats(self)
+
+    def inputToStateStage(self, inputObject, end=0):
+        # Log the comparison operands of the run of the input and try the
+        # inputs substituting them into matching variables.
+        self.cmpLog.reset()
+        it = self.cmpLogger
+        it.resume(it.runPrefix(inputObject.data), inputObject.data)
+        it.run(maxSteps=self.maxSteps, deadline=end)
+        self.tryInputs(inputToState(inputObject.data, self.cmpLog), end)
+
+    def dictionaryStage(self, inputObject, end=0):
+        # Try the input with each variable set to each dictionary token.
+        self.tryInputs(dictionaryInputs(inputObject.data, self.dictionary), end)
+
+    def tryInputs(self, inputs, end=0):
+        # Run the input dicts of a stage and keep those that improve coverage.
+        for data in inputs:
+            curr_metric = self.handleExecution(self.ir, data, end=end)
+            self.execs += 1
+            mutated = InputObject(data=data)
+            if self.addIfInteresting(mutated, curr_metric) and self.sync is not None:
+                self.sync.save(mutated, self.feedback, features(curr_metric))
+            if time.monotonic() >= end:
+                break
+
+    def concolicStage(self, end=0):
+        # Hand the corpus to the solver on a plateau and run the inputs it
+        # solved, without waiting for it.
+        if time.monotonic() - self.lastFind >= self.concolic.plateau:
+            self.concolic.submit(self.corpus)
+        self.tryInputs(self.concolic.poll(), end)
+
+    def stubMutator(self):
+        # True if the submission mutator returns its input unchanged.
+        probe = InputObject(data=dict(self.params))
+        for _ in range(8):
+            mutated = self.customMutator.mutate(probe.copy(), self.coverage, self.ir)
+            if mutated is not None and mutated.data != probe.data:
+                return False
+        return True
+
+    def mutateRandomInput(self):
+        # Pick an input for mutation with the power schedule.
+        pickedInput = self.scheduler.next(self.corpus)
+
+        # Set this flag since the input is picked once now.
+        pickedInput.pickedOnce = True
+        if self.tracer.verbose:
+            print(f"[fuzzer] Fuzzing with Input ID : {pickedInput.id}")
+        pickInputRandom = pickedInput.copy()
+        if self.havoc is not None:
+            pickInputRandom.data, pickInputRandom.ops = self.havoc.next(pickedInput, self.corpus)
+            return pickInputRandom
+        return self.customMutator.mutate(pickInputRandom, self.coverage, self.ir)
+
     def seedCorpusRandom(self, varsList):
         # HonggFuzz starts with a buffer of atleast
         # four elements. Lets start with 8 say.
@@ -108,6 +487,16 @@ class Fuzzer(ConcreteInterpreter):
         start_time = time.monotonic()
         # Fuzzing ends at this timestamp.
         endTime = time.monotonic() + timeLimit
+        nextSync = nextConcolic = time.monotonic()
+        if self.stats is not None:
+            self.stats.begin(endTime)
+        if self.corpusDir is not None:
+            self.resumeCorpus(endTime)
+        if self.concolic is not None:
+            self.concolic.start()
+            self.lastFind = time.monotonic()
+        if self.directed is not None:
+            self.directed.begin(timeLimit)
 
         # Either supply dummy corpus
         # or use user-provided inputs.
@@ -115,39 +504,56 @@ class Fuzzer(ConcreteInterpreter):
             # Initialize current coverage to empty as loop starts.
             self.coverage.curr_metric = []
 
-            # Pick a random input and choose it for mutation.
-            pickedInput = random.choice(self.corpus)
+            if self.cmpLog is not None and self.cmpLogged < len(self.corpus):
+                self.cmpLogged += 1
+                self.inputToStateStage(self.corpus[self.cmpLogged - 1], end=endTime)
 
-            # Set this flag since the input is picked once now.
-            pickedInput.pickedOnce = True
-            print(f"[fuzzer] Fuzzing with Input ID : {pickedInput.id}")
-            pickInputRandom = copy.deepcopy(pickedInput)
-
-            pickInputRandom.pickedOnce = False
-            mutated_input = self.customMutator.mutate(
-                pickInputRandom, self.coverage, self.ir
-            )
+            if self.dictionary is not None and self.dictStaged < len(self.corpus):
+                self.dictStaged += 1
+                self.dictionaryStage(self.corpus[self.dictStaged - 1], end=endTime)
 
             # Get new coverage from execution.
             # The maximum time for one execution of the
             # fuzzed program must be less than end time.
-            self.coverage.curr_metric = self.handleExecution(
-                self.ir, mutated_input.data, end=endTime
-            )
-            # Print the coverage : Representational
-            print(f"[fuzzer] Coverge for execution : {self.coverage.curr_metric}")
-
-            # Check if coverage improved.
-            if self.coverage.compareCoverage(
-                self.coverage.curr_metric, self.coverage.total_metric
-            ):
-                mutated_input.id = str(uuid.uuid4())
-                mutated_input.pickedOnce = False
-                self.coverage.total_metric = self.coverage.updateTotalCoverage(
-                    self.coverage.curr_metric, self.coverage.total_metric
+            if self.vectorized:
+                mutated_inputs = [self.mutateRandomInput() for _ in range(self.batchSize)]
+                started = time.perf_counter()
+                coverages = self.handleBatchExecution(
+                    self.ir, [x.data for x in mutated_inputs], end=endTime
                 )
-                # Add mutated input if coverage improved.
-                self.corpus.append(mutated_input)
+            else:
+                mutated_inputs = [self.mutateRandomInput()]
+                started = time.perf_counter()
+                coverages = [
+                    self.handleExecution(self.ir, mutated_inputs[0].data, end=endTime)
+                ]
+            execTime = (time.perf_counter() - started) / len(mutated_inputs)
+            self.execs += len(mutated_inputs)
+
+            for mutated_input, curr_metric in zip(mutated_inputs, coverages):
+                self.scheduler.observe(curr_metric, execTime)
+                if self.addIfInteresting(mutated_input, curr_metric, execTime):
+                    if self.havoc is not None:
+                        self.havoc.reward(mutated_input.ops)
+                    if self.sync is not None:
+                        self.sync.save(mutated_input, self.feedback, features(curr_metric))
+
+            if self.sync is not None and time.monotonic() >= nextSync:
+                nextSync = time.monotonic() + self.sync.interval
+                if self.sync.stopped():
+                    break
+                self.syncInputs(endTime)
+
+            if self.concolic is not None and time.monotonic() >= nextConcolic:
+                nextConcolic = time.monotonic() + POLL_INTERVAL
+                self.concolicStage(endTime)
+
+            if self.stats is not None:
+                self.stats.tick()
+
+            if self.directed is not None and self.directed.done():
+                print(f"[fuzzer] All targets reached : {time.monotonic() - start_time}")
+                break
 
             exhaustedBudget = True if time.monotonic() >= endTime else False
             if exhaustedBudget:
@@ -155,6 +561,24 @@ class Fuzzer(ConcreteInterpreter):
                 print(f"[fuzzer] Time Exhausted : {time_delta}")
                 break
 
+        if self.hangs:
+            print(f"[fuzzer] Hangs : {self.hangs} runs stopped by the step or time budget")
+        if self.concolic is not None:
+            self.concolic.stop()
+            print(f"[fuzzer] Concolic : {self.concolic.solved} inputs solved")
+        if self.stats is not None:
+            self.stats.update()
+        if self.branchDistance is not None:
+            print(
+                f"[fuzzer] Branch directions covered : {self.branchDistance.covered(self.bestDistances)} "
+                f"of {self.branchDistance.size}"
+            )
+        if self.findings is not None:
+            self.findings.finish()
+        if self.havoc is not None:
+            print(f"[fuzzer] Havoc operator probabilities : {self.havoc.summary()}")
+        if self.cache is not None:
+            print(f"[fuzzer] Result cache : {self.cache}")
         print(f"[fuzzer] Terminating Fuzzer Loop.")
         # Return coverage information and corpus of inputs.
         return (self.coverage, self.corpus)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Built-in havoc mutation engine over {variable: int} inputs.
+
+Mutants of a seed are made HAVOC_BATCH at a time with NumPy: the integer
+variables of the seed are tiled into a matrix with one row per mutant,
+and every row gets a stack of 1, 2, 4 or 8 operators, each applied to a
+random variable:
+
+    add, sub        add or subtract 1 .. ARITH_MAX
+    flip            flip one of the low 32 bits
+    negate          flip the sign
+    interesting     set to one of AFL's interesting values or a token of
+                    the IR dictionary (see irDictionary.py)
+    splice          take the value of the variable in another seed
+
+Other values (floats) are left unchanged.
+
+The operators are chosen with adaptive probabilities as in MOpt: every
+MOPT_PERIOD mutants the efficiency of each operator (the mutants it was
+used in that were added to the corpus, over all mutants it was used in)
+updates a particle swarm, one particle per operator, pulled toward the
+probability with which the operator was most efficient and toward the
+share of its efficiency in the total. Probabilities stay between P_MIN
+and P_MAX.
+"""
+
+import numpy as np
+
+
+HAVOC_BATCH = 64
+STACK_POW2 = 3
+ARITH_MAX = 35
+MOPT_PERIOD = 4096
+P_MIN = 0.02
+P_MAX = 0.6
+INERTIA = 0.5
+
+INTERESTING = [
+    -2147483648, -32768, -129, -128, -1, 0, 1, 16, 32, 64, 100, 127, 128,
+    255, 256, 512, 1000, 1024, 4096, 32767, 32768, 65535, 65536, 2147483647,
+]
+
+OPERATORS = ["add", "sub", "flip", "negate", "interesting", "splice"]
+
+
+class Havoc:
+    def __init__(self, dictionary=None):
+        """
+        Args:
+            dictionary (IRDictionary): its integer tokens are added to the
+                interesting values.
+        """
+        tokens = [tok for tok in getattr(dictionary, "tokens", []) if isinstance(tok, int)]
+        self.interesting = np.array(sorted(set(INTERESTING + tokens)), dtype=np.int64)
+        count = len(OPERATORS)
+        self.probs = np.full(count, 1.0 / count)
+        # particle swarm of MOpt, one particle per operator
+        self.velocity = np.zeros(count)
+        self.bestProbs = self.probs.copy()
+        self.bestEfficiency = np.zeros(count)
+        self.uses = np.zeros(count, dtype=np.int64)
+        self.finds = np.zeros(count, dtype=np.int64)
+        self.generated = 0
+        self.batch = []
+        self.batchSeed = None
+
+    def next(self, seed, corpus):
+        """
+        The next mutant of 'seed' (InputObject), from a batch made for it.
+
+        Returns:
+            tuple (data, ops) : the mutated input dict and the mask of the
+            operators used, for reward().
+        """
+        if self.batchSeed is not seed or not self.batch:
+            self.batch = self.mutateBatch(seed.data, corpus)
+            self.batchSeed = seed
+        return self.batch.pop()
+
+    def mutateBatch(self, data, corpus, size=HAVOC_BATCH):
+        names = [name for name, val in data.items() if isinstance(val, (int, np.integer)) and not isinstance(val, bool)]
+        if not names:
+            return [(dict(data), np.zeros(len(OPERATORS), dtype=bool)) for _ in range(size)]
+        rows = np.tile(np.array([data[name] for name in names], dtype=np.int64), (size, 1))
+        used = np.zeros((size, len(OPERATORS)), dtype=bool)
+        stack = 1 << np.random.randint(0, STACK_POW2 + 1, size)
+        for level in range(1 << STACK_POW2):
+            active = np.flatnonzero(stack > level)
+            if not active.size:
+                break
+            ops = np.random.choice(len(OPERATORS), active.size, p=self.probs)
+            cols = np.random.randint(0, len(names), active.size)
+            for op in range(len(OPERATORS)):
+                pick = ops == op
+                if not pick.any():
+                    continue
+                sel, col = active[pick], cols[pick]
+                rows[sel, col] = self.apply(op, rows[sel, col], [names[c] for c in col], corpus)
+                used[sel, op] = True
+        self.uses += used.sum(axis=0)
+        self.generated += size
+        if self.generated >= MOPT_PERIOD:
+            self.update()
+        mutants = []
+        for row, ops in zip(rows.tolist(), used):
+            mutated = dict(data)
+            mutated.update(zip(names, row))
+            mutants.append((mutated, ops))
+        return mutants
+
+    def apply(self, op, vals, names, corpus):
+        count = len(vals)
+        name = OPERATORS[op]
+        if name == "add":
+            return vals + np.random.randint(1, ARITH_MAX + 1, count)
+        if name == "sub":
+            return vals - np.random.randint(1, ARITH_MAX + 1, count)
+        if name == "flip":
+            return vals ^ (np.int64(1) << np.random.randint(0, 32, count))
+        if name == "negate":
+            return -vals
+        if name == "interesting":
+            return self.interesting[np.random.randint(0, len(self.interesting), count)]
+        # splice: the variable's value in random seeds of the corpus
+        donors = np.random.randint(0, len(corpus), count)
+        spliced = [corpus[d].data.get(n, v) for d, n, v in zip(donors.tolist(), names, vals.tolist())]
+        return np.array([int(v) if isinstance(v, (int, float)) else 0 for v in spliced], dtype=np.int64)
+
+    def reward(self, ops):
+        # a mutant made with the operators 'ops' was added to the corpus
+        self.finds += ops
+
+    def update(self):
+        # one step of the MOpt particle swarm
+        efficiency = np.where(self.uses > 0, self.finds / np.maximum(self.uses, 1), 0.0)
+        better = efficiency > self.bestEfficiency
+        self.bestEfficiency[better] = efficiency[better]
+        self.bestProbs[better] = self.probs[better]
+        total = self.bestEfficiency.sum()
+        globalBest = self.bestEfficiency / total if total else np.full(len(OPERATORS), 1.0 / len(OPERATORS))
+        r1, r2 = np.random.random(2)
+        self.velocity = (
+            INERTIA * self.velocity
+            + r1 * (self.bestProbs - self.probs)
+            + r2 * (globalBest - self.probs)
+        )
+        self.probs = np.clip(self.probs + self.velocity, P_MIN, P_MAX)
+        self.probs /= self.probs.sum()
+        self.uses[:] = 0
+        self.finds[:] = 0
+        self.generated = 0
+
+    def summary(self):
+        return ", ".join("%s %.2f" % (name, p) for name, p in zip(OPERATORS, self.probs))
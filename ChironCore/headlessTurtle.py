@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A turtle that only keeps its geometric state.
+
+HeadlessTurtle follows the semantics of turtle.Turtle (standard mode,
+angles in degrees) for the commands a Chiron program can issue, but it
+never opens a Tk window and never animates. The position and orientation
+are updated with the same vector arithmetic as turtle.Vec2D so that pos()
+returns the same values as the Tk turtle would.
+
+With record=True the drawn line segments and filled polygons are kept so
+that callers can still inspect what the program drew. Analyses that only
+need the pose leave it off: moves then cost O(1) memory, and repeat()
+runs every turtle-only loop in closed form.
+"""
+
+import math
+
+
+def truncated(current, saved, length):
+    if current is saved:
+        del current[length:]
+        return current
+    return saved[:length]
+
+
+def unit(angle):
+    # e^(i*angle) for an angle in degrees
+    angle = math.radians(angle % 360.0)
+    return complex(math.cos(angle), math.sin(angle))
+
+
+class HeadlessScreen:
+    # Stands in for turtle.getscreen(); hooks may still call into it.
+    def __init__(self):
+        self.bg = "white"
+        self.pic = None
+
+    def bgcolor(self, *args):
+        if args:
+            self.bg = args[0]
+        return self.bg
+
+    def bgpic(self, picname=None):
+        if picname is not None:
+            self.pic = picname
+        return self.pic
+
+    def title(self, titlestring):
+        pass
+
+    def update(self):
+        pass
+
+
+class HeadlessTurtle:
+    def __init__(self, record=False):
+        self.record = record # keep the drawn segments and fills
+        self.reset()
+
+    def reset(self):
+        # position and unit orientation vector, as in turtle.RawTurtle
+        self.x, self.y = 0.0, 0.0
+        self.ox, self.oy = 1.0, 0.0
+        self.down_ = True
+        self.visible = True
+        self.penwidth = 1
+        self.pcolor = "black"
+        self.fcolor = "black"
+        self.filling_ = False
+        self.fillpath = []
+        # ((x0, y0), (x1, y1)) for every move made with the pen down
+        self.segments = []
+        # list of polygons (list of points) closed by end_fill()
+        self.fills = []
+
+    # --Snapshots-------------------------------------------------------
+
+    def snapshot(self):
+        """
+        Save the state of the turtle. The drawn segments and fills are
+        only ever appended to, so they are saved as the lists and their
+        current lengths instead of being copied.
+        """
+        return (
+            self.x, self.y, self.ox, self.oy, self.down_, self.visible,
+            self.penwidth, self.pcolor, self.fcolor, self.filling_,
+            self.fillpath, len(self.fillpath),
+            self.segments, len(self.segments),
+            self.fills, len(self.fills),
+        )
+
+    def restore(self, state):
+        (
+            self.x, self.y, self.ox, self.oy, self.down_, self.visible,
+            self.penwidth, self.pcolor, self.fcolor, self.filling_,
+            fillpath, nfillpath, segments, nsegments, fills, nfills,
+        ) = state
+        # truncate our own lists, copy the prefix of another turtle's
+        self.fillpath = truncated(self.fillpath, fillpath, nfillpath)
+        self.segments = truncated(self.segments, segments, nsegments)
+        self.fills = truncated(self.fills, fills, nfills)
+
+    # --Motion----------------------------------------------------------
+
+    def goto(self, x, y=None):
+        if y is None:
+            x, y = x
+        start = (self.x, self.y)
+        self.x, self.y = x, y
+        if not self.record:
+            return
+        if self.down_:
+            self.segments.append((start, (x, y)))
+        if self.filling_:
+            self.fillpath.append((x, y))
+
+    def forward(self, distance):
+        self.goto(self.x + self.ox * distance, self.y + self.oy * distance)
+
+    def backward(self, distance):
+        self.forward(-distance)
+
+    def rotate(self, angle):
+        # Same computation as turtle.Vec2D.rotate
+        angle = math.radians(angle)
+        c, s = math.cos(angle), math.sin(angle)
+        ox, oy = self.ox, self.oy
+        self.ox, self.oy = ox * c - oy * s, oy * c + ox * s
+
+    def left(self, angle):
+        self.rotate(angle)
+
+    def right(self, angle):
+        self.rotate(-angle)
+
+    def setheading(self, to_angle):
+        angle = (to_angle - self.heading() + 180.0) % 360.0 - 180.0
+        self.rotate(angle)
+
+    def home(self):
+        self.goto(0.0, 0.0)
+        self.setheading(0.0)
+
+    def repeat(self, moves, times):
+        """
+        Apply the sequence 'moves' of (command, amount) pairs, command one
+        of forward/backward/left/right/penup/pendown, 'times' times.
+
+        Every repetition is the same rigid transform applied to the pose
+        the previous one ended in, so the final pose follows from the net
+        translation T and rotation R of one repetition:
+            p_n = p_0 + o_0 * T * (1 + w + ... + w^(n-1)),  o_n = o_0 * w^n
+        with w = e^(iR). Intermediate points are only generated when they
+        are recorded (record=True, pen down or filling).
+        """
+        # one repetition in the frame of the turtle: the position after
+        # every translation and the pen state it is drawn with
+        local, turn = 0j, 0.0
+        points = []
+        pens = any(command in ("penup", "pendown") for command, _ in moves)
+        for command, amount in moves:
+            if command in ("forward", "backward"):
+                sign = 1.0 if command == "forward" else -1.0
+                local += unit(turn) * (sign * amount)
+                points.append((local, command))
+            elif command in ("left", "right"):
+                turn += amount if command == "left" else -amount
+            elif command in ("penup", "pendown"):
+                points.append((None, command))
+
+        pos, orient = complex(self.x, self.y), complex(self.ox, self.oy)
+        if times > 0 and self.record and (self.filling_ or self.down_ or pens) and points:
+            # O(times * len(moves)): emit what a move by move run records
+            down = self.down_
+            for k in range(times):
+                rotated = orient * unit(k * turn)
+                for point, command in points:
+                    if point is None:
+                        down = command == "pendown"
+                        continue
+                    end = pos + rotated * point
+                    if down:
+                        self.segments.append(((self.x, self.y), (end.real, end.imag)))
+                    if self.filling_:
+                        self.fillpath.append((end.real, end.imag))
+                    self.x, self.y = end.real, end.imag
+                pos += rotated * local
+            self.down_ = down
+        elif times > 0:
+            # O(1): closed form of the geometric series of rotations
+            w = unit(turn)
+            if turn % 360.0 == 0.0:
+                series = times
+            else:
+                series = (1 - unit(times * turn)) / (1 - w)
+            pos += orient * local * series
+            if pens:
+                # the pen is left as the last pen command of the body
+                self.down_ = [command for command, _ in moves if command in ("penup", "pendown")][-1] == "pendown"
+        self.x, self.y = pos.real, pos.imag
+        orient *= unit(times * turn)
+        self.ox, self.oy = orient.real, orient.imag
+
+    fd = forward
+    bk = back = backward
+    lt = left
+    rt = right
+    setpos = setposition = goto
+    seth = setheading
+
+    # --State queries---------------------------------------------------
+
+    def pos(self):
+        return (self.x, self.y)
+
+    position = pos
+
+    def xcor(self):
+        return self.x
+
+    def ycor(self):
+        return self.y
+
+    def heading(self):
+        return round(math.atan2(self.oy, self.ox) * 180.0 / math.pi, 10) % 360.0
+
+    def isdown(self):
+        return self.down_
+
+    def isvisible(self):
+        return self.visible
+
+    def filling(self):
+        return self.filling_
+
+    # --Pen control-----------------------------------------------------
+
+    def penup(self):
+        self.down_ = False
+
+    def pendown(self):
+        self.down_ = True
+
+    pu = up = penup
+    pd = down = pendown
+
+    def pensize(self, width=None):
+        if width is None:
+            return self.penwidth
+        self.penwidth = width
+
+    width = pensize
+
+    def pencolor(self, *args):
+        if not args:
+            return self.pcolor
+        self.pcolor = args[0]
+
+    def fillcolor(self, *args):
+        if not args:
+            return self.fcolor
+        self.fcolor = args[0]
+
+    def color(self, *args):
+        if not args:
+            return self.pcolor, self.fcolor
+        if len(args) == 1:
+            self.pcolor = self.fcolor = args[0]
+        else:
+            self.pcolor, self.fcolor = args[0], args[1]
+
+    def begin_fill(self):
+        self.filling_ = True
+        self.fillpath = [(self.x, self.y)] if self.record else []
+
+    def end_fill(self):
+        if self.filling_ and len(self.fillpath) > 2:
+            self.fills.append(self.fillpath)
+        self.filling_ = False
+        self.fillpath = []
+
+    # --Appearance (no effect without a screen)-------------------------
+
+    def hideturtle(self):
+        self.visible = False
+
+    def showturtle(self):
+        self.visible = True
+
+    ht = hideturtle
+    st = showturtle
+
+    def shape(self, name=None):
+        pass
+
+    def speed(self, speed=None):
+        return 0
+
+    def write(self, arg, move=False, align="left", font=("Arial", 8, "normal")):
+        pass
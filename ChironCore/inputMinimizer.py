@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test-case minimization (tmin) of program inputs.
+
+An input is shrunk while its run keeps the same signature: the outcome
+(completed, step limit or time limit), the IR indices of the failed
+asserts and assumes and the path hash of the CFG edges taken (see
+cfgCoverage.py). Runs stopped by the time limit are only compared by
+outcome, where they stop depends on the machine.
+
+Every numeric variable is shrunk toward zero in turn, zero being the
+default of a dropped variable: the values between 0 and its value (which
+keeps the signature) are searched by bisection, or by multisection with
+one point per worker process when there are several. Floats are first
+truncated to integers. Passes over the variables are repeated until
+nothing shrinks any more.
+
+Candidates run on headless interpreters, in forked worker processes with
+'--jobs'; the messages of failing checks are not printed.
+"""
+
+import contextlib
+import io
+import multiprocessing
+import time
+
+from interpreter import ConcreteInterpreter, ExecutionResult
+from cmpLog import isNumber
+
+
+MAX_PASSES = 8
+
+# interpreter of a worker process, see initWorker
+worker = None
+
+
+def newInterpreter(irHandler, args):
+    return ConcreteInterpreter(irHandler, args, headless=True)
+
+
+def runSignature(it, data, maxSteps=None, timeout=None):
+    """Signature of the run of input 'data' on the interpreter 'it'."""
+    deadline = time.monotonic() + timeout if timeout else None
+    it.resume(it.runPrefix(data), data)
+    cfgHits = it.irHandler.getCFGEdges().newHits()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = it.run(maxSteps=maxSteps, deadline=deadline, cfgHits=cfgHits)
+    if result.outcome == ExecutionResult.TIME_LIMIT:
+        return (result.outcome,)
+    return (result.outcome, tuple(sorted(set(it.violations))), it.pathHash)
+
+
+def initWorker(irHandler, args):
+    global worker
+    worker = (newInterpreter(irHandler, args), getattr(args, "max_steps", None), args.timeout)
+
+
+def evaluate(data):
+    it, maxSteps, timeout = worker
+    return runSignature(it, data, maxSteps, timeout)
+
+
+class InputMinimizer:
+    def __init__(self, irHandler, args, jobs=None):
+        """
+        Args:
+            irHandler (IRHandler): the program.
+            args: parsed command line, for the engine, max_steps and timeout
+                (the time limit of one run).
+            jobs (int): worker processes (default args.jobs, 1: none).
+        """
+        self.jobs = max(jobs or getattr(args, "jobs", 1), 1)
+        self.maxSteps = getattr(args, "max_steps", None)
+        self.timeout = args.timeout
+        self.runs = 0
+        self.pool = None
+        self.it = None
+        if self.jobs > 1:
+            # workers share the compiled IR, which cannot be pickled
+            ctx = multiprocessing.get_context("fork")
+            self.pool = ctx.Pool(self.jobs, initializer=initWorker, initargs=(irHandler, args))
+        else:
+            self.it = newInterpreter(irHandler, args)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+
+    def signatures(self, inputs):
+        self.runs += len(inputs)
+        if self.pool is not None:
+            return self.pool.map(evaluate, inputs)
+        return [runSignature(self.it, data, self.maxSteps, self.timeout) for data in inputs]
+
+    def shrink(self, data, name, signature):
+        # smallest magnitude of data[name] that keeps 'signature'
+        val = data[name]
+        if isinstance(val, float) and not val.is_integer():
+            truncated = dict(data, **{name: int(val)})
+            if self.signatures([truncated])[0] != signature:
+                return data
+            data, val = truncated, int(val)
+        sign = -1 if val < 0 else 1
+        val = int(val)
+        # |value| lo does not keep the signature (except 0, not tried yet), hi does
+        lo, hi = 0, abs(val)
+        points = [0]
+        while points:
+            candidates = [dict(data, **{name: sign * point}) for point in points]
+            passed = [point for point, sig in zip(points, self.signatures(candidates)) if sig == signature]
+            if passed:
+                hi = min(passed)
+                lo = max([lo] + [point for point in points if point < hi])
+            else:
+                lo = max(points)
+            if hi == 0:
+                break
+            step = (hi - lo) / (self.jobs + 1)
+            points = sorted({lo + int(step * (i + 1)) for i in range(self.jobs)} - {lo, hi})
+        return dict(data, **{name: sign * hi})
+
+    def minimize(self, data):
+        """
+        Returns:
+            tuple (data, signature) : the minimized input and the signature
+            of the run it shares with 'data'.
+        """
+        signature = self.signatures([data])[0]
+        data = dict(data)
+        for _ in range(MAX_PASSES):
+            before = dict(data)
+            for name in list(data):
+                if isNumber(data[name]) and data[name] != 0:
+                    data = self.shrink(data, name, signature)
+            if data == before:
+                break
+        return data, signature
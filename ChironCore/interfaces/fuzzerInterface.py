@@ -1,6 +1,12 @@
 class MutatorBase():
     # Base class to extend/implement a
     # custom mutation operator.
+
+    # Interesting values extracted from the IR, set by the fuzzer before
+    # the first mutate(): an IRDictionary whose 'tokens' is a sorted list
+    # of numbers (see irDictionary.py).
+    dictionary = None
+
     def __init__(self):
         pass
 
@@ -18,6 +24,12 @@ class MutatorBase():
 class CoverageMetricBase():
     # Base class to extend/implement a
     # custom coverage metric.
+
+    # False: curr_metric is the list of covered IR indices of a run.
+    # True: curr_metric is the bucketed edge hit map of a run, a numpy
+    # uint8 array (see coverageMap.py).
+    hitMap = False
+
     def __init__(self):
         # Must have curr_metric, total_metric
         self.curr_metric = []
@@ -1,7 +1,15 @@
 
 from ChironAST import ChironAST
 from ChironHooks import Chironhooks
+from headlessTurtle import HeadlessScreen, HeadlessTurtle
+from tracer import Tracer
+from irCompiler import compileBlocks
+from progCompiler import collectVars
+from coverageMap import recordHit
+from cfgCoverage import recordEdge
 import turtle
+import time
+import copy
 
 Release="Chiron v5.3"
 
@@ -15,12 +23,25 @@ class Interpreter:
     t_screen = None
     trtl = None
 
-    def __init__(self, irHandler, params):
+    def __init__(self, irHandler, params, headless=False):
         self.ir = irHandler.ir
         self.cfg = irHandler.cfg
         self.pc = 0
-        self.t_screen = turtle.getscreen()
-        self.trtl = turtle.Turtle()
+
+        if params is not None:
+            self.args = params
+        else:
+            self.args = None
+
+        # Analyses ask for a headless turtle and never look at the drawing,
+        # '-r' gets one that records it with '--headless'.
+        self.headless = headless or getattr(self.args, "headless", False)
+        if self.headless:
+            self.t_screen = HeadlessScreen()
+            self.trtl = HeadlessTurtle(record=not headless)
+        else:
+            self.t_screen = turtle.getscreen()
+            self.trtl = turtle.Turtle()
         self.trtl.shape("turtle")
         self.trtl.color("blue", "yellow")
         self.trtl.fillcolor("green")
@@ -28,14 +49,10 @@ class Interpreter:
         self.trtl.pensize(4)
         self.trtl.speed(1) # TODO: Make it user friendly
 
-        if params is not None:
-            self.args = params
-        else:
-            self.args = None
-
-        turtle.title(Release)
-        turtle.bgcolor("white")
-        turtle.hideturtle()
+        if not self.headless:
+            turtle.title(Release)
+            turtle.bgcolor("white")
+            turtle.hideturtle()
 
     def handleAssignment(self, stmt,tgt):
         raise NotImplementedError('Assignments are not handled!')
@@ -74,26 +91,431 @@ class Interpreter:
 class ProgramContext:
     pass
 
+class ExecutionResult:
+    # How a run of ConcreteInterpreter.run ended.
+    COMPLETED = "completed"
+    STEP_LIMIT = "step-limit"
+    TIME_LIMIT = "time-limit"
+
+    def __init__(self, outcome, steps):
+        self.outcome = outcome
+        self.steps = steps # number of instructions executed
+
+    @property
+    def completed(self):
+        return self.outcome == ExecutionResult.COMPLETED
+
+    @property
+    def hung(self):
+        # the run was stopped by the watchdog, the program is classified as a hang
+        return not self.completed
+
+    def __str__(self):
+        return "%s after %d steps" % (self.outcome, self.steps)
+
+class Snapshot:
+    # State of a ConcreteInterpreter saved by snapshot().
+    def __init__(self, pc, store, turtle, cond_eval, violations, pathHash=0):
+        self.pc = pc
+        self.store = store # copy of the variable store
+        self.turtle = turtle # HeadlessTurtle.snapshot()
+        self.cond_eval = cond_eval
+        self.violations = violations
+        self.pathHash = pathHash
+
+class Violation:
+    # A failed assert or assume, reported by ConcreteInterpreter.reportViolation().
+    def __init__(self, pc, stmt, error, store):
+        self.pc = pc
+        self.kind = "assume" if isinstance(stmt, ChironAST.AssumeCommand) else "assert"
+        self.condition = str(stmt.cond)
+        self.error = None if error is None else str(error)
+        self.store = store # copy of the variables, None if not available
+
+    def toDict(self):
+        return {"pc": self.pc, "kind": self.kind, "condition": self.condition,
+                "error": self.error, "store": self.store}
+
 # TODO: move to a different file
 class ConcreteInterpreter(Interpreter):
     # Ref: https://realpython.com/beginners-guide-python-turtle
     cond_eval = None # used as a temporary variable within the embedded program interpreter
     prg = None
+    store = None # flat variable store of the program, same dict as vars(self.prg)
+    compiled = None
+    blocks = None
+    loops = None
+    violations = None # IR indices of the asserts/assumes that failed in this run, once each
+    pathHash = 0 # hash of the CFG edges taken so far (see cfgCoverage.py)
+    # list of Violation events of the run (fuzzing findings), one per
+    # failing check; None: only the pcs are recorded in violations
+    violationEvents = None
+    # the wall clock is only read every CLOCK_PERIOD steps by run()
+    CLOCK_PERIOD = 1024
 
-    def __init__(self, irHandler, params):
-        super().__init__(irHandler, params)
+    def __init__(self, irHandler, params, headless=False, engine=None):
+        super().__init__(irHandler, params, headless)
         self.prg = ProgramContext()
+        self.store = vars(self.prg)
         # Hooks Object:
         if self.args is not None and self.args.hooks:
             self.chironhook = Chironhooks.ConcreteChironHooks()
+        # "closure" runs the IR lowered by irCompiler, "block" runs the same
+        # closures chained per basic block, "program" runs the whole IR
+        # compiled into one function by progCompiler and "exec" runs the
+        # handle* methods which exec() the source of every statement.
+        self.irHandler = irHandler
+        self.engine = engine or getattr(self.args, "engine", "closure")
+        if self.engine in ("closure", "block", "program"):
+            for irInstr in self.ir:
+                self.sanityCheck(irInstr)
+        # Tracing wraps the compiled closures (or dispatch), so
+        # there is no per-instruction cost when it is off. The compiled
+        # program has no closures to wrap, a traced 'program' engine
+        # steps through those of 'closure'.
+        self.tracer = Tracer.fromArgs(self.args)
+        if self.engine in ("closure", "block") or (self.engine == "program" and self.tracer.enabled):
+            self.compiled = self.tracer.instrument(irHandler.getCompiledIR(), self.ir)
+        if self.engine == "block":
+            if self.tracer.enabled:
+                self.blocks = compileBlocks(self.ir, self.compiled)
+            else:
+                self.blocks = irHandler.getCompiledBlocks()
+        elif self.engine == "exec" and self.tracer.enabled:
+            self.dispatch = self.tracer.instrumentDispatch(self)
+        # Turtle-only repeat loops are run in closed form by run(); not
+        # while tracing, which must see every instruction.
+        if (
+            getattr(self.args, "accelerate", False)
+            and self.engine == "closure"
+            and self.headless
+            and not self.tracer.enabled
+        ):
+            self.loops = irHandler.getCompiledLoops()
+        self.isCondition = [isinstance(stmt, ChironAST.ConditionCommand) for stmt, _ in self.ir]
         self.pc = 0
+        self.violations = []
+        # turtle state every run started by runPrefix() starts from
+        self.freshTurtle = self.trtl.snapshot() if self.headless else None
+        # parameter names -> [(name, variable)], see bindParams
+        self.bindingPlans = {}
 
     def interpret(self):
-        print("Program counter : ", self.pc)
-        stmt, tgt = self.ir[self.pc]
-        print(stmt, stmt.__class__.__name__, tgt)
+        if self.engine == "program" and self.compiled is None:
+            return self.runProgram()[0]
+
+        if self.blocks is not None and self.blocks[self.pc] is not None:
+            # runs up to the end of the basic block starting at pc
+            ntgt = self.blocks[self.pc][0](self)
+        elif self.compiled is not None:
+            ntgt = self.compiled[self.pc](self)
+        else:
+            stmt, tgt = self.ir[self.pc]
+            ntgt = self.dispatch(stmt, tgt)
+
+        # TODO: handle statement
+        self.pc += ntgt
+
+        if self.pc >= len(self.ir):
+            self.finishProgram()
+            return True
+        else:
+            return False
 
-        self.sanityCheck(self.ir[self.pc])
+    def run(self, maxSteps=None, deadline=None, coverage=None, branches=None, edges=None, hits=None,
+            cfgHits=None, distances=None):
+        """
+        Run the program from the current pc until it ends or a budget is
+        exhausted. The step budget is exact and deterministic; the wall
+        clock is only checked every CLOCK_PERIOD steps.
+
+        Args:
+            maxSteps (int): maximum number of instructions to execute (None or 0: no limit).
+            deadline (float): time.monotonic() value at which the run is stopped.
+            coverage (list): if given, the pc of every executed instruction is appended.
+            branches (list): if given, (pc, outcome) of every executed condition is appended.
+            edges (set): if given, the (leader, leader) pairs of the CFG edges
+                taken are added; only recorded by the 'block' engine.
+            hits (bytearray): if given, the AFL-style edge hit counts of the
+                run are added to it (see coverageMap.py). The 'block' engine
+                counts the edges between blocks.
+            cfgHits (bytearray): if given, the hit counts of the numbered
+                CFG edges (see cfgCoverage.py) are added to it and the
+                edges taken are folded into self.pathHash.
+            distances (array): if given, the smallest branch distances of
+                the run are kept in it (see branchDistance.py). Not
+                recorded by the 'block' engine.
+
+        The 'program' engine checks the step budget once per loop
+        iteration (see progCompiler.py): the outcome is exact, but a run
+        over the budget may go on to the end of the iteration. It only
+        records the coverage; when tracing, or asked for branches, hits,
+        CFG edges or distances, it runs the closures of 'closure' instead,
+        to see every transition.
+
+        A loop run in closed form (see loopAccel.py) appends each of its
+        instructions to 'coverage' once, and its loop condition to
+        'branches' once per evaluation.
+
+        Returns:
+            ExecutionResult
+        """
+        limit = maxSteps if maxSteps else float("inf")
+        traced = (
+            self.tracer.enabled or branches is not None or hits is not None
+            or cfgHits is not None or distances is not None
+        )
+        if self.engine == "program" and not traced:
+            covered = set() if coverage is not None else None
+            completed, steps = self.runProgram(deadline, covered, limit)
+            if coverage is not None:
+                coverage.extend(sorted(covered))
+            if completed:
+                outcome = ExecutionResult.COMPLETED
+            elif steps > limit:
+                outcome = ExecutionResult.STEP_LIMIT
+            else:
+                outcome = ExecutionResult.TIME_LIMIT
+            return ExecutionResult(outcome, steps)
+        if self.engine == "program" and self.compiled is None:
+            # the compiled program only records coverage, step through
+            # the closures with interpret()
+            self.compiled = self.tracer.instrument(self.irHandler.getCompiledIR(), self.ir)
+
+        if deadline is None:
+            deadline = float("inf")
+        if self.pc >= len(self.ir):
+            self.finishProgram()
+            return ExecutionResult(ExecutionResult.COMPLETED, 0)
+        if self.engine == "block":
+            entered = set() if coverage is not None else None
+            try:
+                return self.runBlocks(limit, deadline, entered, branches, edges, hits, cfgHits)
+            finally:
+                if entered is not None:
+                    # expand the entered blocks into their instructions
+                    for leader in sorted(entered):
+                        size = self.blocks[leader][1] if self.blocks[leader] else 1
+                        coverage.extend(range(leader, leader + size))
+        isCondition, loops = self.isCondition, self.loops
+        if hits is not None:
+            ids = self.irHandler.getEdgeMap().ids
+            prevLoc = 0
+        if cfgHits is not None:
+            edgeTo = self.irHandler.getCFGEdges().edgeTo
+            end = len(self.ir)
+        if distances is not None:
+            distanceAt = self.irHandler.getBranchDistance().record
+        steps = 0
+        nextCheck = self.CLOCK_PERIOD
+        while True:
+            if steps >= limit:
+                return ExecutionResult(ExecutionResult.STEP_LIMIT, steps)
+            if steps >= nextCheck:
+                nextCheck = steps + self.CLOCK_PERIOD
+                if time.monotonic() > deadline:
+                    return ExecutionResult(ExecutionResult.TIME_LIMIT, steps)
+            pc = self.pc
+            if loops is not None and loops[pc] is not None:
+                loop = loops[pc]
+                done = loop.run(self, limit - steps)
+                if done is not None:
+                    steps += done
+                    times = (done - 2) // (loop.length + 3)
+                    if coverage is not None:
+                        coverage.extend(range(loop.start, loop.end if times else loop.header + 1))
+                    if branches is not None:
+                        # the loop condition and the jump back of every iteration
+                        branches.extend([(loop.header, True), (loop.end - 1, False)] * times)
+                        branches.append((loop.header, False))
+                    if hits is not None:
+                        prevLoc = loop.recordHits(hits, ids, prevLoc, times)
+                    if cfgHits is not None:
+                        self.pathHash = loop.recordEdges(cfgHits, self.pathHash, edgeTo, times)
+                    if self.pc >= len(self.ir):
+                        if hits is not None:
+                            recordHit(hits, ids, prevLoc, len(self.ir))
+                        self.finishProgram()
+                        return ExecutionResult(ExecutionResult.COMPLETED, steps)
+                    continue
+            if coverage is not None:
+                coverage.append(pc)
+            if hits is not None:
+                prevLoc = recordHit(hits, ids, prevLoc, pc)
+            steps += 1
+            terminated = self.interpret()
+            if branches is not None and isCondition[pc]:
+                branches.append((pc, self.cond_eval))
+            if distances is not None and distanceAt[pc] is not None:
+                # conditions and assumes do not change the state
+                distanceAt[pc](self, distances)
+            if cfgHits is not None and edgeTo[pc] is not None:
+                # pc ends a basic block
+                self.pathHash = recordEdge(cfgHits, self.pathHash, edgeTo[pc][min(self.pc, end)])
+            if terminated:
+                if hits is not None:
+                    recordHit(hits, ids, prevLoc, self.pc)
+                return ExecutionResult(ExecutionResult.COMPLETED, steps)
+
+    def runBlocks(self, limit, deadline, entered=None, branches=None, edges=None, hits=None,
+                  cfgHits=None):
+        # run() for the 'block' engine: one iteration per basic block, so
+        # the step budget may be overshot by the length of the last block.
+        blocks, compiled, isCondition = self.blocks, self.compiled, self.isCondition
+        end = len(self.ir)
+        if hits is not None:
+            ids = self.irHandler.getEdgeMap().ids
+            prevLoc = 0
+        if cfgHits is not None:
+            edgeTo = self.irHandler.getCFGEdges().edgeTo
+        steps = 0
+        nextCheck = self.CLOCK_PERIOD
+        prev = None
+        while self.pc < end:
+            if steps >= limit:
+                return ExecutionResult(ExecutionResult.STEP_LIMIT, steps)
+            if steps >= nextCheck:
+                nextCheck = steps + self.CLOCK_PERIOD
+                if time.monotonic() > deadline:
+                    return ExecutionResult(ExecutionResult.TIME_LIMIT, steps)
+            pc = self.pc
+            block = blocks[pc]
+            if block is None:
+                # pc was moved into the middle of a block, step to its end
+                block = (compiled[pc], 1)
+            run, size = block
+            if entered is not None:
+                entered.add(pc)
+            if edges is not None and prev is not None:
+                edges.add((prev, pc))
+            if hits is not None:
+                prevLoc = recordHit(hits, ids, prevLoc, pc)
+            prev = pc
+            steps += size
+            self.pc = pc + run(self)
+            last = pc + size - 1
+            if branches is not None and isCondition[last]:
+                branches.append((last, self.cond_eval))
+            if cfgHits is not None and edgeTo[last] is not None:
+                self.pathHash = recordEdge(cfgHits, self.pathHash, edgeTo[last][min(self.pc, end)])
+        if edges is not None and prev is not None:
+            edges.add((prev, end))
+        if hits is not None:
+            recordHit(hits, ids, prevLoc, end)
+        self.finishProgram()
+        return ExecutionResult(ExecutionResult.COMPLETED, steps)
+
+    def finishProgram(self):
+        # This is the ending of the interpreter.
+        self.trtl.write("End, Press ESC", font=("Arial", 15, "bold"))
+        if self.args is not None and self.args.hooks:
+            self.chironhook.ChironEndHook(self)
+
+    def runProgram(self, deadline=None, coverage=None, limit=float("inf")):
+        """
+        Run the whole program at once with the function compiled by
+        progCompiler. Executed IR indices are added to the set 'coverage'
+        if one is given.
+
+        Returns (completed, steps): completed is True if the program ended
+        before 'deadline' (a time.monotonic() value) within 'limit' steps.
+        """
+        program = self.irHandler.getCompiledProgram(coverage is not None)
+        if deadline is None:
+            deadline = float("inf")
+        # the variables are locals of the compiled program, no snapshot
+        failed = lambda pc, error: self.reportViolation(pc, self.ir[pc][0], error, snapshot=False)
+        completed, steps = program(self.store, self.trtl, coverage, deadline, limit, failed)
+        if completed:
+            self.pc = len(self.ir)
+            self.finishProgram()
+        return completed, steps
+
+    # --Snapshots-------------------------------------------------------
+
+    def snapshot(self):
+        """
+        Save pc, program variables and turtle state. Variables only hold
+        numbers, so a shallow copy of the store is a full copy.
+        """
+        if not self.headless:
+            raise NotImplementedError("Snapshots need a headless turtle.")
+        return Snapshot(
+            self.pc, dict(self.store), self.trtl.snapshot(), self.cond_eval,
+            list(self.violations), self.pathHash,
+        )
+
+    def restore(self, snapshot):
+        self.pc = snapshot.pc
+        # keep the store the same dict as vars(self.prg)
+        self.store.clear()
+        self.store.update(snapshot.store)
+        self.trtl.restore(snapshot.turtle)
+        self.cond_eval = snapshot.cond_eval
+        self.violations = list(snapshot.violations)
+        self.pathHash = snapshot.pathHash
+
+    def fork(self, snapshot=None):
+        """
+        Make a new interpreter for the same program in the state of
+        'snapshot' (default: the current state). It shares the compiled
+        code and the tracer, but has its own variables and turtle.
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+        child = copy.copy(self)
+        child.prg = ProgramContext()
+        child.store = vars(child.prg)
+        child.trtl = HeadlessTurtle(record=self.trtl.record)
+        child.restore(snapshot)
+        return child
+
+    def inputPrefix(self, names):
+        """
+        Number of leading instructions that run the same for every value
+        of the input variables 'names': straight-line code that neither
+        reads nor writes an input and checks no assertion.
+        """
+        if self.engine == "program":
+            # the compiled program always starts from the first instruction
+            return 0
+        names = {name.replace(":", "").strip() for name in names}
+        length = 0
+        for stmt, tgt in self.ir:
+            if isinstance(stmt, (ChironAST.ConditionCommand, ChironAST.AssertCommand, ChironAST.AssumeCommand)):
+                break
+            if names.intersection(collectVars([(stmt, tgt)])):
+                break
+            length += 1
+        return length
+
+    def runPrefix(self, names):
+        """
+        Start a run without inputs, execute its inputPrefix(names) and
+        return a snapshot of the state reached. Runs with any values of
+        'names' can then start from it with resume().
+        """
+        self.pc = 0
+        self.store.clear()
+        if self.freshTurtle is not None:
+            self.trtl.restore(self.freshTurtle)
+        self.initProgramContext({})
+        for _ in range(self.inputPrefix(names)):
+            if self.compiled is not None:
+                self.pc += self.compiled[self.pc](self)
+            else:
+                stmt, tgt = self.ir[self.pc]
+                self.pc += self.dispatch(stmt, tgt)
+        return self.snapshot()
+
+    def resume(self, snapshot, params):
+        # Start a new run with inputs 'params' from a runPrefix() snapshot.
+        self.restore(snapshot)
+        self.tracer.begin()
+        self.bindParams(params)
+
+    def dispatch(self, stmt, tgt):
+        self.sanityCheck((stmt, tgt))
 
         if isinstance(stmt, ChironAST.AssignmentCommand):
             ntgt = self.handleAssignment(stmt, tgt)
@@ -113,83 +535,110 @@ class ConcreteInterpreter(Interpreter):
             ntgt = self.handleAssumeCommand(stmt, tgt)
         else:
             raise NotImplementedError("Unknown instruction: %s, %s."%(type(stmt), stmt))
-
-        # TODO: handle statement
-        self.pc += ntgt
-
-        if self.pc >= len(self.ir):
-            # This is the ending of the interpreter.
-            self.trtl.write("End, Press ESC", font=("Arial", 15, "bold"))
-            if self.args is not None and self.args.hooks:
-                self.chironhook.ChironEndHook(self)
-            return True
-        else:
-            return False
+        return ntgt
     
     def initProgramContext(self, params):
         # This is the starting of the interpreter at setup stage.
+        self.tracer.begin()
+        self.violations = []
+        self.pathHash = 0
         if self.args is not None and self.args.hooks:
             self.chironhook.ChironStartHook(self)
         self.trtl.write("Start", font=("Arial", 15, "bold"))
-        for key,val in params.items():
-            var = key.replace(":","")
-            exec("setattr(self.prg,\"%s\",%s)" % (var, val))
+        self.bindParams(params)
+
+    def bindParams(self, params):
+        # The variable of every parameter name is worked out once per set
+        # of names. Numbers are stored directly, anything else is still
+        # evaluated from its text.
+        plan = self.bindingPlans.get(tuple(params))
+        if plan is None:
+            plan = [(key, key.replace(":","")) for key in params]
+            self.bindingPlans[tuple(params)] = plan
+        store = self.store
+        for key, var in plan:
+            val = params[key]
+            if type(val) is int or type(val) is float:
+                store[var] = val
+            else:
+                exec("setattr(self.prg,\"%s\",%s)" % (var, val))
     
     def handleAssignment(self, stmt, tgt):
-        print("  Assignment Statement")
+        if self.tracer.verbose:
+            print("  Assignment Statement")
         lhs = str(stmt.lvar).replace(":","")
         rhs = addContext(stmt.rexpr)
         exec("setattr(self.prg,\"%s\",%s)" % (lhs,rhs))
         return 1
 
     def handleCondition(self, stmt, tgt):
-        print("  Branch Instruction")
+        if self.tracer.verbose:
+            print("  Branch Instruction")
         condstr = addContext(stmt)
         exec("self.cond_eval = %s" % (condstr))
         return 1 if self.cond_eval else tgt
 
     def handleMove(self, stmt, tgt):
-        print("  MoveCommand")
+        if self.tracer.verbose:
+            print("  MoveCommand")
         exec("self.trtl.%s(%s)" % (stmt.direction,addContext(stmt.expr)))
         return 1
 
     def handleNoOpCommand(self, stmt, tgt):
-        print("  No-Op Command")
+        if self.tracer.verbose:
+            print("  No-Op Command")
         return 1
 
     def handlePen(self, stmt, tgt):
-        print("  PenCommand")
+        if self.tracer.verbose:
+            print("  PenCommand")
         exec("self.trtl.%s()"%(stmt.status))
         return 1
 
     def handleGotoCommand(self, stmt, tgt):
-        print(" GotoCommand")
+        if self.tracer.verbose:
+            print(" GotoCommand")
         xcor = addContext(stmt.xcor)
         ycor = addContext(stmt.ycor)
         exec("self.trtl.goto(%s, %s)" % (xcor, ycor))
         return 1
     
+    def reportViolation(self, pc, stmt, error, snapshot=True):
+        # The assert or assume 'stmt' at 'pc' failed with 'error'. Only
+        # its first failure in a run is recorded, a check failing in a
+        # loop costs one lookup per iteration.
+        if self.tracer.verbose:
+            print("Exception: ", error)
+        if pc in self.violations:
+            return
+        self.violations.append(pc)
+        if self.violationEvents is not None:
+            store = dict(self.store) if snapshot else None
+            self.violationEvents.append(Violation(pc, stmt, error, store))
+
     def handleAssertCommand(self, stmt, tgt):
-        print("  AssertCommand")
-        print("  Asserting: ", stmt.cond)
+        if self.tracer.verbose:
+            print("  AssertCommand")
+            print("  Asserting: ", stmt.cond)
         try:
             exec("self.cond_eval = %s" % (addContext(stmt.cond)))
             if not self.cond_eval:
                 raise AssertionError("Assertion Failed!")
         except Exception as e:
-            print("Exception: ", e)
+            self.reportViolation(self.pc, stmt, e)
         
         return 1
 
     def handleAssumeCommand(self, stmt, tgt):
-        print("  AssumeCommand")
-        print("  Assuming: ", stmt.cond)
+        if self.tracer.verbose:
+            print("  AssumeCommand")
+            print("  Assuming: ", stmt.cond)
         try:
             exec("self.cond_eval = %s" % (addContext(stmt.cond)))
             if not self.cond_eval:
                 raise AssertionError("Assumption Failed!")
         except Exception as e:
-            print("Exception: ", e)
+            self.reportViolation(self.pc, stmt, e)
         
         return 1
 
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lowers Chiron IR into pre-built Python closures.
+
+Every instruction is compiled once (when the IR is loaded) into a closure
+that takes the running interpreter and returns the relative jump to take.
+Expressions are compiled into closures over the flat variable store of the
+interpreter (the __dict__ of its ProgramContext) and the turtle, so no
+source string is built or re-parsed while the program runs.
+
+The closures of the instructions of one basic block (see cfg.cfgBuilder)
+can further be chained into a single block closure, which runs the whole
+straight-line block without returning to the interpreter loop.
+"""
+
+import operator
+
+from ChironAST import ChironAST
+import cfg.cfgBuilder as cfgB
+
+
+arithOps = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "%": operator.mod,
+}
+
+condOps = {
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+def varName(var):
+    # ':x' -> 'x', the key of the variable in the program store.
+    return str(var).replace(":", "").strip()
+
+
+def compileExpr(expr, logCmp=None):
+    """
+    Compile an expression into a closure of the form f(store, trtl).
+
+    Args:
+        expr (ChironAST.Expression): expression to compile.
+        logCmp (function): if given, called with every comparison of the
+            expression, returns a function record(lhs, rhs) the compiled
+            comparison calls with its operand values (see cmpLog.py).
+
+    Returns:
+        function: evaluates the expression over the variable store 'store'
+        (dict) and the turtle 'trtl'.
+    """
+    if isinstance(expr, ChironAST.Num):
+        val = expr.val
+        return lambda store, trtl: val
+
+    if isinstance(expr, ChironAST.Var):
+        name = varName(expr)
+        return lambda store, trtl: store[name]
+
+    if isinstance(expr, ChironAST.BoolTrue):
+        return lambda store, trtl: True
+
+    if isinstance(expr, ChironAST.BoolFalse):
+        return lambda store, trtl: False
+
+    if isinstance(expr, ChironAST.PenStatus):
+        return lambda store, trtl: trtl.isdown()
+
+    if isinstance(expr, ChironAST.UMinus):
+        sub = compileExpr(expr.expr, logCmp)
+        return lambda store, trtl: -sub(store, trtl)
+
+    if isinstance(expr, ChironAST.NOT):
+        sub = compileExpr(expr.expr, logCmp)
+        return lambda store, trtl: not sub(store, trtl)
+
+    if isinstance(expr, ChironAST.AND):
+        lhs, rhs = compileExpr(expr.lexpr, logCmp), compileExpr(expr.rexpr, logCmp)
+        return lambda store, trtl: lhs(store, trtl) and rhs(store, trtl)
+
+    if isinstance(expr, ChironAST.OR):
+        lhs, rhs = compileExpr(expr.lexpr, logCmp), compileExpr(expr.rexpr, logCmp)
+        return lambda store, trtl: lhs(store, trtl) or rhs(store, trtl)
+
+    if isinstance(expr, ChironAST.BinArithOp):
+        op = arithOps[expr.symbol]
+    elif isinstance(expr, ChironAST.BinCondOp):
+        op = condOps[expr.symbol]
+    else:
+        raise NotImplementedError("Unknown expression: %s, %s." % (type(expr), expr))
+
+    lexpr, rexpr = expr.lexpr, expr.rexpr
+    if logCmp is not None and isinstance(expr, ChironAST.BinCondOp):
+        lhs, rhs = compileExpr(lexpr, logCmp), compileExpr(rexpr, logCmp)
+        record = logCmp(expr)
+
+        def run(store, trtl):
+            lval, rval = lhs(store, trtl), rhs(store, trtl)
+            record(lval, rval)
+            return op(lval, rval)
+
+        return run
+
+    # Specialize the common operand shapes so that the leaves do not
+    # cost an extra call each.
+    if isinstance(lexpr, ChironAST.Var) and isinstance(rexpr, ChironAST.Num):
+        lname, rval = varName(lexpr), rexpr.val
+        return lambda store, trtl: op(store[lname], rval)
+    if isinstance(lexpr, ChironAST.Var) and isinstance(rexpr, ChironAST.Var):
+        lname, rname = varName(lexpr), varName(rexpr)
+        return lambda store, trtl: op(store[lname], store[rname])
+    if isinstance(lexpr, ChironAST.Num) and isinstance(rexpr, ChironAST.Var):
+        lval, rname = lexpr.val, varName(rexpr)
+        return lambda store, trtl: op(lval, store[rname])
+
+    lhs, rhs = compileExpr(lexpr, logCmp), compileExpr(rexpr, logCmp)
+    return lambda store, trtl: op(lhs(store, trtl), rhs(store, trtl))
+
+
+def compileAssignment(stmt, tgt):
+    name = varName(stmt.lvar)
+    rhs = compileExpr(stmt.rexpr)
+
+    def run(it):
+        store = it.store
+        store[name] = rhs(store, it.trtl)
+        return 1
+
+    return run
+
+
+def compileCondition(stmt, tgt, logCmp=None):
+    if isinstance(stmt.cond, ChironAST.BoolFalse):
+        # Unconditional jump emitted for loops and if-else blocks.
+        def run(it):
+            it.cond_eval = False
+            return tgt
+
+        return run
+
+    cond = compileExpr(stmt.cond, logCmp)
+
+    def run(it):
+        it.cond_eval = cond(it.store, it.trtl)
+        return 1 if it.cond_eval else tgt
+
+    return run
+
+
+def compileMove(stmt, tgt):
+    direction = stmt.direction
+    amount = compileExpr(stmt.expr)
+
+    def run(it):
+        getattr(it.trtl, direction)(amount(it.store, it.trtl))
+        return 1
+
+    return run
+
+
+def compilePen(stmt, tgt):
+    status = stmt.status
+
+    def run(it):
+        getattr(it.trtl, status)()
+        return 1
+
+    return run
+
+
+def compileGoto(stmt, tgt):
+    xcor = compileExpr(stmt.xcor)
+    ycor = compileExpr(stmt.ycor)
+
+    def run(it):
+        store, trtl = it.store, it.trtl
+        trtl.goto(xcor(store, trtl), ycor(store, trtl))
+        return 1
+
+    return run
+
+
+def compileNoOp(stmt, tgt):
+    return lambda it: 1
+
+
+def compileCheck(stmt, tgt, message, pc, logCmp=None):
+    # Shared by assert and assume: a violation is reported with
+    # it.reportViolation() and execution continues with the next instruction.
+    cond = compileExpr(stmt.cond, logCmp)
+
+    def run(it):
+        try:
+            it.cond_eval = cond(it.store, it.trtl)
+            if not it.cond_eval:
+                raise AssertionError(message)
+        except Exception as e:
+            it.reportViolation(pc, stmt, e)
+        return 1
+
+    return run
+
+
+def compileInstruction(stmt, tgt, pc=None, logCmp=None):
+    """
+    Compile one IR instruction, at IR index 'pc', into a closure
+    f(interpreter) -> relative jump. 'logCmp' instruments the comparisons
+    of conditions, asserts and assumes, see compileExpr.
+    """
+    if isinstance(stmt, ChironAST.AssignmentCommand):
+        return compileAssignment(stmt, tgt)
+    elif isinstance(stmt, ChironAST.ConditionCommand):
+        return compileCondition(stmt, tgt, logCmp)
+    elif isinstance(stmt, ChironAST.MoveCommand):
+        return compileMove(stmt, tgt)
+    elif isinstance(stmt, ChironAST.PenCommand):
+        return compilePen(stmt, tgt)
+    elif isinstance(stmt, ChironAST.GotoCommand):
+        return compileGoto(stmt, tgt)
+    elif isinstance(stmt, (ChironAST.NoOpCommand, ChironAST.PauseCommand)):
+        return compileNoOp(stmt, tgt)
+    elif isinstance(stmt, ChironAST.AssertCommand):
+        return compileCheck(stmt, tgt, "Assertion Failed!", pc, logCmp)
+    elif isinstance(stmt, ChironAST.AssumeCommand):
+        return compileCheck(stmt, tgt, "Assumption Failed!", pc, logCmp)
+    else:
+        raise NotImplementedError("Unknown instruction: %s, %s." % (type(stmt), stmt))
+
+
+def compileIR(ir):
+    """
+    Compile a whole IR list.
+
+    Args:
+        ir (List): List of program IR statements (stmt, relative jump).
+
+    Returns:
+        List: one closure per IR statement, indexed by program counter.
+    """
+    return [compileInstruction(stmt, tgt, pc) for pc, (stmt, tgt) in enumerate(ir)]
+
+
+def compileBlock(compiled, leader, size):
+    # Only the last instruction of a block can jump, the others return 1.
+    body = tuple(compiled[leader : leader + size - 1])
+    last = compiled[leader + size - 1]
+    offset = size - 1
+    # Short blocks (the common case) are unrolled.
+    if not body:
+        return last
+    if len(body) == 1:
+        first, = body
+
+        def run(it):
+            first(it)
+            return offset + last(it)
+    elif len(body) == 2:
+        first, second = body
+
+        def run(it):
+            first(it)
+            second(it)
+            return offset + last(it)
+    else:
+
+        def run(it):
+            for step in body:
+                step(it)
+            return offset + last(it)
+
+    return run
+
+
+def compileBlocks(ir, compiled):
+    """
+    Chain the instruction closures of every basic block of the IR.
+
+    Args:
+        ir (List): List of program IR statements (stmt, relative jump).
+        compiled (List): closures of the IR statements, as returned by compileIR.
+
+    Returns:
+        List: indexed by program counter, (closure, number of instructions)
+        for the leader of a basic block and None for the other instructions.
+        The closure f(interpreter) runs the block and returns the relative
+        jump from the leader to the next block.
+    """
+    cfg, _ = cfgB.buildCFG(ir)
+    blocks = [None] * len(ir)
+    for node in cfg.nodes():
+        if len(node.instrlist):
+            leader, size = node.instrlist[0][1], len(node.instrlist)
+            blocks[leader] = (compileBlock(compiled, leader, size), size)
+    return blocks
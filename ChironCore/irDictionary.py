@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dictionary of interesting input values, extracted from the IR.
+
+One pass over the IR collects the numeric literals (ChironAST.Num) of
+conditions, asserts, assumes, assignments and moves, as AFL collects the
+tokens of a program. Besides the literals themselves the dictionary holds
+
+    c - 1, c + 1          the neighbours of every literal, for the bounds
+                          of comparisons such as ':x > 10'
+    k * a  (<= 360)       the multiples of every turn angle a, up to
+                          MAX_MULTIPLES of them
+    n, n - 1, n + 1       the iteration counts of repeat loops, the
+                          literals assigned to the '__rep_counter_' variables
+
+The decrement and the test of the loop counters are left out, they are
+made by the repeat loop and not by the program.
+
+The fuzzer gives the dictionary to the mutator (MutatorBase.dictionary)
+and, with '--dictionary', runs a deterministic stage on every corpus entry
+that sets each variable in turn to each token.
+"""
+
+from ChironAST import ChironAST
+
+
+MAX_MULTIPLES = 8
+MAX_DICT_INPUTS = 256
+
+
+def literals(node):
+    # values of the numeric literals of an expression
+    if isinstance(node, ChironAST.Num):
+        yield node.val
+    elif isinstance(node, ChironAST.UMinus) and isinstance(node.expr, ChironAST.Num):
+        yield -node.expr.val
+    else:
+        for attr in ("lexpr", "rexpr", "expr", "cond", "xcor", "ycor"):
+            child = getattr(node, attr, None)
+            if isinstance(child, ChironAST.AST):
+                yield from literals(child)
+
+
+def number(val):
+    return int(val) if float(val).is_integer() else val
+
+
+def isLoopCounter(stmt):
+    if isinstance(stmt, ChironAST.AssignmentCommand):
+        return str(stmt.lvar).strip().startswith(":__rep_counter_")
+    if isinstance(stmt, ChironAST.ConditionCommand) and isinstance(stmt.cond, ChironAST.BinCondOp):
+        return str(stmt.cond.lexpr).strip().startswith(":__rep_counter_")
+    return False
+
+
+class IRDictionary:
+    def __init__(self, ir):
+        self.constants = set() # literals of the program
+        self.angles = set() # multiples of the turn angles
+        self.loopBounds = set() # iteration counts of the repeat loops
+        for stmt, _ in ir:
+            if isLoopCounter(stmt):
+                # the initialization 'counter = n' is the only assignment
+                # of a literal to a counter
+                if isinstance(stmt, ChironAST.AssignmentCommand) and isinstance(stmt.rexpr, ChironAST.Num):
+                    self.loopBounds.add(number(stmt.rexpr.val))
+                continue
+            values = [number(val) for val in literals(stmt)]
+            self.constants.update(values)
+            if isinstance(stmt, ChironAST.MoveCommand) and stmt.direction in ("left", "right"):
+                for angle in values:
+                    if angle:
+                        step = abs(angle)
+                        self.angles.update(
+                            number(step * k) for k in range(1, MAX_MULTIPLES + 1) if step * k <= 360
+                        )
+        tokens = set(self.angles)
+        for val in self.constants | self.loopBounds:
+            tokens.update((val - 1, val, val + 1))
+        self.tokens = sorted(tokens)
+
+    def __len__(self):
+        return len(self.tokens)
+
+
+def dictionaryInputs(data, dictionary, limit=MAX_DICT_INPUTS):
+    """
+    Inputs derived from 'data' (dict) by setting one variable to one token
+    of 'dictionary', every variable in turn for each token.
+
+    Returns:
+        List: new input dicts, at most 'limit'.
+    """
+    candidates = []
+    for token in dictionary.tokens:
+        for name, val in data.items():
+            if val == token:
+                continue
+            mutated = dict(data)
+            mutated[name] = token
+            candidates.append(mutated)
+            if len(candidates) >= limit:
+                return candidates
+    return candidates
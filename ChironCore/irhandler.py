@@ -6,6 +6,16 @@ from turtparse.tlangParser import tlangParser
 from turtparse.tlangLexer import tlangLexer
 
 from ChironAST import ChironAST
+from irCompiler import compileIR, compileBlocks
+from progCompiler import compileProgram
+from batchInterpreter import compileBatchIR
+from loopAccel import compileLoops
+from resultCache import irDigest
+from coverageMap import EdgeMap
+from cfgCoverage import CFGEdges
+from cmpLog import CmpLog
+from irDictionary import IRDictionary
+from branchDistance import BranchDistance
 
 
 def getParseTree(progfl):
@@ -32,9 +42,32 @@ class IRHandler:
         self.ir = ir
         # control flow graph
         self.cfg = cfg
+        # closures compiled from the IR (see irCompiler.py)
+        self.compiled = None
+        # basic block closures chained from them
+        self.blocks = None
+        # whole-program functions compiled from the IR (see progCompiler.py)
+        self.programs = {}
+        # closures for the lockstep interpreter (see batchInterpreter.py)
+        self.batchCompiled = None
+        # turtle-only repeat loops (see loopAccel.py)
+        self.loops = None
+        # hash of the IR, the key of cached executions (see resultCache.py)
+        self.digest = None
+        # location ids of the edge hit map (see coverageMap.py)
+        self.edgeMap = None
+        # numbered CFG edges (see cfgCoverage.py)
+        self.cfgEdges = None
+        # closures logging comparison operands (see cmpLog.py)
+        self.cmpLog = None
+        # interesting input values (see irDictionary.py)
+        self.dictionary = None
+        # branch distance closures (see branchDistance.py)
+        self.branchDistance = None
 
     def setIR(self, ir):
         self.ir = ir
+        self.resetCompiled()
 
     def setCFG(self, cfg):
         self.cfg = cfg
@@ -47,8 +80,94 @@ class IRHandler:
         f = open(filename, "rb")
         ir = pickle.load(f)
         self.ir = ir
+        self.resetCompiled()
         return ir
 
+    def resetCompiled(self):
+        # Must be called whenever the IR changes.
+        self.compiled = None
+        self.blocks = None
+        self.programs = {}
+        self.batchCompiled = None
+        self.loops = None
+        self.digest = None
+        self.edgeMap = None
+        self.cfgEdges = None
+        self.cmpLog = None
+        self.dictionary = None
+        self.branchDistance = None
+
+    def getCompiledIR(self):
+        """
+        Compile the IR into closures once and reuse them for every
+        interpreter built on this handler.
+        """
+        if self.compiled is None:
+            self.compiled = compileIR(self.ir)
+        return self.compiled
+
+    def getCompiledBlocks(self):
+        """
+        Chain the compiled closures of every basic block of the CFG,
+        see irCompiler.compileBlocks.
+        """
+        if self.blocks is None:
+            self.blocks = compileBlocks(self.ir, self.getCompiledIR())
+        return self.blocks
+
+    def getCompiledProgram(self, coverage=False):
+        """
+        Compile the whole IR into a single Python function, once per
+        coverage setting.
+        """
+        if coverage not in self.programs:
+            self.programs[coverage] = compileProgram(self.ir, coverage)
+        return self.programs[coverage]
+
+    def getCompiledBatchIR(self):
+        if self.batchCompiled is None:
+            self.batchCompiled = compileBatchIR(self.ir)
+        return self.batchCompiled
+
+    def getCompiledLoops(self):
+        """
+        Find the repeat loops that can be run in closed form,
+        see loopAccel.compileLoops.
+        """
+        if self.loops is None:
+            self.loops = compileLoops(self.ir)
+        return self.loops
+
+    def getDigest(self):
+        if self.digest is None:
+            self.digest = irDigest(self.ir)
+        return self.digest
+
+    def getEdgeMap(self):
+        if self.edgeMap is None:
+            self.edgeMap = EdgeMap(self.ir)
+        return self.edgeMap
+
+    def getCFGEdges(self):
+        if self.cfgEdges is None:
+            self.cfgEdges = CFGEdges(self.ir)
+        return self.cfgEdges
+
+    def getCmpLog(self):
+        if self.cmpLog is None:
+            self.cmpLog = CmpLog(self.ir)
+        return self.cmpLog
+
+    def getDictionary(self):
+        if self.dictionary is None:
+            self.dictionary = IRDictionary(self.ir)
+        return self.dictionary
+
+    def getBranchDistance(self):
+        if self.branchDistance is None:
+            self.branchDistance = BranchDistance(self.ir)
+        return self.branchDistance
+
     def updateJump(self, stmtList, index, pos):
         stmt, tgt = stmtList[index]
         # Don't update the conditional nodes whose
@@ -95,6 +214,7 @@ class IRHandler:
             index += 1
         # We only allow non-jump statement addition as of now.
         stmtList.insert(pos, (inst, 1))
+        self.resetCompiled()
 
     def removeInstruction(self, stmtList, pos):
         """[summary]
@@ -120,6 +240,7 @@ class IRHandler:
 
         # We only allow non-jump/non-conditional statement removal as of now.
         stmtList[pos] = (ChironAST.NoOpCommand(), 1)
+        self.resetCompiled()
 
     def pretty_print(self, irList):
         """
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Closed-form execution of turtle-only repeat loops.
+
+A 'repeat N [ body ]' is lowered by astGenPass.visitLoop into
+
+    [i]     :__rep_counter_k = N                      [1]
+    [i+1]   (:__rep_counter_k > 0)                    [L+3]
+    [i+2]   body (L instructions)
+    [i+L+2] :__rep_counter_k = (:__rep_counter_k - 1) [1]
+    [i+L+3] False                                     [-L-2]
+
+When the body only moves the turtle and changes the pen, the amounts of
+its moves are the same in every iteration, so one iteration is a fixed
+rigid transform of the turtle and the whole loop is applied at once by
+HeadlessTurtle.repeat. Loops whose body assigns variables, branches,
+jumps (goto), checks assertions or reads the loop counter or the pen
+status run normally.
+"""
+
+from numbers import Integral
+
+from ChironAST import ChironAST
+from irCompiler import compileExpr, varName
+from headlessTurtle import HeadlessTurtle
+from coverageMap import recordHit
+from cfgCoverage import recordEdge, recordCycle
+
+
+COUNTER_PREFIX = "__rep_counter_"
+
+
+def isCounterDecrement(stmt, counter):
+    return (
+        isinstance(stmt, ChironAST.AssignmentCommand)
+        and varName(stmt.lvar) == counter
+        and isinstance(stmt.rexpr, ChironAST.Diff)
+        and isinstance(stmt.rexpr.lexpr, ChironAST.Var)
+        and varName(stmt.rexpr.lexpr) == counter
+        and isinstance(stmt.rexpr.rexpr, ChironAST.Num)
+        and stmt.rexpr.rexpr.val == 1
+    )
+
+
+def isLoopInvariant(expr, counter):
+    # the expression does not change while the body runs
+    if isinstance(expr, ChironAST.Var):
+        return varName(expr) != counter
+    if isinstance(expr, ChironAST.PenStatus):
+        return False
+    if isinstance(expr, ChironAST.AST):
+        return all(isLoopInvariant(child, counter) for child in vars(expr).values())
+    return True
+
+
+class TurtleLoop:
+    def __init__(self, ir, start):
+        """
+        Match the repeat loop initialised at IR index 'start', raises
+        ValueError if it is not one or its body is not turtle-only.
+        """
+        init, initTgt = ir[start]
+        if not (
+            isinstance(init, ChironAST.AssignmentCommand)
+            and varName(init.lvar).startswith(COUNTER_PREFIX)
+            and initTgt == 1
+            and start + 1 < len(ir)
+        ):
+            raise ValueError(start)
+        self.counter = varName(init.lvar)
+        header, headerTgt = ir[start + 1]
+        length = headerTgt - 3
+        end = start + 1 + headerTgt
+        if not (
+            isinstance(header, ChironAST.ConditionCommand)
+            and isinstance(header.cond, ChironAST.GT)
+            and isinstance(header.cond.lexpr, ChironAST.Var)
+            and varName(header.cond.lexpr) == self.counter
+            and isinstance(header.cond.rexpr, ChironAST.Num)
+            and header.cond.rexpr.val == 0
+            and length >= 0
+            and end <= len(ir)
+            and isCounterDecrement(ir[end - 2][0], self.counter)
+            and isinstance(ir[end - 1][0], ChironAST.ConditionCommand)
+            and isinstance(ir[end - 1][0].cond, ChironAST.BoolFalse)
+            and ir[end - 1][1] == -(length + 2)
+        ):
+            raise ValueError(start)
+
+        self.moves = []
+        for stmt, tgt in ir[start + 2 : end - 2]:
+            if isinstance(stmt, ChironAST.MoveCommand) and isLoopInvariant(stmt.expr, self.counter):
+                self.moves.append((stmt.direction, compileExpr(stmt.expr)))
+            elif isinstance(stmt, ChironAST.PenCommand):
+                self.moves.append((stmt.status, None))
+            elif not isinstance(stmt, (ChironAST.NoOpCommand, ChironAST.PauseCommand)):
+                raise ValueError(start)
+
+        self.count = compileExpr(init.rexpr)
+        self.start = start
+        self.header = start + 1
+        self.end = end # IR index after the loop
+        self.length = length
+
+    def steps(self, times):
+        # instructions executed by the loop with 'times' iterations
+        return 2 + times * (self.length + 3)
+
+    def run(self, it, budget):
+        """
+        Execute the whole loop on interpreter 'it' if that takes at most
+        'budget' steps. Returns the number of steps executed, or None if
+        the loop has to run instruction by instruction.
+        """
+        trtl, store = it.trtl, it.store
+        if not isinstance(trtl, HeadlessTurtle):
+            return None
+        try:
+            count = self.count(store, trtl)
+        except Exception:
+            return None
+        if isinstance(count, bool) or not (
+            isinstance(count, Integral) or (isinstance(count, float) and count.is_integer())
+        ):
+            # a fractional count runs ceil(N) times with rounding in
+            # the counter, leave it to the interpreter
+            return None
+        times = max(int(count), 0)
+        steps = self.steps(times)
+        if steps > budget:
+            return None
+        if times:
+            try:
+                moves = [
+                    (command, amount(store, trtl) if amount is not None else None)
+                    for command, amount in self.moves
+                ]
+            except Exception:
+                return None
+            trtl.repeat(moves, times)
+        store[self.counter] = count - times
+        it.cond_eval = False
+        it.pc = self.end
+        return steps
+
+    def recordHits(self, hits, ids, prevLoc, times):
+        # the edge hits of the instructions the loop stood for
+        for pc in (self.start, self.header):
+            prevLoc = recordHit(hits, ids, prevLoc, pc)
+        if times:
+            # header, body, decrement, jump back, header: 'times' times
+            for pc in list(range(self.header + 1, self.end)) + [self.header]:
+                prevLoc = recordHit(hits, ids, prevLoc, pc, times)
+        return prevLoc
+
+    def recordEdges(self, hits, path, edgeTo, times):
+        # the CFG edges of the loop: into the header, 'times' times
+        # through the body and back, then out of the loop
+        path = recordEdge(hits, path, edgeTo[self.start][self.header])
+        if times:
+            cycle = [edgeTo[self.header][self.header + 1], edgeTo[self.end - 1][self.header]]
+            path = recordCycle(hits, path, cycle, times)
+        return recordEdge(hits, path, edgeTo[self.header][self.end])
+
+
+def compileLoops(ir):
+    """
+    Find the turtle-only repeat loops of the IR.
+
+    Returns:
+        List: indexed by program counter, the TurtleLoop initialised at
+        that index or None.
+    """
+    loops = [None] * len(ir)
+    for idx, (stmt, _) in enumerate(ir):
+        if isinstance(stmt, ChironAST.AssignmentCommand) and varName(stmt.lvar).startswith(COUNTER_PREFIX):
+            try:
+                loops[idx] = TurtleLoop(ir, idx)
+            except ValueError:
+                pass
+    return loops
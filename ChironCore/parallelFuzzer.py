@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parallel fuzzing with N worker processes.
+
+Every worker runs its own Fuzzer loop and shares what it finds through a
+sync directory laid out like AFL's -M/-S output:
+
+    <sync dir>/worker<i>/queue/id_<n>.json    inputs that improved coverage
+                                              and the features of their run
+    <sync dir>/worker<i>/fuzzer_stats.json    executions, corpus size
+
+Every sync interval a worker runs the inputs the other workers queued
+since its last sync and keeps those that improve its own coverage, which
+merges their coverage into its map. Queue files are written to a
+temporary name and renamed, so a reader never sees a partial file.
+
+The coordinator starts the workers, stops them at the time budget and
+merges their stats and queues: a fresh Fuzzer takes the union of the
+queued inputs with the coverage features their worker recorded (see
+corpusDir.features), which yields the total coverage and corpus without
+running them again. Only the seed and queue entries recorded with another
+kind of feedback are run, until the time budget ends. Workers that exit
+with an error or leave no stats are reported.
+"""
+
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from fuzzer import Fuzzer, InputObject
+from findings import Findings
+from corpusDir import toJSON, fromJSON
+from resultCache import canonicalInputs
+
+
+class SyncDir:
+    def __init__(self, root, name, interval=2.0, stop=None):
+        """
+        Args:
+            root (str): the sync directory shared by all workers.
+            name (str): subdirectory of this worker.
+            interval (float): seconds between two syncs.
+            stop (multiprocessing.Event): set by the coordinator to stop the worker.
+        """
+        self.root = root
+        self.name = name
+        self.interval = interval
+        self.stop = stop
+        self.queue = os.path.join(root, name, "queue")
+        os.makedirs(self.queue, exist_ok=True)
+        self.saved = set() # canonical inputs queued by this worker
+        self.count = 0
+        self.seen = {} # other worker -> queue files already read
+
+    def save(self, inputObject, kind=None, coverage=None):
+        # 'coverage': the features of the run of the input with feedback 'kind'
+        key = canonicalInputs(inputObject.data)
+        if key in self.saved:
+            return
+        self.saved.add(key)
+        path = os.path.join(self.queue, "id_%06d.json" % self.count)
+        self.count += 1
+        entry = {"data": inputObject.data}
+        if coverage is not None:
+            entry["kind"] = kind
+            entry["coverage"] = sorted(toJSON(f) for f in coverage)
+        writeJSON(path, entry)
+
+    def pull(self):
+        # inputs queued by the other workers since the last call
+        inputs = []
+        for name in sorted(os.listdir(self.root)):
+            queue = os.path.join(self.root, name, "queue")
+            if name == self.name or not os.path.isdir(queue):
+                continue
+            seen = self.seen.setdefault(name, set())
+            for fl in sorted(os.listdir(queue)):
+                if fl in seen or not fl.endswith(".json"):
+                    continue
+                seen.add(fl)
+                try:
+                    with open(os.path.join(queue, fl)) as f:
+                        data = json.load(f)["data"]
+                except (OSError, ValueError, KeyError):
+                    continue
+                key = canonicalInputs(data)
+                if key not in self.saved:
+                    self.saved.add(key)
+                    inputs.append(data)
+        return inputs
+
+    def stopped(self):
+        return self.stop is not None and self.stop.is_set()
+
+    def writeStats(self, fuzzer):
+        stats = {
+            "pid": os.getpid(),
+            "execs": fuzzer.execs,
+            "corpus": len(fuzzer.corpus),
+            "queued": self.count,
+            "time": time.time(),
+        }
+        writeJSON(os.path.join(self.root, self.name, "fuzzer_stats.json"), stats)
+
+
+def writeJSON(path, data):
+    # write and rename, readers never see a partial file
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def readQueues(root):
+    # the entries of every input queued by any worker, in worker and
+    # queue order: dicts with 'data' and, if recorded, 'kind' and
+    # 'coverage' (a set of features)
+    entries, keys = [], set()
+    for name in sorted(os.listdir(root)):
+        queue = os.path.join(root, name, "queue")
+        if not os.path.isdir(queue):
+            continue
+        for fl in sorted(os.listdir(queue)):
+            if not fl.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(queue, fl)) as f:
+                    entry = json.load(f)
+                key = canonicalInputs(entry["data"])
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+            if key not in keys:
+                keys.add(key)
+                if "coverage" in entry:
+                    entry["coverage"] = {fromJSON(f) for f in entry["coverage"]}
+                entries.append(entry)
+    return entries
+
+
+def readStats(root):
+    stats = {}
+    for name in sorted(os.listdir(root)):
+        try:
+            with open(os.path.join(root, name, "fuzzer_stats.json")) as f:
+                stats[name] = json.load(f)
+        except (OSError, ValueError):
+            pass
+    return stats
+
+
+def runWorker(irHandler, args, index, root, stop):
+    # A forked process shares the parent's random state, every worker
+    # must mutate differently.
+    random.seed()
+    np.random.seed()
+    fuzzer = Fuzzer(irHandler, args)
+    fuzzer.sync = SyncDir(root, "worker%d" % index, args.sync_interval, stop)
+    if fuzzer.stats is not None:
+        fuzzer.stats.directory = os.path.join(fuzzer.stats.directory, fuzzer.sync.name)
+    if fuzzer.findings is not None:
+        fuzzer.findings = Findings(os.path.join(fuzzer.findings.directory, fuzzer.sync.name))
+    fuzzer.fuzz(timeLimit=args.timeout, generateRandom=args.fuzzer_gen_rand)
+    fuzzer.sync.writeStats(fuzzer)
+    sys.stdout.flush()
+
+
+def fuzzParallel(irHandler, args):
+    """
+    Fuzz with args.jobs worker processes for args.timeout seconds.
+
+    Returns:
+        tuple (coverage, corpus) : as Fuzzer.fuzz, for the merged queues
+        of all workers.
+    """
+    if getattr(args, "hybrid", False):
+        # the workers are daemon processes, which cannot start a solver
+        print("[fuzzer] '--hybrid' is ignored with parallel workers.")
+        args.hybrid = False
+    root = args.sync_dir or tempfile.mkdtemp(prefix="chiron-sync-")
+    os.makedirs(root, exist_ok=True)
+    # workers share the compiled IR, which cannot be pickled
+    ctx = multiprocessing.get_context("fork")
+    stop = ctx.Event()
+    workers = [
+        ctx.Process(target=runWorker, args=(irHandler, args, index, root, stop), daemon=True)
+        for index in range(args.jobs)
+    ]
+    print(f"[fuzzer] Starting {args.jobs} workers, sync directory : {root}")
+    start = time.monotonic()
+    for worker in workers:
+        worker.start()
+    try:
+        deadline = start + args.timeout
+        while any(worker.is_alive() for worker in workers) and time.monotonic() < deadline:
+            time.sleep(min(args.sync_interval, max(deadline - time.monotonic(), 0.01)))
+    finally:
+        stop.set()
+        # a worker in the middle of an execution stops at its next clock check
+        for worker in workers:
+            worker.join(max(args.sync_interval, 1.0))
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+
+    failed = [index for index, worker in enumerate(workers) if worker.exitcode != 0]
+    for index in failed:
+        print(f"[fuzzer] Worker {index} exited with code {workers[index].exitcode}")
+    if len(failed) == len(workers):
+        raise RuntimeError("All fuzzing workers failed, see their output above.")
+    stats = readStats(root)
+    for index in range(args.jobs):
+        if "worker%d" % index not in stats:
+            print(f"[fuzzer] Worker {index} wrote no stats")
+    execs = sum(stat["execs"] for stat in stats.values())
+    elapsed = time.monotonic() - start
+    print(
+        f"[fuzzer] {len(stats)} workers, {execs} executions, "
+        f"{execs / elapsed:.1f} execs/sec"
+    )
+
+    # merge: the union of the queues with the coverage the workers
+    # recorded, within the time budget
+    merged = Fuzzer(irHandler, args)
+    merged.stats = None
+    merged.findings = None
+    merged.addIfInteresting(InputObject(data=args.params), merged.handleExecution(merged.ir, args.params, end=deadline))
+    rerun = 0
+    for entry in readQueues(root):
+        if entry.get("kind") == merged.feedback and "coverage" in entry:
+            metric = merged.metricOf(entry["coverage"])
+            # IR indices of the run, unknown for a hit map
+            merged.lastCoverage = [] if merged.hitMap else metric
+        elif time.monotonic() < deadline:
+            metric = merged.handleExecution(merged.ir, entry["data"], end=deadline)
+            rerun += 1
+        else:
+            continue
+        merged.addIfInteresting(InputObject(data=entry["data"]), metric)
+    if rerun:
+        print(f"[fuzzer] Merge ran {rerun} queued inputs recorded without coverage")
+    return merged.coverage, merged.corpus
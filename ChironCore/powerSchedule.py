@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Seed scheduling for the fuzzer.
+
+Instead of one mutation of a uniformly chosen seed per iteration, a seed
+is selected and then mutated 'energy' times in a row.
+
+Selection (as Entropic) weighs seeds by the rarity of the coverage
+features they hit: the sum over their features of 1 / the number of
+executions that hit the feature, times one plus the number of features
+they were the first to hit, divided by one plus the number of times they
+were already selected.
+
+Energy (as AFLFast's FAST schedule) is
+
+    BASE_ENERGY * perf * 2^min(s, MAX_LEVEL) / f        (1 .. MAX_ENERGY)
+
+with s the number of times the seed was selected, f the number of
+executions that ran the same path (the same coverage metric) as the seed
+and perf the average execution time over the seed's (0.25 .. 4), so
+seeds on rarely run paths get more mutations and slow seeds fewer.
+
+The selection weights are recomputed every REWEIGHT_PERIOD selections, or
+every len(corpus) / 4 for large corpora so that the cost per selection
+stays constant; seeds added in between are picked with the average weight.
+
+In directed mode both the weight and the energy of a seed are scaled by
+the factor of its distance to the targets (see directed.py).
+
+The 'uniform' schedule is the plain random.choice with one mutation.
+"""
+
+import bisect
+import random
+
+import numpy as np
+
+
+BASE_ENERGY = 8
+MAX_ENERGY = 256
+MAX_LEVEL = 16
+REWEIGHT_PERIOD = 64
+
+
+class SeedStats:
+    __slots__ = ("features", "path", "execTime", "found", "fuzzed", "distance")
+
+    def __init__(self, features, path, execTime, found, distance=None):
+        self.features = features # indices of the features the seed hits
+        self.path = path # fingerprint of its coverage metric
+        self.execTime = execTime # seconds of its run, None if unknown
+        self.found = found # features it was the first to hit
+        self.fuzzed = 0 # times selected
+        self.distance = distance # to the targets of directed fuzzing
+
+
+def fingerprint(metric):
+    # (feature indices, path fingerprint) of the curr_metric of a run
+    if isinstance(metric, np.ndarray):
+        return np.flatnonzero(metric), hash(metric.tobytes())
+    features = np.fromiter(sorted(set(metric)), dtype=np.intp)
+    return features, hash(features.tobytes())
+
+
+class PowerSchedule:
+    def __init__(self, size, schedule="fast"):
+        """
+        Args:
+            size (int): number of coverage features, the length of the
+                hit map or the number of IR indices plus the exit.
+            schedule (str): 'fast' or 'uniform'.
+        """
+        self.schedule = schedule
+        self.freq = np.zeros(size, dtype=np.int64) # executions that hit each feature
+        self.pathFreq = {} # path fingerprint -> executions that ran it
+        self.stats = {} # seed id -> SeedStats
+        self.totalTime = 0.0
+        self.timed = 0
+        self.current = None
+        self.remaining = 0
+        self.sinceReweight = 0
+        # cumulative weights of the first 'weighted' seeds of the corpus
+        self.cumWeights = []
+        self.weighted = 0
+        self.default = 1.0
+        # DirectedDistance of directed fuzzing, None otherwise
+        self.directed = None
+
+    def observe(self, metric, execTime=None):
+        # count the features and the path of one execution
+        if self.schedule == "uniform":
+            return
+        if isinstance(metric, np.ndarray):
+            # cheaper than the indices for a whole map
+            self.freq += metric != 0
+            path = hash(metric.tobytes())
+        else:
+            features, path = fingerprint(metric)
+            self.freq[features] += 1
+        self.pathFreq[path] = self.pathFreq.get(path, 0) + 1
+        if execTime is not None:
+            self.totalTime += execTime
+            self.timed += 1
+
+    def add(self, seed, metric, execTime=None, distance=None):
+        # a seed was added to the corpus, after observe() of its run if any
+        if self.schedule == "uniform":
+            return
+        features, path = fingerprint(metric)
+        found = int((self.freq[features] <= 1).sum())
+        self.freq[features] = np.maximum(self.freq[features], 1)
+        self.stats[seed.id] = SeedStats(features, path, execTime, found, distance)
+
+    def weight(self, stats):
+        rarity = float((1.0 / self.freq[stats.features]).sum())
+        weight = rarity * (1 + stats.found) / (1 + stats.fuzzed)
+        if self.directed is not None:
+            weight *= self.directed.factor(stats.distance)
+        return weight
+
+    def energy(self, stats):
+        if stats is None:
+            return BASE_ENERGY
+        perf = 1.0
+        if stats.execTime and self.timed:
+            perf = min(max(self.totalTime / self.timed / stats.execTime, 0.25), 4.0)
+        fast = 2.0 ** min(stats.fuzzed, MAX_LEVEL) / self.pathFreq.get(stats.path, 1)
+        if self.directed is not None:
+            fast *= self.directed.factor(stats.distance)
+        return int(min(max(BASE_ENERGY * perf * fast, 1), MAX_ENERGY))
+
+    def reweight(self, corpus):
+        stats = [self.stats.get(seed.id) for seed in corpus]
+        weights = [self.weight(st) for st in stats if st is not None]
+        # seeds never run (the initial ones) get the average weight
+        self.default = sum(weights) / len(weights) if weights else 1.0
+        total, self.cumWeights = 0.0, []
+        for st in stats:
+            total += self.weight(st) if st is not None else self.default
+            self.cumWeights.append(total)
+        self.weighted = len(corpus)
+
+    def select(self, corpus):
+        if not self.weighted or self.sinceReweight >= max(REWEIGHT_PERIOD, len(corpus) // 4):
+            self.reweight(corpus)
+            self.sinceReweight = 0
+        self.sinceReweight += 1
+        weighted = self.cumWeights[-1] if self.cumWeights else 0.0
+        total = weighted + self.default * (len(corpus) - self.weighted)
+        if not total:
+            return random.choice(corpus)
+        r = random.random() * total
+        if r < weighted:
+            return corpus[min(bisect.bisect_right(self.cumWeights, r), self.weighted - 1)]
+        # one of the seeds added since the last reweight
+        return corpus[random.randrange(self.weighted, len(corpus))]
+
+    def next(self, corpus):
+        """The seed to mutate next."""
+        if self.schedule == "uniform":
+            return random.choice(corpus)
+        if self.remaining <= 0:
+            self.current = self.select(corpus)
+            stats = self.stats.get(self.current.id)
+            self.remaining = self.energy(stats)
+            if stats is not None:
+                stats.fuzzed += 1
+        self.remaining -= 1
+        return self.current
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compiles a whole Chiron program into a single Python function.
+
+The relative jumps of the IR are turned back into structured Python:
+
+    repeat N [ body ]   (emitted by astGenPass.visitLoop)
+
+        [i]     :__rep_counter_k = N            [1]
+        [i+1]   (:__rep_counter_k > 0)          [L+3]
+        [i+2]   body (L instructions)
+        [i+L+2] :__rep_counter_k = (:__rep_counter_k - 1) [1]
+        [i+L+3] False                           [-L-2]
+
+    becomes a 'while' loop, and the ConditionCommand/"False" jump pairs of
+    if and if-else become 'if'/'else'. When the IR does not have this shape
+    (e.g. after an IR transformation), the basic blocks of the CFG built by
+    cfgBuilder.buildCFG are emitted as a block dispatch loop instead.
+
+Program variables are kept as Python locals. The generated function is
+
+    run(store, trtl, cov, deadline, limit, failed) -> (bool, int)
+
+It loads the variables from 'store', runs the program on the turtle 'trtl'
+and writes the variables back. When compiled with coverage, every executed
+IR index is added to the set 'cov'. failed(idx, error) is called for
+every violated assert/assume. The instructions executed are counted per
+straight-line run of them, as the coverage records are made. At every
+loop iteration the count is checked against the step budget 'limit' and,
+every CLOCK_PERIOD iterations, the clock against 'deadline' (a
+time.monotonic() value). The function returns (True, steps) if the
+program completed within both budgets and (False, steps) otherwise: the
+step budget was exhausted if steps > limit. A run over the step budget is
+stopped at the end of the loop iteration it was exhausted in, not at the
+exact instruction.
+"""
+
+import time
+
+from ChironAST import ChironAST
+import cfg.cfgBuilder as cfgB
+
+
+CLOCK_PERIOD = 1024
+
+
+class Unstructured(Exception):
+    pass
+
+
+def localName(var):
+    return "v_" + str(var).replace(":", "").strip()
+
+
+def isJump(stmt):
+    return isinstance(stmt, ChironAST.ConditionCommand) and isinstance(stmt.cond, ChironAST.BoolFalse)
+
+
+def exprSource(expr):
+    if isinstance(expr, ChironAST.Num):
+        return repr(expr.val)
+    if isinstance(expr, ChironAST.Var):
+        return localName(expr)
+    if isinstance(expr, ChironAST.BoolTrue):
+        return "True"
+    if isinstance(expr, ChironAST.BoolFalse):
+        return "False"
+    if isinstance(expr, ChironAST.PenStatus):
+        return "trtl.isdown()"
+    if isinstance(expr, ChironAST.UMinus):
+        return "(-%s)" % exprSource(expr.expr)
+    if isinstance(expr, ChironAST.NOT):
+        return "(not %s)" % exprSource(expr.expr)
+    if isinstance(expr, (ChironAST.BinArithOp, ChironAST.BinCondOp)):
+        return "(%s %s %s)" % (exprSource(expr.lexpr), expr.symbol, exprSource(expr.rexpr))
+    raise NotImplementedError("Unknown expression: %s, %s." % (type(expr), expr))
+
+
+def collectVars(ir):
+    names = set()
+
+    def visit(node):
+        if isinstance(node, ChironAST.Var):
+            names.add(str(node).replace(":", "").strip())
+        elif isinstance(node, ChironAST.AST):
+            for child in vars(node).values():
+                visit(child)
+
+    for stmt, _ in ir:
+        visit(stmt)
+    return sorted(names)
+
+
+class ProgramEmitter:
+    def __init__(self, ir, coverage=False):
+        self.ir = ir
+        self.coverage = coverage
+        self.lines = []
+        self.pending = [] # IR indices executed since the last step count (and coverage record)
+
+    def emit(self, depth, line):
+        self.lines.append("    " * depth + line)
+
+    def hit(self, *indices):
+        self.pending.extend(indices)
+
+    def flush(self, depth):
+        if self.pending:
+            self.emit(depth, "steps += %d" % len(self.pending))
+            if self.coverage:
+                self.emit(depth, "cov_update(%r)" % (tuple(self.pending),))
+            self.pending = []
+
+    def tick(self, depth):
+        self.emit(depth, "if steps > limit:")
+        self.emit(depth + 1, "return False, steps")
+        self.emit(depth, "ticks -= 1")
+        self.emit(depth, "if not ticks:")
+        self.emit(depth + 1, "ticks = %d" % CLOCK_PERIOD)
+        self.emit(depth + 1, "if clock() > deadline:")
+        self.emit(depth + 2, "return False, steps")
+
+    # --Straight-line instructions--------------------------------------
+
+    def emitSimple(self, depth, idx):
+        stmt, tgt = self.ir[idx]
+        if tgt != 1:
+            raise Unstructured(idx)
+        self.hit(idx)
+        if isinstance(stmt, ChironAST.AssignmentCommand):
+            self.emit(depth, "%s = %s" % (localName(stmt.lvar), exprSource(stmt.rexpr)))
+        elif isinstance(stmt, ChironAST.MoveCommand):
+            self.emit(depth, "trtl.%s(%s)" % (stmt.direction, exprSource(stmt.expr)))
+        elif isinstance(stmt, ChironAST.PenCommand):
+            self.emit(depth, "trtl.%s()" % stmt.status)
+        elif isinstance(stmt, ChironAST.GotoCommand):
+            self.emit(depth, "trtl.goto(%s, %s)" % (exprSource(stmt.xcor), exprSource(stmt.ycor)))
+        elif isinstance(stmt, (ChironAST.NoOpCommand, ChironAST.PauseCommand)):
+            pass
+        elif isinstance(stmt, (ChironAST.AssertCommand, ChironAST.AssumeCommand)):
+            message = "Assertion Failed!" if isinstance(stmt, ChironAST.AssertCommand) else "Assumption Failed!"
+            self.emit(depth, "try:")
+            self.emit(depth + 1, "if not %s:" % exprSource(stmt.cond))
+            self.emit(depth + 2, "raise AssertionError(%r)" % message)
+            self.emit(depth, "except Exception as e:")
+            self.emit(depth + 1, "failed(%d, e)" % idx)
+        else:
+            raise NotImplementedError("Unknown instruction: %s, %s." % (type(stmt), stmt))
+
+    # --Structured regions----------------------------------------------
+
+    def emitRegion(self, depth, start, end, tail=()):
+        """
+        Emit IR[start:end] as structured code, or raise Unstructured.
+        'tail' are IR indices executed after the region (its closing jump).
+        """
+        idx = start
+        emitted = len(self.lines)
+        while idx < end:
+            stmt, tgt = self.ir[idx]
+            if not isinstance(stmt, ChironAST.ConditionCommand):
+                self.emitSimple(depth, idx)
+                idx += 1
+                continue
+
+            if tgt < 1 or idx + tgt > end or isJump(stmt):
+                raise Unstructured(idx)
+            last, lastTgt = self.ir[idx + tgt - 1]
+            cond = exprSource(stmt.cond)
+
+            if tgt > 1 and isJump(last) and lastTgt == -(tgt - 1):
+                # loop: header at idx, back jump at idx + tgt - 1
+                self.hit(idx)
+                self.flush(depth)
+                self.emit(depth, "while %s:" % cond)
+                self.emitRegion(depth + 1, idx + 1, idx + tgt - 1, (idx + tgt - 1, idx))
+                self.tick(depth + 1)
+                idx += tgt
+            elif tgt > 1 and isJump(last) and lastTgt > 0:
+                # if-else: jump over the else block at idx + tgt - 1
+                join = idx + tgt - 1 + lastTgt
+                if join > end:
+                    raise Unstructured(idx)
+                self.hit(idx)
+                self.flush(depth)
+                self.emit(depth, "if %s:" % cond)
+                self.emitRegion(depth + 1, idx + 1, idx + tgt - 1, (idx + tgt - 1,))
+                self.emit(depth, "else:")
+                self.emitRegion(depth + 1, idx + tgt, join)
+                idx = join
+            else:
+                self.hit(idx)
+                self.flush(depth)
+                self.emit(depth, "if %s:" % cond)
+                self.emitRegion(depth + 1, idx + 1, idx + tgt)
+                idx += tgt
+        self.hit(*tail)
+        self.flush(depth)
+        if len(self.lines) == emitted:
+            self.emit(depth, "pass")
+
+    # --Unstructured fallback: basic block dispatch---------------------
+
+    def emitBlocks(self, depth):
+        cfg, _ = cfgB.buildCFG(self.ir)
+        blocks = sorted((node.instrlist[0][1], node) for node in cfg.nodes() if len(node.instrlist))
+        self.emit(depth, "block = 0")
+        self.emit(depth, "while True:")
+        keyword = "if"
+        for leader, node in blocks:
+            self.emit(depth + 1, "%s block == %d:" % (keyword, leader))
+            keyword = "elif"
+            for stmt, idx in node.instrlist:
+                tgt = self.ir[idx][1]
+                if isinstance(stmt, ChironAST.ConditionCommand):
+                    self.hit(idx)
+                    self.flush(depth + 2)
+                    self.emit(depth + 2, "block = %d if %s else %d" % (idx + 1, exprSource(stmt.cond), idx + tgt))
+                else:
+                    self.emitSimple(depth + 2, idx)
+                    if idx == node.instrlist[-1][1]:
+                        self.flush(depth + 2)
+                        self.emit(depth + 2, "block = %d" % (idx + 1))
+        self.emit(depth + 1, "else:")
+        self.emit(depth + 2, "break")
+        self.tick(depth + 1)
+
+    def emitFunction(self):
+        names = collectVars(self.ir)
+        self.emit(0, "def run(store, trtl, cov, deadline, limit, failed):")
+        if self.coverage:
+            self.emit(1, "cov_update = cov.update")
+        self.emit(1, "ticks = %d" % CLOCK_PERIOD)
+        self.emit(1, "steps = 0")
+        for name in names:
+            self.emit(1, "v_%s = store.get(%r, UNSET)" % (name, name))
+        self.emit(1, "try:")
+        body = len(self.lines)
+        try:
+            self.emitRegion(2, 0, len(self.ir))
+        except Unstructured:
+            del self.lines[body:]
+            self.pending = []
+            self.emitBlocks(2)
+        self.emit(2, "return steps <= limit, steps")
+        self.emit(1, "finally:")
+        for name in names:
+            self.emit(2, "if v_%s is not UNSET:" % name)
+            self.emit(3, "store[%r] = v_%s" % (name, name))
+        if not names:
+            self.emit(2, "pass")
+        return "\n".join(self.lines) + "\n"
+
+
+def programSource(ir, coverage=False):
+    return ProgramEmitter(ir, coverage).emitFunction()
+
+
+def compileProgram(ir, coverage=False):
+    """
+    Compile the IR into one Python function (see the module docstring).
+
+    Args:
+        ir (List): List of program IR statements (stmt, relative jump).
+        coverage (bool): record executed IR indices in the 'cov' set.
+
+    Returns:
+        function: run(store, trtl, cov, deadline, limit, failed) -> (bool, int)
+    """
+    source = programSource(ir, coverage)
+    code = compile(source, "<chiron-program>", "exec")
+    namespace = {"UNSET": object(), "clock": time.monotonic}
+    exec(code, namespace)
+    run = namespace["run"]
+    run.source = source
+    return run
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache of the results of concrete program executions.
+
+Chiron programs are deterministic: the same IR run on the same inputs with
+the same step budget always covers the same instructions, ends in the same
+turtle pose and fails the same asserts. The fuzzer re-runs inputs its
+mutator produced before and SBFL runs every reduced test of the correct
+program a second time for the fault oracle, so these results are cached.
+
+The key is the SHA-256 of the IR (the printed form of every instruction
+with its jump), the canonical form of the inputs (sorted, ':'-normalized
+names), the step budget and a variant string naming anything else that
+changes the result: loops run in closed form (which rounds differently,
+see loopAccel.py), the kind of hit map recorded and the engine recording
+it. Records live in an in-memory LRU tier and, optionally, in a directory
+with one JSON file per key that persists across runs. Runs stopped by the deadline are not deterministic and are
+never cached.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+
+def irDigest(ir):
+    h = hashlib.sha256()
+    for stmt, tgt in ir:
+        h.update(("%s %s [%d]\n" % (type(stmt).__name__, stmt, tgt)).encode())
+    return h.hexdigest()
+
+
+def canonicalInputs(inputs):
+    # {':x': 1, 'y': 2.0} -> '[[":x", "1"], [":y", "2.0"]]'; repr keeps 1 and 1.0 apart
+    items = sorted((":" + key.replace(":", "").strip(), repr(val)) for key, val in inputs.items())
+    return json.dumps(items)
+
+
+class ExecutionRecord:
+    # What a cached execution produced.
+    def __init__(self, outcome, steps, coverage, pose, violations, hits=None, pathHash=None):
+        self.outcome = outcome # ExecutionResult outcome
+        self.steps = steps
+        self.coverage = tuple(coverage) # executed IR indices, sorted, no duplicates
+        self.pose = tuple(pose) # final (x, y, heading) of the turtle
+        self.violations = tuple(violations) # IR indices of failed asserts/assumes
+        self.hits = hits # coverageMap.sparse() edge hit counts, if recorded
+        self.pathHash = pathHash # hash of the CFG edges taken, if recorded
+
+    @classmethod
+    def fromInterpreter(cls, it, result, coverage, hits=None, pathHash=None):
+        trtl = it.trtl
+        return cls(
+            result.outcome,
+            result.steps,
+            sorted(set(coverage)),
+            (trtl.xcor(), trtl.ycor(), trtl.heading()),
+            it.violations,
+            hits,
+            pathHash,
+        )
+
+    def toJSON(self):
+        data = {
+            "outcome": self.outcome,
+            "steps": self.steps,
+            "coverage": list(self.coverage),
+            "pose": list(self.pose),
+            "violations": list(self.violations),
+        }
+        if self.hits is not None:
+            data["hits"] = self.hits
+        if self.pathHash is not None:
+            data["pathHash"] = self.pathHash
+        return data
+
+    @classmethod
+    def fromJSON(cls, data):
+        return cls(
+            data["outcome"], data["steps"], data["coverage"], data["pose"],
+            data["violations"], data.get("hits"), data.get("pathHash"),
+        )
+
+
+class ResultCache:
+    def __init__(self, capacity=4096, directory=None):
+        """
+        Args:
+            capacity (int): number of records kept in memory (0: no memory tier).
+            directory (str): if given, records are also stored in this directory.
+        """
+        self.capacity = capacity
+        self.directory = directory
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def fromArgs(cls, args):
+        size = getattr(args, "cache_size", 4096)
+        directory = getattr(args, "cache_dir", None)
+        if not size and directory is None:
+            return None
+        return cls(size, directory)
+
+    def key(self, irHandler, inputs, maxSteps=None, variant=""):
+        text = "%s\n%s\n%s\n%s" % (
+            irHandler.getDigest(), canonicalInputs(inputs), maxSteps or 0, variant
+        )
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key):
+        record = self.memory.get(key)
+        if record is not None:
+            self.memory.move_to_end(key)
+        elif self.directory is not None and os.path.exists(self.path(key)):
+            try:
+                with open(self.path(key)) as f:
+                    record = ExecutionRecord.fromJSON(json.load(f))
+            except (OSError, ValueError, KeyError):
+                record = None
+            if record is not None:
+                self.remember(key, record)
+        if record is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return record
+
+    def put(self, key, record):
+        self.remember(key, record)
+        if self.directory is not None:
+            # write and rename, readers never see a partial file
+            tmp = "%s.%d.tmp" % (self.path(key), os.getpid())
+            with open(tmp, "w") as f:
+                json.dump(record.toJSON(), f)
+            os.replace(tmp, self.path(key))
+
+    def remember(self, key, record):
+        if not self.capacity:
+            return
+        self.memory[key] = record
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+
+    def __str__(self):
+        total = self.hits + self.misses
+        rate = 100.0 * self.hits / total if total else 0.0
+        return "%d hits, %d misses (%.1f%% hit rate), %d records in memory" % (
+            self.hits, self.misses, rate, len(self.memory)
+        )
@@ -94,13 +94,14 @@ def generateEncryption(s,pcIndex,pc,params,coverage,ir,pcEval):
             print("symbEnc else", vars(s.z3Vars),"\n")
     return pc, pcIndex
 
-def symbolicExecutionMain(irHandler, params, constparams, timeLimit=10):
+def symbolicExecutionMain(irHandler, params, constparams, timeLimit=10, maxSteps=None):
     """[summary]
 
     Args:
         ir (List): List of program IR statments
         params (dict): Mapped variables with initial assignments.
         timeLimit (float/int): Total time(sec) to run the fuzzer loop for.
+        maxSteps (int): Instruction budget of one concrete run (None or 0: no limit).
 
     Returns:
         tuple (coverageInfo, corpus) : Return coverage information and corpus of inputs.
@@ -110,9 +111,9 @@ def symbolicExecutionMain(irHandler, params, constparams, timeLimit=10):
         params[k]=constparams[k]
     # Initial Seed values from user.
     # temp_input = InputObject(data=params)
-    start_time = time.time()
+    start_time = time.monotonic()
     # symbolic execution ends at this timestamp.
-    endTime = time.time() + timeLimit
+    endTime = time.monotonic() + timeLimit
     flipPC = []
     s = z3Solver(irHandler.ir)
     s.initProgramContext(params)
@@ -120,31 +121,29 @@ def symbolicExecutionMain(irHandler, params, constparams, timeLimit=10):
     # program must be less than end time.
     rnd1=0
     res = "sat"
+    # Every path starts from the state reached by the part of the program
+    # that does not depend on the inputs, which is only executed once.
+    base = ConcreteInterpreter(irHandler, None, headless=True)
+    entry = base.runPrefix(params)
     tmplist = []
     testData = {}
-    while time.time() <= endTime:
+    while time.monotonic() <= endTime:
         if str(res)=="sat":
             # print("Testcase: ",rnd1)
             rnd1+=1
-            coverage = [] # coverage for current path
+            # coverage for current path, the prefix is straight-line code
+            coverage = list(range(entry.pc))
             pc = []
             pcEval = []
-            inptr = ConcreteInterpreter(irHandler, None)
-            inptr.pc = 0
-            terminated = False
-            inptr.initProgramContext(params)
-            while time.time() <= endTime :
-                coverage.append(inptr.pc)
-                stmt, tgt = irHandler.ir[inptr.pc]
-                if isinstance(stmt, ChironAST.ConditionCommand):
-                    pc.append(inptr.pc)
-                terminated = inptr.interpret()
-                if isinstance(stmt, ChironAST.ConditionCommand):
-                    pcEval.append(inptr.cond_eval)
-                if terminated:
-                    break
+            inptr = base.fork(entry)
+            inptr.bindParams(params)
+            # (pc, outcome) of every executed condition.
+            branches = []
+            inptr.run(maxSteps=maxSteps, deadline=endTime, coverage=coverage, branches=branches)
+            pc = [p for p, _ in branches]
+            pcEval = [outcome for _, outcome in branches]
         # print("pc coverage",pc,coverage)
-        if time.time() > endTime:
+        if time.monotonic() > endTime:
             break
         flipPC += [0 for i in range(len(flipPC),len(pc))]
         # print(flipPC)
@@ -201,7 +200,7 @@ def symbolicExecutionMain(irHandler, params, constparams, timeLimit=10):
     file1.write(json_obj)
     file1.close()
 
-    if time.time() >= endTime:
+    if time.monotonic() >= endTime:
         print(f" Program took too long to execute. Terminated")
     else:
         print("All possible paths covered.")
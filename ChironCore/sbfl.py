@@ -15,6 +15,9 @@ import random
 import numpy as np
 import time
 from interpreter import *
+from batchInterpreter import BatchInterpreter
+from resultCache import ExecutionRecord
+from branchDistance import closer
 import argparse
 import math
 
@@ -23,34 +26,60 @@ class Executor:
     # Execute the program using the input test
     # and find which components are executed by test
     # and the final turtle location.
-    def __init__(self):
-        pass
+    def __init__(self, verbose=False, maxSteps=None, engine=None, cache=None):
+        # print a message for every executed test
+        self.verbose = verbose
+        # instruction budget of one test (None or 0: no limit)
+        self.maxSteps = maxSteps
+        # interpreter engine, see ConcreteInterpreter
+        self.engine = engine
+        # ResultCache of executed tests, or None
+        self.cache = cache
 
     def execute(self, ir, inputList={}, end=0):
         """
+        end is the time.monotonic() value by which the test must end.
         returns coverage and turtle location at the end of program.
         """
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(ir, inputList, self.maxSteps)
+            record = self.cache.get(key)
+            if record is not None:
+                return list(record.coverage), record.pose[:2]
+
         coverage = []
-        inptr = ConcreteInterpreter(ir, None)
+        inptr = ConcreteInterpreter(ir, None, headless=True, engine=self.engine)
         inptr.pc = 0
-        terminated = False
         inptr.initProgramContext(inputList)
-        # The maximum time given to execute a test case.
-        while time.time() <= end:
-            coverage.append(inptr.pc)
-            terminated = inptr.interpret()
-            if terminated:
-                break
-        if time.time() >= end:
-            print(f"[SBFL] Program took too long to execute. Terminated\n")
-        else:
-            print("[SBFL] Program Ended.\n")
+        # The maximum time and steps given to execute a test case.
+        result = inptr.run(maxSteps=self.maxSteps, deadline=end, coverage=coverage)
+        if self.verbose:
+            if result.hung:
+                print(f"[SBFL] Program stopped : {result}. Terminated\n")
+            else:
+                print("[SBFL] Program Ended.\n")
 
         # final turtle location.
         turtle_pos = inptr.trtl.pos()
+        if key is not None and result.outcome != ExecutionResult.TIME_LIMIT:
+            self.cache.put(key, ExecutionRecord.fromInterpreter(inptr, result, coverage))
 
         return list(set(coverage)), turtle_pos
 
+    def executeBatch(self, ir, inputLists, timeLimit=10):
+        """
+        runs all the tests at once with the lockstep interpreter, each test
+        gets at most 'timeLimit' seconds.
+        returns the coverage bitmap (tests x components) and the
+        turtle location of every test at the end of program.
+        """
+        batch = BatchInterpreter(ir, inputLists)
+        batch.run(deadline=time.monotonic() + timeLimit, maxSteps=self.maxSteps)
+        if self.verbose:
+            print(f"[SBFL] Batch of {batch.size} tests ended.\n")
+        return batch.coverage, batch.positions()
+
 
 # Genetic Algorithm takes object of type Individual
 class Individual:
@@ -279,13 +308,20 @@ class FaultOrcale:
 
 
 class SBFLAnalysis(ConcreteInterpreter):
-    def __init__(self, irHandler, timeLimit=10):
-        super().__init__(irHandler)
+    def __init__(
+        self, irHandler, timeLimit=10, vectorized=False, maxSteps=None, engine=None, cache=None,
+        branchDistance=False,
+    ):
+        super().__init__(irHandler, None, headless=True)
         self.ir = irHandler.ir
         self.irhandler = irHandler
         self.allinputList = []
         self.timeLimit = timeLimit
-        self.executor = Executor()
+        self.executor = Executor(maxSteps=maxSteps, engine=engine, cache=cache)
+        # run all tests at once with the NumPy lockstep interpreter
+        self.vectorized = vectorized
+        # guide test generation with branch distances (see branchDistance.py)
+        self.branchDistance = irHandler.getBranchDistance() if branchDistance else None
 
     def generateActivityMatrix(self, tests):
         self.allinputList = tests
@@ -293,7 +329,7 @@ class SBFLAnalysis(ConcreteInterpreter):
         total_tests = len(tests)
 
         # initialize ir interpreter.
-        executer = Executor()
+        executer = self.executor
 
         # total number of compoents in ir, each line is considered as a component.
         components = len(self.irhandler.ir)
@@ -301,9 +337,17 @@ class SBFLAnalysis(ConcreteInterpreter):
         # Note : last column contains index of test, used for fault oracle.
         activity_mat = np.zeros((total_tests, components + 1), dtype="int")
 
+        if self.vectorized:
+            coverage, _ = executer.executeBatch(
+                self.irhandler, self.allinputList, timeLimit=self.timeLimit
+            )
+            activity_mat[:, :components] = coverage
+            activity_mat[:, -1] = np.arange(total_tests)
+            return activity_mat.tolist()
+
         for index in range(total_tests):
             inputList = self.allinputList[index]
-            endLimit = time.time() + self.timeLimit
+            endLimit = time.monotonic() + self.timeLimit
 
             # get which components are executed.
             coverage, _ = executer.execute(self.irhandler, inputList=inputList, end=endLimit)
@@ -321,14 +365,27 @@ class SBFLAnalysis(ConcreteInterpreter):
     def generateSpectrum(self, orcl, timeLimit=360):
         # run correct and buggy program to get error vector [Fault Oracle]
         spectrum = np.zeros((len(orcl.reducedTests), len(orcl.ir2.ir) + 1), dtype="int")
-        executer = Executor()
+        executer = self.executor
+
+        if self.vectorized:
+            _, ir1_trltl_pos = executer.executeBatch(
+                orcl.ir1, orcl.reducedTests, timeLimit=timeLimit
+            )
+            cov, ir2_trltl_pos = executer.executeBatch(
+                orcl.ir2, orcl.reducedTests, timeLimit=timeLimit
+            )
+            spectrum[:, : len(orcl.ir2.ir)] = cov
+            for i in range(len(orcl.reducedTests)):
+                # test-case fails if the turtle ends at a different location.
+                spectrum[i, -1] = 0 if ir1_trltl_pos[i] == ir2_trltl_pos[i] else 1
+            return spectrum.tolist()
 
         for i, test in enumerate(orcl.reducedTests):
             _, ir1_trltl_pos = executer.execute(
-                ir=orcl.ir1, end=(time.time() + timeLimit), inputList=test
+                ir=orcl.ir1, end=(time.monotonic() + timeLimit), inputList=test
             )
             cov, ir2_trltl_pos = executer.execute(
-                ir=orcl.ir2, end=(time.time() + timeLimit), inputList=test
+                ir=orcl.ir2, end=(time.monotonic() + timeLimit), inputList=test
             )
             spectrum[i, cov] = 1
             if ir1_trltl_pos == ir2_trltl_pos:
@@ -349,7 +406,36 @@ class SBFLAnalysis(ConcreteInterpreter):
                 bit_len = math.floor(math.log(abs(inp), 2) + 1)
             return inp ^ (random.getrandbits(bit_len + 1))
 
+    def runDistances(self, inputList, best):
+        # run a test, True if it got closer to some branch than 'best'
+        distances = self.branchDistance.newDistances()
+        self.resume(self.runPrefix(inputList), inputList)
+        self.run(
+            maxSteps=self.executor.maxSteps, deadline=time.monotonic() + self.timeLimit,
+            distances=distances,
+        )
+        return closer(best, distances)
+
+    def generateGuidedTests(self, inputVars, total_tests, attempts=16):
+        # Every test is mutated from an earlier test that got closer to
+        # some branch, trying up to 'attempts' mutants for one that does too.
+        best = self.branchDistance.newDistances()
+        first = {var: random.randint(-100, 100) for var in inputVars}
+        self.runDistances(first, best)
+        guides, allinputList = [first], [first]
+        while len(allinputList) < total_tests:
+            for _ in range(attempts):
+                parent = random.choice(guides)
+                inputDict = {var: self.mutateinput(parent[var]) for var in inputVars}
+                if self.runDistances(inputDict, best):
+                    guides.append(inputDict)
+                    break
+            allinputList.append(inputDict)
+        return allinputList
+
     def generateTests(self, inputVars, total_tests):
+        if inputVars != [] and self.branchDistance is not None:
+            return self.generateGuidedTests(inputVars, total_tests)
         allinputList = []
         if inputVars == []:
             allinputList = [{} for i in range(total_tests)]
@@ -380,10 +466,23 @@ def testsuiteGenerator(
     mutpb=0.5,
     ngen=50,
     verbose=True,
+    vectorized=False,
+    maxSteps=None,
+    engine=None,
+    cache=None,
+    branchDistance=False,
 ):
     # execute correct program to get activity matrix. it will be used by
     # genetic algorithm to optimize the test-suite size
-    sbfl_object = SBFLAnalysis(irHandler=irhandler1, timeLimit=timeLimit)
+    sbfl_object = SBFLAnalysis(
+        irHandler=irhandler1,
+        timeLimit=timeLimit,
+        vectorized=vectorized,
+        maxSteps=maxSteps,
+        engine=engine,
+        cache=cache,
+        branchDistance=branchDistance,
+    )
 
     # generate random tests
     original_tests = sbfl_object.generateTests(inputVars=inputVars, total_tests=Ntests)
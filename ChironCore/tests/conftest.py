@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+CORE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CORE)
+sys.path.insert(0, os.path.join(os.path.dirname(CORE), "Submission"))
+
+from ChironAST.builder import astGenPass
+from irhandler import IRHandler, getParseTree
+
+
+def loadProgram(path):
+    return IRHandler(astGenPass().visitStart(getParseTree(path)))
+
+
+@pytest.fixture
+def program(tmp_path):
+    # program("<turtle source>") -> IRHandler of the program
+    def build(source):
+        path = tmp_path / "program.tl"
+        path.write_text(source)
+        return loadProgram(str(path))
+
+    return build
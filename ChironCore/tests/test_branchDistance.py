@@ -0,0 +1,81 @@
+"""
+Branch distances of numeric conditions (branchDistance.py).
+"""
+
+import argparse
+from array import array
+
+import pytest
+
+from branchDistance import K, closer, compare
+from interpreter import ConcreteInterpreter
+
+
+@pytest.mark.parametrize("symbol,a,b,expected", [
+    ("<", 1, 4, (0.0, 3)),
+    ("<", 4, 4, (K, 0.0)),
+    ("<", 6, 4, (2 + K, 0.0)),
+    (">", 6, 4, (0.0, 2)),
+    (">", 4, 4, (K, 0.0)),
+    (">", 1, 4, (3 + K, 0.0)),
+    ("<=", 4, 4, (0.0, K)),
+    ("<=", 1, 4, (0.0, 3 + K)),
+    ("<=", 6, 4, (2, 0.0)),
+    (">=", 4, 4, (0.0, K)),
+    (">=", 6, 4, (0.0, 2 + K)),
+    (">=", 1, 4, (3, 0.0)),
+    ("==", 4, 4, (0.0, K)),
+    ("==", 1, 4, (3, 0.0)),
+    ("==", 6, 4, (2, 0.0)),
+    ("!=", 1, 4, (0.0, 3)),
+    ("!=", 4, 4, (K, 0.0)),
+    ("<", -2.5, 0.5, (0.0, 3.0)),
+])
+def test_compare(symbol, a, b, expected):
+    assert compare(symbol, a, b) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("symbol", ["<", ">", "<=", ">=", "==", "!="])
+@pytest.mark.parametrize("a,b", [(1, 4), (4, 4), (6, 4), (-3.5, -3.25)])
+def test_compare_takes_one_direction(symbol, a, b):
+    # the direction taken has distance 0, the other a positive one
+    dTrue, dFalse = compare(symbol, a, b)
+    taken = {"<": a < b, ">": a > b, "<=": a <= b, ">=": a >= b, "==": a == b, "!=": a != b}[symbol]
+    assert (dTrue == 0.0) == taken
+    assert (dFalse == 0.0) != taken
+    assert min(dTrue, dFalse) == 0.0 and max(dTrue, dFalse) > 0.0
+
+
+def test_unknown_comparison():
+    with pytest.raises(NotImplementedError):
+        compare("<>", 1, 2)
+
+
+def test_closer_lowers_the_best_distances():
+    best = array("d", [1.0, 0.5, 0.0, 1.0])
+    assert closer(best, array("d", [1.0, 0.25, 0.0, 1.0]))
+    assert list(best) == [1.0, 0.25, 0.0, 1.0]
+    assert not closer(best, array("d", [1.0, 0.5, 0.5, 1.0]))
+    assert list(best) == [1.0, 0.25, 0.0, 1.0]
+
+
+@pytest.mark.parametrize("engine", ["exec", "closure", "program"])
+def test_run_keeps_the_smallest_distances(program, engine):
+    irHandler = program(
+        ":i = 0\n"
+        "repeat 3 [\n"
+        "  :i = :i + 1\n"
+        "  if (:x - :i == 10 && !(:y > 2)) [ forward 1 ]\n"
+        "]\n"
+    )
+    it = ConcreteInterpreter(irHandler, argparse.Namespace(hooks=False, engine=engine), headless=True)
+    it.initProgramContext({":x": 20, ":y": 5})
+    distances = irHandler.getBranchDistance().newDistances()
+    it.run(distances=distances)
+    site = [pc for pc in irHandler.getBranchDistance().sites if "==" in str(irHandler.ir[pc][0])][0]
+    base = 2 * irHandler.getBranchDistance().sites.index(site)
+    # :x - :i == 10 is 7 away at :i = 3 and !(:y > 2) is 3 away: true is
+    # their sum, false the smaller distance, 0 as the branch is never taken
+    dTrue = 7 + 3
+    assert distances[base] == pytest.approx(dTrue / (dTrue + 1.0))
+    assert distances[base + 1] == 0.0
@@ -0,0 +1,36 @@
+"""
+AFL-style edge hit counts (coverageMap.py).
+"""
+
+import argparse
+
+import pytest
+
+from coverageMap import EdgeMap, classify, recordHit
+from interpreter import ConcreteInterpreter
+
+
+def test_hit_counts_saturate():
+    edgeMap = EdgeMap([None] * 4)
+    hits = edgeMap.newHits()
+    for _ in range(256):
+        recordHit(hits, edgeMap.ids, 0, 1)
+    edge = edgeMap.ids[1]
+    assert hits[edge] == 0xFF
+    recordHit(hits, edgeMap.ids, 0, 1, count=512)
+    assert hits[edge] == 0xFF and classify(hits)[edge] == 128
+
+
+@pytest.mark.parametrize("times", [255, 256, 512, 1000])
+def test_loop_run_in_closed_form_counts_like_stepping(program, times):
+    irHandler = program("repeat %d [ forward 1 left 3 ]\n" % times)
+    maps = []
+    for accelerate in (False, True):
+        args = argparse.Namespace(hooks=False, engine="closure", accelerate=accelerate)
+        it = ConcreteInterpreter(irHandler, args, headless=True)
+        it.initProgramContext({})
+        hits = irHandler.getEdgeMap().newHits()
+        it.run(hits=hits)
+        maps.append(hits)
+    assert maps[0] == maps[1]
+    assert max(maps[1]) == 0xFF
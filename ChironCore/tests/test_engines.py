@@ -0,0 +1,204 @@
+"""
+Differential test of the execution engines: 'closure', 'block', 'program'
+and the batch interpreter must end every run in the same state as the
+reference 'exec' engine.
+"""
+
+import argparse
+import time
+import os
+
+import pytest
+
+from conftest import CORE, loadProgram
+from interpreter import ConcreteInterpreter, ExecutionResult
+from batchInterpreter import BatchInterpreter, COMPLETED
+
+ENGINES = ["closure", "block", "program"]
+
+LOOPS = """
+:n = 7
+repeat 40 [
+  forward :x
+  left 91
+  penup
+  forward 2
+  pendown
+  right 3.5
+]
+repeat :n [ forward 5 right 72 ]
+repeat 0 [ forward 5 ]
+repeat 4 [ forward :x left 90 :n = :n + 1 ]
+repeat 3 [ repeat 5 [ backward :n left 60 ] ]
+"""
+
+BRANCHES = """
+:a = :x * 3 - :y
+if (:a > 10 && :y != 0) [
+  :b = :a / :y
+  forward :b
+] else [
+  :b = :a % 7
+  right :b
+]
+assert :b < 5
+assume :x >= 0
+if !(:x == :y || :b <= 2) [
+  goto (:x, :b)
+] else [
+  backward 10
+]
+"""
+
+CASES = [
+    (os.path.join(CORE, "example", "example1.tl"), [
+        {":x": 20, ":y": 30, ":z": 20, ":p": 40},
+        {":x": 1, ":y": 3, ":z": 2, ":p": 4},
+        {":x": 50, ":y": -7, ":z": 9, ":p": 2},
+    ]),
+    (os.path.join(CORE, "example", "example2.tl"), [{}]),
+    (os.path.join(CORE, "example", "kachuapur2.tl"), [
+        {":steps": 12, ":radius": 33},
+        {":steps": 0, ":radius": 90},
+    ]),
+    ("LOOPS", [{":x": 3}, {":x": -11}]),
+    ("BRANCHES", [{":x": 9, ":y": 4}, {":x": -2, ":y": 0}, {":x": 5, ":y": 5}]),
+]
+
+
+@pytest.fixture
+def load(program):
+    def load(name):
+        if name in ("LOOPS", "BRANCHES"):
+            return program(globals()[name])
+        return loadProgram(name)
+
+    return load
+
+
+def finalState(irHandler, engine, params):
+    args = argparse.Namespace(hooks=False, engine=engine)
+    it = ConcreteInterpreter(irHandler, args, headless=True)
+    it.initProgramContext(dict(params))
+    coverage = []
+    result = it.run(coverage=coverage)
+    assert result.completed
+    store = {name: val for name, val in it.store.items()}
+    return {
+        "store": store,
+        "pos": it.trtl.pos(),
+        "heading": it.trtl.heading(),
+        "down": it.trtl.isdown(),
+        "violations": sorted(it.violations),
+        "coverage": set(coverage),
+    }
+
+
+def close(a, b):
+    return a == pytest.approx(b, rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize("path,inputs", CASES, ids=[os.path.basename(c[0]) for c in CASES])
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engine_matches_exec(load, path, inputs, engine, capsys):
+    irHandler = load(path)
+    for params in inputs:
+        expected = finalState(irHandler, "exec", params)
+        actual = finalState(irHandler, engine, params)
+        capsys.readouterr()
+        assert actual["store"].keys() == expected["store"].keys()
+        for name, val in expected["store"].items():
+            assert close(actual["store"][name], val), name
+        assert close(actual["pos"], expected["pos"])
+        assert close(actual["heading"], expected["heading"])
+        assert actual["down"] == expected["down"]
+        assert actual["violations"] == expected["violations"]
+        assert actual["coverage"] == expected["coverage"]
+
+
+@pytest.mark.parametrize("path,inputs", CASES, ids=[os.path.basename(c[0]) for c in CASES])
+def test_batch_matches_exec(load, path, inputs, capsys):
+    irHandler = load(path)
+    batch = BatchInterpreter(irHandler, inputs).run()
+    positions = batch.positions()
+    for lane, params in enumerate(inputs):
+        expected = finalState(irHandler, "exec", params)
+        capsys.readouterr()
+        assert batch.status[lane] == COMPLETED
+        assert close(positions[lane], expected["pos"])
+        assert bool(batch.pen[lane]) == expected["down"]
+        assert batch.violations[lane] == len(expected["violations"])
+        assert set(batch.laneCoverage(lane)) == expected["coverage"]
+        for name, val in expected["store"].items():
+            assert batch.defined[name][lane], name
+            assert close(batch.vars[name][lane], val), name
+
+
+@pytest.mark.parametrize("path,inputs", CASES, ids=[os.path.basename(c[0]) for c in CASES])
+def test_program_counts_steps(load, path, inputs):
+    irHandler = load(path)
+    for params in inputs:
+        counts = []
+        for engine in ("closure", "program"):
+            it = ConcreteInterpreter(irHandler, argparse.Namespace(hooks=False, engine=engine), headless=True)
+            it.initProgramContext(dict(params))
+            counts.append(it.run().steps)
+        assert counts[0] == counts[1]
+
+
+@pytest.mark.parametrize("engine", ["exec"] + ENGINES)
+def test_step_budget_stops_long_loop(program, engine):
+    irHandler = program(":i = 0\nrepeat 1000000000 [\n  :i = :i + 1\n  forward 1\n]\n")
+    it = ConcreteInterpreter(irHandler, argparse.Namespace(hooks=False, engine=engine), headless=True)
+    it.initProgramContext({})
+    started = time.monotonic()
+    result = it.run(maxSteps=1000, deadline=started + 30)
+    assert result.outcome == ExecutionResult.STEP_LIMIT
+    assert 1000 <= result.steps < 1100
+    assert time.monotonic() - started < 5
+
+
+@pytest.mark.parametrize("path,inputs", CASES, ids=[os.path.basename(c[0]) for c in CASES])
+def test_program_counts_edge_hits(load, path, inputs):
+    irHandler = load(path)
+    for params in inputs:
+        maps = []
+        for engine in ("closure", "program"):
+            it = ConcreteInterpreter(irHandler, argparse.Namespace(hooks=False, engine=engine), headless=True)
+            it.initProgramContext(dict(params))
+            hits = irHandler.getEdgeMap().newHits()
+            it.run(hits=hits)
+            maps.append(hits)
+        assert maps[0] == maps[1]
+
+
+@pytest.mark.parametrize("path,inputs", CASES, ids=[os.path.basename(c[0]) for c in CASES])
+def test_program_records_cfg_edges(load, path, inputs):
+    irHandler = load(path)
+    for params in inputs:
+        runs = []
+        for engine in ("closure", "program"):
+            it = ConcreteInterpreter(irHandler, argparse.Namespace(hooks=False, engine=engine), headless=True)
+            it.initProgramContext(dict(params))
+            cfgHits, branches = irHandler.getCFGEdges().newHits(), []
+            it.run(cfgHits=cfgHits, branches=branches)
+            runs.append((cfgHits, it.pathHash, branches))
+        assert runs[0] == runs[1]
+        assert any(runs[1][0])
+
+
+@pytest.mark.parametrize("path,inputs", CASES, ids=[os.path.basename(c[0]) for c in CASES])
+@pytest.mark.parametrize("engine", ["exec"] + ENGINES)
+def test_engine_traces_like_closure(load, path, inputs, engine):
+    irHandler = load(path)
+    traces = []
+    for name in ("closure", engine):
+        args = argparse.Namespace(hooks=False, engine=name, trace="values", trace_size=1 << 16)
+        it = ConcreteInterpreter(irHandler, args, headless=True)
+        for params in inputs:
+            it.initProgramContext(dict(params))
+            it.run()
+        # compared as packed records, the values of events without one are NaN
+        traces.append((it.tracer.sink.count, bytes(it.tracer.sink.buf)))
+    assert traces[1][0] > len(inputs)
+    assert traces[0] == traces[1]
@@ -0,0 +1,115 @@
+"""
+Bucketing of failed checks and hangs (findings.py).
+"""
+
+import argparse
+import json
+
+import pytest
+
+from findings import Findings
+from interpreter import ConcreteInterpreter, ExecutionResult
+
+CHECKS = """
+if (:x > 10) [
+  forward :x
+] else [
+  backward :x
+]
+assert :y < 5
+:i = 0
+repeat 3 [
+  :i = :i + 1
+  assert :i > :z
+]
+"""
+
+HANG = """
+:i = 0
+repeat 1000000000 [
+  :i = :i + 1
+  if (:i % 3 == 0) [
+    forward 1
+  ] else [
+    left 1
+  ]
+  right 2
+]
+"""
+
+
+@pytest.fixture
+def execute(program):
+    # execute(source, data) -> (data, events, pathHash, result, pc) of its run
+    def execute(source, data, maxSteps=None, engine="closure"):
+        irHandler = program(source)
+        it = ConcreteInterpreter(irHandler, argparse.Namespace(hooks=False, engine=engine), headless=True)
+        it.initProgramContext(dict(data))
+        it.violationEvents = []
+        result = it.run(maxSteps=maxSteps, cfgHits=irHandler.getCFGEdges().newHits())
+        return data, it.violationEvents, it.pathHash, result, it.pc
+
+    return execute
+
+
+def test_same_check_and_path_is_one_bucket(tmp_path, execute, capsys):
+    findings = Findings(str(tmp_path))
+    assert findings.add(*execute(CHECKS, {":x": 20, ":y": 7, ":z": 0})) == 1
+    assert findings.add(*execute(CHECKS, {":x": 30, ":y": 9, ":z": -4})) == 0
+    # the other branch direction is another path
+    assert findings.add(*execute(CHECKS, {":x": 1, ":y": 7, ":z": 0})) == 1
+    assert sorted(findings.buckets.values()) == [1, 2]
+    assert findings.failures == 3
+    (key, name), = [(key, name) for key, name in findings.files.items() if findings.buckets[key] == 2]
+    entry = json.loads((tmp_path / name).read_text())
+    assert entry["data"] == {":x": 20, ":y": 7, ":z": 0}
+    assert (entry["kind"], entry["pc"], entry["pathHash"]) == key
+    assert entry["condition"] and entry["store"]["y"] == 7
+    assert "New finding : assert at L" in capsys.readouterr().out
+
+
+def test_check_failing_in_a_loop_counts_once_per_run(tmp_path, execute):
+    findings = Findings(str(tmp_path))
+    data, events, pathHash, result, pc = execute(CHECKS, {":x": 20, ":y": 0, ":z": 10})
+    # the run records the check failing in all 3 iterations once
+    assert len(events) == 1
+    assert findings.add(data, events, pathHash, result, pc) == 1
+    assert findings.failures == 1
+    assert findings.add(data, events, pathHash, result, pc) == 0
+    assert list(findings.buckets.values()) == [2]
+
+
+@pytest.mark.parametrize("engine", ["closure", "program"])
+def test_hangs_stopped_anywhere_in_a_loop_share_a_bucket(tmp_path, execute, engine):
+    findings = Findings(str(tmp_path))
+    stops = set()
+    for maxSteps in (500, 501, 502, 777, 5000):
+        data, events, pathHash, result, pc = execute(HANG, {}, maxSteps, engine)
+        assert result.outcome == ExecutionResult.STEP_LIMIT
+        stops.add(pc)
+        findings.add(data, events, pathHash, result, pc)
+    assert len(stops) > 1
+    assert len(findings.buckets) == 1
+    (key, count), = findings.buckets.items()
+    assert count == 5 and key[:2] == ("hang", None)
+    entry = json.loads((tmp_path / findings.files[key]).read_text())
+    assert findings.files[key] == "hang_%016x.json" % key[2]
+    assert entry["outcome"] == ExecutionResult.STEP_LIMIT and entry["stoppedAt"] in stops
+
+
+def test_time_limit_is_not_a_hang(tmp_path):
+    findings = Findings(str(tmp_path))
+    assert findings.add({}, [], 0, ExecutionResult(ExecutionResult.TIME_LIMIT, 10), 3) == 0
+    assert findings.buckets == {} and findings.failures == 0
+
+
+def test_summary_lists_the_buckets(tmp_path, execute):
+    findings = Findings(str(tmp_path))
+    findings.add(*execute(CHECKS, {":x": 20, ":y": 7, ":z": 0}))
+    findings.add(*execute(CHECKS, {":x": 20, ":y": 7, ":z": 0}))
+    findings.add(*execute(HANG, {}, 300))
+    findings.finish()
+    summary = json.loads((tmp_path / "summary.json").read_text())
+    assert [(entry["kind"], entry["count"]) for entry in summary] == [("assert", 2), ("hang", 1)]
+    for entry in summary:
+        assert (tmp_path / entry["file"]).exists()
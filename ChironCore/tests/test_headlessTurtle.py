@@ -0,0 +1,29 @@
+"""
+The turtle.Turtle interface of HeadlessTurtle (headlessTurtle.py).
+"""
+
+import pytest
+
+from headlessTurtle import HeadlessTurtle
+
+
+@pytest.mark.parametrize("up,down", [("penup", "pendown"), ("pu", "pd"), ("up", "down")])
+def test_pen_aliases(up, down):
+    trtl = HeadlessTurtle(record=True)
+    getattr(trtl, up)()
+    assert not trtl.isdown()
+    trtl.forward(10)
+    getattr(trtl, down)()
+    assert trtl.isdown()
+    trtl.forward(5)
+    assert trtl.segments == [((10.0, 0.0), (15.0, 0.0))]
+
+
+def test_restore_brings_back_the_pen():
+    trtl = HeadlessTurtle()
+    state = trtl.snapshot()
+    trtl.up()
+    trtl.left(90)
+    trtl.forward(3)
+    trtl.restore(state)
+    assert trtl.isdown() and trtl.pos() == (0.0, 0.0) and trtl.heading() == 0.0
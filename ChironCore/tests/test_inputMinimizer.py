@@ -0,0 +1,69 @@
+"""
+Test-case minimization of program inputs (inputMinimizer.py).
+"""
+
+import argparse
+
+import pytest
+
+from inputMinimizer import InputMinimizer
+
+THRESHOLDS = """
+if (:x > 100) [
+  forward 1
+] else [
+  forward 2
+]
+if (:z < -40) [
+  left 10
+]
+assert :y < 37
+"""
+
+
+@pytest.fixture(params=["closure", "program"])
+def minimizer(request, program):
+    args = argparse.Namespace(hooks=False, engine=request.param, timeout=5, max_steps=10000)
+
+    def build(source, jobs=1):
+        tmin = InputMinimizer(program(source), args, jobs=jobs)
+        request.addfinalizer(tmin.close)
+        return tmin
+
+    return build
+
+
+def test_shrink_stops_at_the_branch_threshold(minimizer):
+    tmin = minimizer(THRESHOLDS)
+    data = {":x": 5000, ":y": 500, ":z": -900}
+    signature = tmin.signatures([data])[0]
+    assert tmin.shrink(data, ":x", signature)[":x"] == 101
+    assert tmin.shrink(data, ":y", signature)[":y"] == 37
+    assert tmin.shrink(data, ":z", signature)[":z"] == -41
+
+
+def test_shrink_truncates_floats(minimizer):
+    tmin = minimizer(THRESHOLDS)
+    data = {":x": 3.75, ":y": 0, ":z": 0}
+    signature = tmin.signatures([data])[0]
+    assert tmin.shrink(data, ":x", signature)[":x"] == 0
+    # 100.5 > 100 but 100 is not, the float is kept
+    data = {":x": 100.5, ":y": 0, ":z": 0}
+    signature = tmin.signatures([data])[0]
+    assert tmin.shrink(data, ":x", signature) == data
+
+
+def test_minimize_keeps_the_signature(minimizer):
+    tmin = minimizer(THRESHOLDS)
+    data = {":x": 5000, ":y": 500, ":z": -900, ":w": 77}
+    minimized, signature = tmin.minimize(data)
+    assert minimized == {":x": 101, ":y": 37, ":z": -41, ":w": 0}
+    assert tmin.signatures([minimized])[0] == signature
+    assert signature[1] != ()
+
+
+def test_workers_find_the_same_input(minimizer):
+    data = {":x": 5000, ":y": 500, ":z": -900}
+    alone = minimizer(THRESHOLDS).minimize(data)
+    parallel = minimizer(THRESHOLDS, jobs=3).minimize(data)
+    assert parallel == alone
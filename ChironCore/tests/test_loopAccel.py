@@ -0,0 +1,100 @@
+"""
+Closed-form execution of turtle-only repeat loops (loopAccel.py and
+HeadlessTurtle.repeat).
+"""
+
+import argparse
+import time
+
+import pytest
+
+from interpreter import ConcreteInterpreter
+from headlessTurtle import HeadlessTurtle
+from loopAccel import compileLoops
+
+LOOPS = """
+:n = 7
+repeat 40 [
+  forward :x
+  left 91
+  penup
+  forward 2
+  pendown
+  right 3.5
+]
+repeat :n [ forward 5 right 72 ]
+repeat 0 [ forward 5 ]
+repeat 360 [ left 1 ]
+repeat 4 [ forward :x left 90 :n = :n + 1 ]
+repeat 3 [ repeat 5 [ backward :n left 60 ] ]
+repeat 3 [ penup forward :x ]
+"""
+
+
+def runProgram(irHandler, params, accelerate, maxSteps=None):
+    args = argparse.Namespace(hooks=False, engine="closure", accelerate=accelerate)
+    it = ConcreteInterpreter(irHandler, args, headless=True)
+    it.initProgramContext(dict(params))
+    coverage, branches = [], []
+    result = it.run(maxSteps=maxSteps, coverage=coverage, branches=branches)
+    return it, result, coverage, branches
+
+
+def test_only_turtle_loops_are_matched(program):
+    irHandler = program(LOOPS)
+    matched = [loop for loop in compileLoops(irHandler.ir) if loop is not None]
+    # all but the loop assigning :n in its body and the outer nested loop
+    assert len(matched) == 6
+
+
+@pytest.mark.parametrize("params", [{":x": 3}, {":x": -11.5}, {":x": 0}])
+def test_closed_form_matches_stepping(program, params):
+    irHandler = program(LOOPS)
+    fast, fastResult, fastCov, fastBranches = runProgram(irHandler, params, True)
+    slow, slowResult, slowCov, slowBranches = runProgram(irHandler, params, False)
+    assert fastResult.completed and slowResult.completed
+    assert fastResult.steps == slowResult.steps
+    assert set(fastCov) == set(slowCov)
+    assert sorted(fastBranches) == sorted(slowBranches)
+    assert fast.trtl.pos() == pytest.approx(slow.trtl.pos(), abs=1e-6)
+    assert fast.trtl.heading() == pytest.approx(slow.trtl.heading(), abs=1e-6)
+    assert fast.trtl.isdown() == slow.trtl.isdown()
+    assert fast.store == slow.store
+
+
+def test_step_budget_runs_loop_by_steps(program):
+    irHandler = program("repeat 1000 [ forward 1 ]\n")
+    _, result, _, _ = runProgram(irHandler, {}, True, maxSteps=100)
+    assert not result.completed
+    assert result.steps == 100
+
+
+@pytest.mark.parametrize("times", [10**6, 10**7])
+def test_long_loop_runs_in_constant_time(program, times):
+    # pen down, pen changes and the fill begun by the interpreter must
+    # not force the loop to be run point by point
+    irHandler = program("repeat %d [ forward 1 left 1 penup forward 2 pendown ]\n" % times)
+    started = time.monotonic()
+    it, result, _, _ = runProgram(irHandler, {}, True)
+    assert time.monotonic() - started < 0.5
+    assert result.completed
+    assert result.steps == 2 + times * 8
+    assert it.trtl.isdown()
+    assert it.trtl.segments == [] and len(it.trtl.fillpath) <= 1
+
+
+def test_recording_turtle_keeps_the_drawing():
+    moves = [("forward", 3.0), ("left", 72.0), ("penup", None), ("forward", 1.0), ("pendown", None)]
+    fast = HeadlessTurtle(record=True)
+    fast.begin_fill()
+    fast.repeat(moves, 5)
+    slow = HeadlessTurtle(record=True)
+    slow.begin_fill()
+    for _ in range(5):
+        for command, amount in moves:
+            getattr(slow, command)(*([] if amount is None else [amount]))
+    assert fast.pos() == pytest.approx(slow.pos())
+    assert len(fast.segments) == len(slow.segments) == 5
+    for a, b in zip(fast.segments, slow.segments):
+        assert a[0] == pytest.approx(b[0]) and a[1] == pytest.approx(b[1])
+    assert len(fast.fillpath) == len(slow.fillpath) == 11
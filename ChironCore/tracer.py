@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Execution tracing for the concrete interpreter.
+
+Trace levels:
+    off     nothing is recorded, the interpreter runs uninstrumented.
+    events  (pc, opcode) of every executed instruction.
+    values  as 'events', plus the value produced by the instruction (the
+            assigned value, or the outcome of a condition/assert/assume).
+    print   as 'values', and every instruction is also printed to stdout
+            together with the failed checks and the per-run messages of
+            the fuzzer and SBFL.
+
+Events go to a fixed size ring buffer of packed binary records, so a trace
+of a long run keeps its last 'capacity' events at constant memory. The
+buffer can be exported as NDJSON (one JSON object per line) and summarized
+per opcode and per IR index.
+
+Tracing is attached by wrapping the compiled closures of the interpreter
+(see irCompiler.py); with tracing off they are not wrapped, so a disabled
+tracer costs nothing per executed instruction.
+"""
+
+import json
+import math
+import struct
+from collections import Counter
+
+from ChironAST import ChironAST
+
+
+OFF, EVENTS, VALUES, PRINT = 0, 1, 2, 3
+LEVELS = {"off": OFF, "events": EVENTS, "values": VALUES, "print": PRINT}
+
+# opcode 0 marks the start of a run
+OP_START = 0
+OPCODES = [
+    (ChironAST.AssignmentCommand, 1, "assign"),
+    (ChironAST.ConditionCommand, 2, "cond"),
+    (ChironAST.MoveCommand, 3, "move"),
+    (ChironAST.PenCommand, 4, "pen"),
+    (ChironAST.GotoCommand, 5, "goto"),
+    (ChironAST.NoOpCommand, 6, "nop"),
+    (ChironAST.AssertCommand, 7, "assert"),
+    (ChironAST.AssumeCommand, 8, "assume"),
+    (ChironAST.PauseCommand, 9, "pause"),
+]
+OPNAMES = {OP_START: "start"}
+OPNAMES.update({code: name for _, code, name in OPCODES})
+
+# pc (uint32), opcode (uint8), value (float64; NaN if absent)
+RECORD = struct.Struct("<IBd")
+NOVALUE = float("nan")
+
+
+def opcode(stmt):
+    for cls, code, _ in OPCODES:
+        if isinstance(stmt, cls):
+            return code
+    raise NotImplementedError("Unknown instruction: %s, %s." % (type(stmt), stmt))
+
+
+def asFloat(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError, OverflowError):
+        return NOVALUE
+
+
+class RingBuffer:
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self.buf = bytearray(RECORD.size * capacity)
+        self.count = 0 # total number of records ever written
+
+    def record(self, pc, op, value=NOVALUE):
+        RECORD.pack_into(self.buf, (self.count % self.capacity) * RECORD.size, pc, op, value)
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def records(self):
+        """Yield (seq, pc, opcode, value) of the buffered records, oldest first."""
+        for seq in range(self.count - len(self), self.count):
+            pc, op, value = RECORD.unpack_from(self.buf, (seq % self.capacity) * RECORD.size)
+            yield seq, pc, op, value
+
+    def clear(self):
+        self.count = 0
+
+
+class Tracer:
+    def __init__(self, level=OFF, capacity=65536):
+        self.level = LEVELS[level] if isinstance(level, str) else level
+        self.sink = RingBuffer(capacity)
+        self.runs = 0
+
+    @classmethod
+    def fromArgs(cls, args):
+        return cls(getattr(args, "trace", "off"), getattr(args, "trace_size", 65536))
+
+    @property
+    def enabled(self):
+        return self.level > OFF
+
+    @property
+    def verbose(self):
+        return self.level >= PRINT
+
+    def begin(self):
+        # called when the interpreter starts a new run
+        if self.enabled:
+            self.runs += 1
+            self.sink.record(0, OP_START)
+
+    # --Instrumentation-------------------------------------------------
+
+    def valueOf(self, stmt):
+        # returns f(interpreter) giving the value recorded for 'stmt'
+        if self.level < VALUES:
+            return None
+        if isinstance(stmt, ChironAST.AssignmentCommand):
+            name = str(stmt.lvar).replace(":", "").strip()
+            return lambda it: asFloat(it.store.get(name))
+        if isinstance(stmt, (ChironAST.ConditionCommand, ChironAST.AssertCommand, ChironAST.AssumeCommand)):
+            return lambda it: asFloat(it.cond_eval)
+        return None
+
+    def instrument(self, compiled, ir):
+        """Wrap the closures compiled by irCompiler so that they record events."""
+        if not self.enabled:
+            return compiled
+        return [self.wrap(run, pc, stmt, tgt) for pc, (run, (stmt, tgt)) in enumerate(zip(compiled, ir))]
+
+    def wrap(self, run, pc, stmt, tgt):
+        record = self.sink.record
+        op = opcode(stmt)
+        value = self.valueOf(stmt)
+        verbose = self.verbose
+
+        def traced(it):
+            if verbose:
+                print("Program counter : ", pc)
+                print(stmt, stmt.__class__.__name__, tgt)
+            ntgt = run(it)
+            record(pc, op, value(it) if value is not None else NOVALUE)
+            return ntgt
+
+        return traced
+
+    def instrumentDispatch(self, it):
+        """Wrap ConcreteInterpreter.dispatch (the 'exec' engine)."""
+        if not self.enabled:
+            return it.dispatch
+        dispatch = it.dispatch
+        wrapped = {}
+
+        def traced(stmt, tgt):
+            pc = it.pc
+            if pc not in wrapped:
+                wrapped[pc] = self.wrap(lambda it: dispatch(stmt, tgt), pc, stmt, tgt)
+            return wrapped[pc](it)
+
+        return traced
+
+    # --Export----------------------------------------------------------
+
+    def exportNDJSON(self, filename, ir=None):
+        with open(filename, "w") as f:
+            for seq, pc, op, value in self.sink.records():
+                event = {"seq": seq, "pc": pc, "op": OPNAMES[op]}
+                if not math.isnan(value):
+                    event["value"] = value
+                if ir is not None and op != OP_START and pc < len(ir):
+                    event["stmt"] = str(ir[pc][0])
+                f.write(json.dumps(event) + "\n")
+
+    def summary(self, ir=None, top=10):
+        ops, pcs = Counter(), Counter()
+        for _, pc, op, _ in self.sink.records():
+            ops[OPNAMES[op]] += 1
+            if op != OP_START:
+                pcs[pc] += 1
+        lines = [
+            "========== Chiron Trace ==========",
+            f"runs : {self.runs}, events : {self.sink.count} ({len(self.sink)} buffered)",
+            "events per opcode :",
+        ]
+        for name, count in ops.most_common():
+            lines.append(f"    {name.ljust(8)} {count}")
+        lines.append("hottest instructions :")
+        for pc, count in pcs.most_common(top):
+            stmt = f"  {ir[pc][0]}" if ir is not None and pc < len(ir) else ""
+            lines.append(f"    [L{pc}]".ljust(10) + f"{count}{stmt}")
+        return "\n".join(lines)